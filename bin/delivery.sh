@@ -21,8 +21,9 @@ if [ ! -d "$BUILD_DIR" ]; then
 fi
 
 #get name and version using bootstrap.py
-NAME=`py2hwsw $CORE print_core_name`
-VERSION_STR=`py2hwsw $CORE print_core_version`
+CORE_METADATA=(`py2hwsw $CORE print name,version`)
+NAME=${CORE_METADATA[0]}
+VERSION_STR=${CORE_METADATA[1]}
 
 BUILD_VSRC_DIR=$BUILD_DIR/hardware/src
 BUILD_SIM_DIR=$BUILD_DIR/hardware/simulation
@@ -72,6 +73,7 @@ rm -rf $BUILD_DIR/scripts
 find $BUILD_DIR/hardware/fpga -name \*.pdf -delete
 find $BUILD_DIR -name \*.ods -delete
 rm -f $BUILD_DIR/config_delivery.mk
+rm -rf $BUILD_DIR/.py2hwsw
 
 echo "Release tar file"
 DELIVERYTARNAME=$TARNAME
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+# Benchmarks of py2hwsw setups.
+# Each benchmark sets up a generated core in a temporary build directory (without
+# lint and format, and running only the 'snippets' post setup step), and prints the
+# setup time and the peak memory (RSS) of the process.
+# Run one benchmark per process, since the peak memory of a process never decreases.
+#
+# Examples:
+#     ./benchmark.py system --size 1000
+#     ./benchmark.py xbar --size 32
+
+import os
+import sys
+import io
+import time
+import argparse
+import resource
+import tempfile
+import contextlib
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "scripts")
+)
+sys.setrecursionlimit(10000)
+
+from iob_context import new_context  # noqa: E402
+from iob_core import iob_core  # noqa: E402
+import block_gen  # noqa: E402
+
+
+def system_core(size, subblock="iob_timer"):
+    """Return py2hw dictionary of a system with 'size' subblocks, each connected
+    to its own CSR bus wire.
+    """
+    return {
+        "original_name": "bench_system",
+        "name": "bench_system",
+        "generate_hw": True,
+        "ports": [
+            {"name": "clk_en_rst_s", "signals": {"type": "iob_clk"}},
+        ],
+        "wires": [
+            {
+                "name": f"cbus{i}",
+                "signals": {"type": "iob", "prefix": f"p{i}_", "ADDR_W": 4},
+            }
+            for i in range(size)
+        ],
+        "subblocks": [
+            {
+                "core_name": subblock,
+                "instance_name": f"periph{i}",
+                "connect": {
+                    "clk_en_rst_s": "clk_en_rst_s",
+                    "iob_csrs_cbus_s": f"cbus{i}",
+                },
+            }
+            for i in range(size)
+        ],
+    }
+
+
+def run_setup(setup_func):
+    """Run a setup in a new context, with a temporary build directory.
+    param setup_func: function that creates the core
+    returns: setup time in seconds
+    """
+    with tempfile.TemporaryDirectory(prefix="py2hwsw_benchmark_") as tmp_dir:
+        with contextlib.redirect_stdout(io.StringIO()), new_context(
+            project_root=tmp_dir,
+            build_dir=os.path.join(tmp_dir, "build"),
+            project_vlint=False,
+            project_vformat=False,
+            post_setup_only=["snippets"],
+        ):
+            start = time.perf_counter()
+            setup_func()
+            return time.perf_counter() - start
+
+
+def benchmark_system(size=1000):
+    """Setup a system with 'size' subblocks"""
+    core_dict = system_core(size)
+    elapsed = run_setup(lambda: iob_core.py2hw(core_dict))
+    return f"system with {size} subblocks", elapsed
+
+
+def benchmark_xbar(size=16):
+    """Setup an AXI crossbar with 'size' managers and 'size' subordinates. Also prints
+    the time spent connecting the ports of its instances.
+    """
+    port_connections_time = 0.0
+    get_instance_port_connections = block_gen.get_instance_port_connections
+
+    def timed_port_connections(instance):
+        nonlocal port_connections_time
+        start = time.perf_counter()
+        portmap = get_instance_port_connections(instance)
+        port_connections_time += time.perf_counter() - start
+        return portmap
+
+    block_gen.get_instance_port_connections = timed_port_connections
+    try:
+        elapsed = run_setup(
+            lambda: iob_core.get_core_obj(
+                "iob_axi_full_xbar",
+                name=f"bench_xbar{size}",
+                num_managers=size,
+                num_subordinates=size,
+            )
+        )
+    finally:
+        block_gen.get_instance_port_connections = get_instance_port_connections
+    print(f"Port connections of instances: {port_connections_time:.3f} s")
+    return f"{size}x{size} iob_axi_full_xbar", elapsed
+
+
+BENCHMARKS = {
+    "system": benchmark_system,
+    "xbar": benchmark_xbar,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks of py2hwsw setups")
+    parser.add_argument("benchmark", choices=BENCHMARKS, help="Benchmark to run")
+    parser.add_argument(
+        "--size",
+        type=int,
+        help="Size of the generated core (default: 1000 subblocks for 'system', 16 managers and subordinates for 'xbar')",
+    )
+    args = parser.parse_args()
+    size_args = [args.size] if args.size else []
+    name, elapsed = BENCHMARKS[args.benchmark](*size_args)
+    # ru_maxrss is given in kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Setup of {name}: {elapsed:.2f} s, peak RSS {peak_rss:.0f} MB")
@@ -48,6 +48,29 @@ if [ "$1" == "test" ]; then
     exit 0
 fi
 
+#test if first argument is "reproducible": setup module(s) twice and check that both build directories are bit-identical
+#then setup them again into the existing build directory, and check that it did not change
+if [ "$1" == "reproducible" ]; then
+    if [ -n "$2" ]; then MODULES="${@:2}"; fi
+    REF_DIR=`mktemp -d`
+    trap "rm -rf $REF_DIR" EXIT
+    for i in $MODULES; do
+        echo -e "\n\033[1;33mChecking reproducible setup of module '${i}'\033[0m"
+        DEFAULT_BUILD_DIR=`py2hwsw $i print_build_dir`
+        # Write Verilog snippets too, so that their names are also checked
+        make -f ${LIB_DIR}/Makefile clean setup CORE=$i BUILD_DIR=../../${DEFAULT_BUILD_DIR} SETUP_ARGS="--no_verilog_lint --write_snippets"
+        rm -rf $REF_DIR/$i
+        cp -a ../../${DEFAULT_BUILD_DIR} $REF_DIR/$i
+        make -f ${LIB_DIR}/Makefile clean setup CORE=$i BUILD_DIR=../../${DEFAULT_BUILD_DIR} SETUP_ARGS="--no_verilog_lint --write_snippets"
+        # Manifest has file timestamps
+        diff -r --exclude=.py2hwsw $REF_DIR/$i ../../${DEFAULT_BUILD_DIR}
+        # Setup again without cleaning (existing build directory)
+        make -f ${LIB_DIR}/Makefile setup CORE=$i BUILD_DIR=../../${DEFAULT_BUILD_DIR} SETUP_ARGS="--no_verilog_lint --write_snippets"
+        diff -r --exclude=.py2hwsw $REF_DIR/$i ../../${DEFAULT_BUILD_DIR}
+    done
+    exit 0
+fi
+
 #test if first argument is "build" and run build for single module
 if [ "$1" == "build" ]; then
     DEFAULT_BUILD_DIR=`py2hwsw $2 print_build_dir`
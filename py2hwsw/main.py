@@ -8,6 +8,14 @@ def main():
     import os
     import sys
 
+    # Forward call to a running py2hwsw server (started with `py2hwsw --serve`)
+    if "--serve" not in sys.argv[1:]:
+        from py2hwsw.scripts.py2hwsw_client import run_on_server
+
+        exit_code = run_on_server(sys.argv[1:])
+        if exit_code is not None:
+            sys.exit(exit_code)
+
     py2hwsw_path = os.path.dirname(__file__) + "/scripts/py2hwsw.py"
 
     args = ""
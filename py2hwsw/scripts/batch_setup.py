@@ -0,0 +1,227 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+#
+#    batch_setup.py: setup many cores (or variants of a core) in one py2hwsw call
+#
+# Jobs are read from a json file with a list of jobs. Example:
+# [
+#     {"core_name": "iob_uart", "build_dir": "../uart_default"},
+#     {"core_name": "iob_uart", "py_params": {"board_list": "cyclonev_gt_dk"}, "build_dir": "../uart_cyc"},
+#     {"core_name": "iob_timer", "py_params": "param1=value1:param2=value2"}
+# ]
+# Each job may also have a "project_root" attribute.
+#
+# Modules and core indexes are loaded once, and every job runs in a process forked
+# from this one (one process per job, as the setup uses global state). The output of
+# each job is stored in a log file, and a summary of every job is printed at the end.
+#
+
+import os
+import sys
+import json
+import time
+import traceback
+import multiprocessing
+
+import iob_colors
+import core_index
+from iob_base import fail_with_msg
+from iob_context import get_context
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+# Supported attributes of each job
+JOB_ATTRIBUTES = ["core_name", "py_params", "build_dir", "project_root"]
+
+
+def read_jobs(jobs_file):
+    """Read and validate list of jobs from a json file"""
+    try:
+        with open(jobs_file, "r") as f:
+            jobs = json.load(f)
+    except (OSError, ValueError) as e:
+        fail_with_msg(f"Could not read batch jobs file '{jobs_file}': {e}")
+    if not isinstance(jobs, list):
+        fail_with_msg(f"Batch jobs file '{jobs_file}' must contain a list of jobs.")
+
+    build_dirs = {}
+    for idx, job in enumerate(jobs):
+        if not isinstance(job, dict) or "core_name" not in job:
+            fail_with_msg(f"Batch job {idx} must be a dictionary with a 'core_name'.")
+        for attribute in job:
+            if attribute not in JOB_ATTRIBUTES:
+                fail_with_msg(
+                    f"Unknown attribute '{attribute}' in batch job {idx}. Supported attributes: {JOB_ATTRIBUTES}."
+                )
+        # Jobs running in parallel must not share a build directory
+        build_dir = job.get("build_dir")
+        if build_dir:
+            build_dir = os.path.abspath(build_dir)
+            if build_dir in build_dirs:
+                fail_with_msg(
+                    f"Batch jobs {build_dirs[build_dir]} and {idx} use the same build directory '{build_dir}'."
+                )
+            build_dirs[build_dir] = idx
+    return jobs
+
+
+def job_argv(job, common_argv, project_root="."):
+    """Return py2hwsw arguments to run the setup of a job"""
+    argv = [job["core_name"], "setup"]
+    py_params = job.get("py_params")
+    if isinstance(py_params, dict):
+        py_params = ":".join(f"{k}={v}" for k, v in py_params.items())
+    if py_params:
+        argv += ["--py_params", py_params]
+    if job.get("build_dir"):
+        argv += ["--build_dir", job["build_dir"]]
+    argv += ["--project_root", job.get("project_root", project_root)]
+    return argv + common_argv
+
+
+def _run_job(main_func, idx, job, argv, log_path):
+    """Run a job in a worker process. Returns dictionary with result of the job."""
+    start_time = time.time()
+    with open(log_path, "w") as log:
+        # Redirect output of this process (and of tools it calls) to the log file
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+        try:
+            main_func(argv)
+            exit_code = 0
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else int(e.code is not None)
+        except Exception:
+            traceback.print_exc()
+            exit_code = 1
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+    # Build directory of the top module (global build_dir may point to a tester's)
+    top_module = get_context().top_module
+    build_dir = getattr(top_module, "build_dir", "") or get_context().build_dir
+    return {
+        "index": idx,
+        "core_name": job["core_name"],
+        "argv": argv,
+        "build_dir": build_dir,
+        "status": "ok" if exit_code == 0 else "failed",
+        "exit_code": exit_code,
+        "duration": round(time.time() - start_time, 3),
+        "log": log_path,
+    }
+
+
+def _preload_indexes(jobs, project_root):
+    """Load core indexes in this process, so that jobs inherit them"""
+    core_index.get_index(os.path.join(SCRIPTS_DIR, ".."))
+    for root in {job.get("project_root", project_root) for job in jobs}:
+        if os.path.isdir(root):
+            core_index.get_index(root)
+
+
+def print_summary(results):
+    """Print table with the result of each job"""
+    rows = [["#", "Core", "Status", "Time (s)", "Build directory"]]
+    for r in results:
+        rows.append(
+            [
+                str(r["index"]),
+                r["core_name"],
+                r["status"],
+                f"{r['duration']:.2f}",
+                r["build_dir"] or "-",
+            ]
+        )
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    for row in rows:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+
+
+def run_batch(
+    jobs_file,
+    main_func,
+    common_argv=[],
+    num_jobs=None,
+    log_dir="",
+    report_file="",
+    project_root=".",
+):
+    """Setup every job of a batch jobs file, in parallel.
+    param jobs_file: path of json file with list of jobs
+    param main_func: function that runs py2hwsw with a given list of arguments
+    param common_argv: py2hwsw arguments given to every job
+    param num_jobs: number of jobs to run in parallel. Defaults to number of CPUs.
+    param log_dir: directory for the log file of each job. Defaults to '<jobs_file>_logs'.
+    param report_file: optional path of json report with the result of each job
+    param project_root: project root of jobs that do not specify one
+    returns: True if every job succeeded
+    """
+    jobs = read_jobs(jobs_file)
+    if not log_dir:
+        log_dir = os.path.splitext(jobs_file)[0] + "_logs"
+    os.makedirs(log_dir, exist_ok=True)
+    num_jobs = num_jobs or os.cpu_count() or 1
+
+    _preload_indexes(jobs, project_root)
+
+    print(
+        f"{iob_colors.INFO}Running {len(jobs)} batch jobs from '{jobs_file}' ({num_jobs} in parallel). Logs in '{log_dir}'.{iob_colors.ENDC}",
+        flush=True,
+    )
+    start_time = time.time()
+    results = []
+    # Jobs are forked from this process, to inherit its loaded modules and indexes.
+    # Each worker only runs one job, as the setup uses global state.
+    ctx = multiprocessing.get_context("fork")
+    with ctx.Pool(processes=num_jobs, maxtasksperchild=1) as pool:
+        pending = [
+            pool.apply_async(
+                _run_job,
+                (
+                    main_func,
+                    idx,
+                    job,
+                    job_argv(job, common_argv, project_root),
+                    os.path.join(log_dir, f"{idx:03d}_{job['core_name']}.log"),
+                ),
+            )
+            for idx, job in enumerate(jobs)
+        ]
+        for result in pending:
+            results.append(result.get())
+            r = results[-1]
+            color = iob_colors.INFO if r["status"] == "ok" else iob_colors.FAIL
+            print(
+                f"{color}Job {r['index']} ({r['core_name']}) {r['status']} in {r['duration']:.2f}s.{iob_colors.ENDC}",
+                flush=True,
+            )
+
+    print_summary(results)
+    num_failed = len([r for r in results if r["status"] != "ok"])
+    total_time = time.time() - start_time
+    if report_file:
+        with open(report_file, "w") as f:
+            json.dump(
+                {
+                    "jobs_file": jobs_file,
+                    "parallel_jobs": num_jobs,
+                    "duration": round(total_time, 3),
+                    "failed": num_failed,
+                    "results": results,
+                },
+                f,
+                indent=4,
+            )
+    if num_failed:
+        print(
+            f"{iob_colors.FAIL}{num_failed} of {len(jobs)} batch jobs failed ({total_time:.2f}s).{iob_colors.ENDC}"
+        )
+        return False
+    print(
+        f"{iob_colors.INFO}All {len(jobs)} batch jobs succeeded ({total_time:.2f}s).{iob_colors.ENDC}"
+    )
+    return True
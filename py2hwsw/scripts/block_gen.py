@@ -9,13 +9,15 @@
 from latex import write_table
 
 import iob_colors
+from iob_base import warn_with_msg
 from iob_signal import get_real_signal, iob_signal
 import param_gen
+from build_files import open_file
 
 
 # Generate subblocks.tex file with TeX table of subblocks (Verilog modules instances)
 def generate_subblocks_table_tex(subblocks, out_dir):
-    subblocks_file = open(f"{out_dir}/subblocks.tex", "w")
+    subblocks_file = open_file(f"{out_dir}/subblocks.tex", "w")
 
     subblocks_file.write(
         "The Verilog modules in the top-level entity of the core are \
@@ -104,15 +106,67 @@ def generate_subblocks_snippet(core):
     """
     code = generate_subblocks(core)
     out_dir = core.build_dir + "/hardware/src"
-    with open(f"{out_dir}/{core.name}_subblocks.vs", "w+") as f:
+    with open_file(f"{out_dir}/{core.name}_subblocks.vs", "w") as f:
         f.write(code)
 
 
+def get_interface_connections(wire):
+    """Returns dictionary of the signals of an external connection (wire/port with a
+    standard interface), by name without the interface prefix and direction suffix.
+    Used to connect ports of instances by name.
+    """
+    e_signals = {}
+    for e_signal in wire.signals:
+        real_e_signal = get_real_signal(e_signal)
+        e_signal_name = real_e_signal.name
+        # Remove prefix and suffix from external signal name
+        if e_signal_name[-2:] in ["_o", "_i"]:
+            e_signal_name = e_signal_name[:-2]
+        e_signal_name = e_signal_name.replace(wire.interface.prefix, "", 1)
+        # Connect to first signal with this name
+        e_signals.setdefault(e_signal_name, real_e_signal)
+    return e_signals
+
+
+def get_bit_slices_table(bit_slices):
+    """Returns list of tuples (bit slice, connection) for the given bit slices.
+    The connection is the text after ':' for bit slices like 'port_signal:connection',
+    or the bit slice itself otherwise.
+    """
+    table = []
+    for bit_slice in bit_slices:
+        parts = bit_slice.split(":")
+        table.append((bit_slice, parts[1] if len(parts) > 1 else bit_slice))
+    return table
+
+
+def get_bit_slice_connection(bit_slices_table, port_signal_name, e_signal_name):
+    """Returns the connection of a port signal given by the bit slices of its port.
+    The first bit slice that contains the name of the port signal, or the name of the
+    external signal connected to it, overwrites the connection.
+    param bit_slices_table: bit slices of the port (see `get_bit_slices_table()`)
+    param port_signal_name: name of the port signal
+    param e_signal_name: name of the external signal (None if not connected)
+    returns: connection (external signal name or bit slice), or None
+    """
+    for bit_slice, connection in bit_slices_table:
+        if (e_signal_name and e_signal_name in bit_slice) or (
+            port_signal_name in bit_slice
+        ):
+            if f"{port_signal_name}:" in bit_slice:
+                return connection
+            # Connection is a bit slice
+            return bit_slice
+    return e_signal_name
+
+
 def get_instance_port_connections(instance):
     """Returns a multi-line string with all port's signals connections
     for the given Verilog instance.
     """
     instance_portmap = ""
+    # Port signals without external connection
+    unconnected_signals = []
 
     # Iterade over all ports of the instance
     for port_idx, port in enumerate(instance.ports):
@@ -155,6 +209,13 @@ External connection '{get_real_signal(port.e_connect).name}' has the following s
                     f"        .{port.signals[0].name}({port.e_connect}),\n"
                 )
             continue
+
+        # If both ports are standard interfaces, connect by name
+        e_signals = None
+        if port.interface and port.e_connect.interface:
+            e_signals = get_interface_connections(port.e_connect)
+        bit_slices_table = get_bit_slices_table(port.e_connect_bit_slices)
+
         # Connect individual signals
         for idx, port_signal in enumerate(port.signals):
             # Skip signals that are not iob_signals
@@ -162,53 +223,35 @@ External connection '{get_real_signal(port.e_connect).name}' has the following s
                 continue
             port_name = port_signal.name
 
-            # If both ports are standard interfaces, connect by name
-            if port.interface and port.e_connect.interface:
+            if e_signals is not None:
                 # Remove prefix and suffix from port name
-                port_name = port_name.replace(port.interface.prefix, "", 1)[:-2]
-                for e_signal in port.e_connect.signals:
-                    real_e_signal = get_real_signal(e_signal)
-                    e_signal_name = real_e_signal.name
-                    # Remove prefix and suffix from external signal name
-                    if e_signal_name[-2:] in ["_o", "_i"]:
-                        e_signal_name = e_signal_name[:-2]
-                    e_signal_name = e_signal_name.replace(
-                        port.e_connect.interface.prefix, "", 1
-                    )
-                    if e_signal_name == port_name:
-                        e_signal_name = real_e_signal.name
-                        port_name = port_signal.name
-                        break
-                port_name = port_signal.name
+                real_e_signal = e_signals.get(
+                    port_name.replace(port.interface.prefix, "", 1)[:-2]
+                )
+                e_signal_name = real_e_signal.name if real_e_signal else None
             else:
                 # If both ports are not standard interfaces, connect by index
                 real_e_signal = get_real_signal(port.e_connect.signals[idx])
                 e_signal_name = real_e_signal.name
 
             # If the signal is a bit slice, get the name of the bit slice
-            # and the name of the port (this overwrites the previous connection)
-            for bit_slice in port.e_connect_bit_slices:
-                if e_signal_name in bit_slice:
-                    # Connection is not a bit_slice
-                    if f"{port_signal.name}:" in bit_slice:
-                        e_signal_name = bit_slice.split(":")[1]
-                        port_name = port_signal.name
-                    else:
-                        # Connection is a bit slice
-                        e_signal_name = bit_slice
-                    break
-                elif port_signal.name in bit_slice:
-                    # Connection is not a bit_slice
-                    if f"{port_signal.name}:" in bit_slice:
-                        e_signal_name = bit_slice.split(":")[1]
-                        port_name = port_signal.name
-                    else:
-                        # Connection is a bit slice
-                        e_signal_name = bit_slice
-                    break
+            # (this overwrites the previous connection)
+            e_signal_name = get_bit_slice_connection(
+                bit_slices_table, port_name, e_signal_name
+            )
+
+            if e_signal_name is None:
+                unconnected_signals.append(f"{port_name} (port '{port.name}')")
+                e_signal_name = ""
 
             instance_portmap += f"        .{port_name}({e_signal_name}),\n"
 
+    if unconnected_signals:
+        warn_with_msg(
+            f"Signals of instance '{instance.instance_name}' ({instance.name}) not found in their external connection, left unconnected:\n"
+            + "\n".join(f"- {signal}" for signal in unconnected_signals)
+        )
+
     instance_portmap = instance_portmap[:-2] + "\n"  # Remove last comma
 
     return instance_portmap
@@ -0,0 +1,863 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+#
+#    build_files.py: write files of the build directory and track them in a manifest
+#
+# Generators write their outputs using `open_file()`/`write_file()`, which only
+# touch a file when its content changes. Written and copied files get their license
+# header at that moment (see `manage_headers.py`).
+# Every source written or copied is recorded in a ledger of the run. Sources of some
+# folders (like `hardware/simulation/src`) that duplicate a source of a main folder
+# (like `hardware/src`) are resolved when they are written, instead of being written
+# and removed later. The ledger is stored in `<build_dir>/.py2hwsw/sources.json`.
+# Verilog snippets ('.vs' files) are kept in memory until their include statements are
+# replaced (see `verilog_gen.replace_includes()`). They are only written to disk if
+# requested (`--write_snippets` option), or if their include statements are not replaced.
+# Verilog sources that include snippets are also kept in memory when written or
+# copied, and only written once their include statements are replaced.
+# At the end of the setup, a manifest (`<build_dir>/.py2hwsw/manifest.json`) is
+# stored with a content hash of every output, and of the inputs used to generate
+# them (and a hash of the listing of the directories they were copied from). Outputs that were rewritten with the same content they had in the previous
+# setup get their previous mtime back, so that `make` does not rebuild them.
+#
+
+import os
+import io
+import re
+import sys
+import stat
+import json
+import fcntl
+import shutil
+import filecmp
+import hashlib
+import contextlib
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+import iob_colors
+import manage_headers
+from iob_context import get_context
+from iob_base import add_write_permission
+from parallel_setup import get_task_seq
+from py2hwsw_version import PY2HWSW_VERSION
+
+# Directory, inside the build directory, for py2hwsw internal files
+PY2HWSW_BUILD_DIR = ".py2hwsw"
+MANIFEST_NAME = "manifest.json"
+SOURCES_NAME = "sources.json"
+# Version of the manifest format. Increment when the format changes.
+MANIFEST_FORMAT_VERSION = 2
+# Linux ioctl to clone a file (reflink). Supported by btrfs, xfs, and others.
+FICLONE = 0x40049409
+# Verilog sources that may include snippets, and their include statements
+VERILOG_SOURCE_EXTENSIONS = (".v", ".sv", ".vh")
+SNIPPET_INCLUDE_RE = re.compile(rb'`include ".*\.vs"')
+
+# State of the files tracked in the current run (read/written files, start time,
+# previous manifests, and py2hwsw arguments) is stored in the run's `iob_context`.
+
+
+class output_file(io.StringIO):
+    """File-like object that buffers the content of an output file and only writes
+    it to disk (on close) if the content changed.
+    """
+
+    def __init__(self, path, mode="w"):
+        initial_value = ""
+        if mode == "a" and get_snippet(path) is not None:
+            initial_value = get_snippet(path)
+        elif mode == "a" and is_pending_source(path):
+            initial_value = get_pending_source(path).decode()
+        elif mode == "a" and os.path.isfile(path):
+            with open(path, "r") as f:
+                initial_value = f.read()
+        super().__init__(initial_value)
+        self.seek(0, io.SEEK_END)
+        self.path = path
+
+    def close(self):
+        if not self.closed:
+            write_file(self.path, self.getvalue())
+        super().close()
+
+
+def open_file(path, mode="w"):
+    """Open an output file for writing.
+    Has the same interface as python's `open()` for text files.
+    The file is only written on close, if its content changed.
+    param path: path of the file
+    param mode: 'w' to write or 'a' to append
+    """
+    if mode not in ["w", "a"]:
+        raise ValueError(f"Unsupported mode '{mode}' for output file '{path}'.")
+    return output_file(path, mode)
+
+
+def write_file(path, content, final=False, source=None):
+    """Write content to file, only if it differs from the current file content.
+    Adds the license header of the build directory to the content (if needed).
+    param path: path of the file
+    param content: string or bytes to write
+    param final: if the content is final. Some files only get their header when their
+                 content is final (see `manage_headers.FINAL_HEADER_EXTENSIONS`).
+    param source: path of the file that the content was copied from (if any)
+    returns: True if the file was written, False if it already had that content (or
+             is a duplicate source)
+    """
+    # Verilog snippets are kept in memory
+    if path.endswith(".vs") and not get_context().write_snippets:
+        _store_snippet(path, content)
+        return True
+    return _write_file(path, content, final, source)
+
+
+def _write_file(path, content, final=False, source=None, keep_pending=True):
+    """
+    param keep_pending: if Verilog sources that include snippets should be kept in
+                        memory (see `_store_pending_source()`)
+    """
+    data = content.encode() if isinstance(content, str) else content
+    if not _add_source(path, source):
+        return False
+    get_context().build_outputs.add(os.path.abspath(path))
+    with _claim_output(path) as claimed:
+        if not claimed:
+            return False
+        if keep_pending and _store_pending_source(path, data, final, source):
+            return True
+        data, header_status = manage_headers.add_build_header(path, data, final)
+        written = _write_data(path, data)
+    if header_status is not None:
+        manage_headers.record_written_header(path, header_status)
+    return written
+
+
+def _write_data(path, data):
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, "rb") as f:
+                if f.read() == data:
+                    return False
+    except OSError:
+        pass
+    with open(path, "wb") as f:
+        f.write(data)
+    return True
+
+
+def copy_file(src, dst, *, follow_symlinks=True):
+    """Copy file (with metadata), and track it in the manifest.
+    Has the same interface as `shutil.copy2()`, so it can be used as `copy_function`
+    of `shutil.copytree()`.
+    The destination is not modified if it already has the same content.
+    Files copied to a build directory get its license header (if needed).
+    """
+    record_input(src)
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    if not _add_source(dst, src):
+        return dst
+    # Copied file replaces snippet written before
+    get_context().snippets.pop(os.path.abspath(dst), None)
+    header_status = None
+    with _claim_output(dst) as claimed:
+        if claimed and not _store_pending_copy(src, dst):
+            if not follow_symlinks and os.path.islink(src):
+                shutil.copy2(src, dst, follow_symlinks=False)
+            elif manage_headers.get_build_header(dst):
+                header_status = _copy_with_header(src, dst)
+            else:
+                _copy_data(src, dst)
+    if header_status is not None:
+        manage_headers.record_written_header(dst, header_status)
+    record_output(dst)
+    return dst
+
+
+def _copy_data(src, dst):
+    if _has_same_content(src, dst):
+        # Only update permissions (like `shutil.copy2()` would)
+        mode = stat.S_IMODE(os.stat(src).st_mode) | 0o220
+        if stat.S_IMODE(os.stat(dst).st_mode) != mode:
+            os.chmod(dst, mode)
+    else:
+        # Destination may be read-only (copied from the Nix store by a previous setup)
+        add_write_permission(dst)
+        _clone_file(src, dst)
+        shutil.copystat(src, dst)
+        add_write_permission(dst)
+
+
+def _copy_with_header(src, dst):
+    """Copy file, adding license header to its content if it does not have one.
+    Files that already have a header are copied with their metadata.
+    returns: header status (see `manage_headers.add_build_header()`)
+    """
+    with open(src, "rb") as f:
+        data = f.read()
+    data, header_status = manage_headers.add_build_header(dst, data)
+    if not header_status:
+        _copy_data(src, dst)
+        return header_status
+    add_write_permission(dst)
+    _write_data(dst, data)
+    os.chmod(dst, stat.S_IMODE(os.stat(src).st_mode) | 0o220)
+    return header_status
+
+
+def _has_same_content(src, dst):
+    """Check if the destination file exists and has the same content as the source"""
+    try:
+        if os.path.islink(dst) or os.path.getsize(src) != os.path.getsize(dst):
+            return False
+        return filecmp.cmp(src, dst, shallow=False)
+    except OSError:
+        return False
+
+
+def _clone_file(src, dst):
+    """Copy data of a file. Uses a reflink (copy-on-write clone) on file systems that
+    support it, or a regular (kernel side) copy otherwise.
+    Hardlinks are not used: files of the build directory are modified in place by
+    later setup stages, which would also modify the source files.
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            return
+        except OSError:
+            pass
+    shutil.copyfile(src, dst)
+
+
+def copy_tree(src, dst, ignore=None, copy_function=copy_file):
+    """Copy directory tree into destination directory (merging with existing files),
+    and track copied files in the manifest.
+    Directories and files copied get user and group write permissions.
+    Files are copied by a thread pool if the current run uses more than one job.
+    param src: source directory
+    param dst: destination directory
+    param ignore: optional ignore function for `shutil.copytree()`
+    param copy_function: function used to copy each file
+    """
+    record_input_dir(src)
+    # Create directory tree, and list files to copy
+    copies = []
+    shutil.copytree(
+        src,
+        dst,
+        dirs_exist_ok=True,
+        ignore=ignore,
+        copy_function=lambda s, d: copies.append((s, d)),
+    )
+    # `shutil.copytree()` copies permissions of source directories (read-only in the
+    # Nix store). Fix only the directories of this tree.
+    add_write_permission(dst)
+    for root, dirs, _ in os.walk(src, followlinks=True):
+        dst_root = os.path.join(dst, os.path.relpath(root, src))
+        for name in dirs:
+            add_write_permission(os.path.join(dst_root, name))
+
+    jobs = min(get_context().jobs, len(copies))
+    # Generation tasks of subblocks already run in parallel
+    if jobs > 1 and get_task_seq() is None:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, copy_function, s, d)
+                for s, d in copies
+            ]
+        for future in futures:
+            future.result()
+    else:
+        for s, d in copies:
+            copy_function(s, d)
+
+
+@contextlib.contextmanager
+def _claim_output(path):
+    """Check if the current generation task may write to given file, and lock the file
+    while it is written.
+    When subblocks are generated in parallel (see `parallel_setup.py`), files written by
+    several tasks keep the content of the task that comes last in serial order.
+    Yields True if the file may be written.
+    """
+    seq = get_task_seq()
+    if seq is None:
+        yield True
+        return
+    context = get_context()
+    path = os.path.abspath(path)
+    with context.output_locks[hash(path) % len(context.output_locks)]:
+        owner = context.output_owners.get(path)
+        if owner is not None and owner > seq:
+            yield False
+            return
+        context.output_owners[path] = seq
+        yield True
+
+
+def record_input(path):
+    """Record a file used to generate the build directory"""
+    get_context().build_inputs.add(os.path.abspath(path))
+
+
+def record_input_dir(path):
+    """Record a directory whose files are copied to the build directory. The directory
+    does not need to exist (files added to it later also change the build directory).
+    """
+    get_context().build_input_dirs.add(os.path.abspath(path))
+
+
+def record_output(path):
+    """Record a file generated in the build directory"""
+    get_context().build_outputs.add(os.path.abspath(path))
+
+
+def get_build_outputs(build_dir):
+    """Return sorted list of files generated in a build directory by the current run.
+    Includes files recorded by the generators, and files modified since the run
+    started (written by scripts that do not record their outputs).
+    """
+    context = get_context()
+    build_dir = os.path.abspath(build_dir)
+    outputs = []
+    for root, dirs, files in os.walk(build_dir):
+        if root == build_dir and PY2HWSW_BUILD_DIR in dirs:
+            dirs.remove(PY2HWSW_BUILD_DIR)
+        for file in files:
+            path = os.path.join(root, file)
+            if not os.path.isfile(path) or os.path.islink(path):
+                continue
+            if (
+                path in context.build_outputs
+                or os.stat(path).st_mtime_ns >= context.start_time_ns
+            ):
+                outputs.append(path)
+    return sorted(outputs)
+
+
+#
+# Verilog snippets
+#
+
+
+def _store_snippet(path, content):
+    context = get_context()
+    if isinstance(content, bytes):
+        content = content.decode()
+    with _claim_output(path) as claimed:
+        if claimed:
+            context.snippets[os.path.abspath(path)] = content
+
+
+def get_snippet(path):
+    """Return content of a Verilog snippet kept in memory, or None if it is not"""
+    return get_context().snippets.get(os.path.abspath(path))
+
+
+def get_snippets(root):
+    """Return Verilog snippets kept in memory inside given directory.
+    returns: dictionary of absolute snippet path -> content
+    """
+    root = os.path.abspath(root)
+    return {
+        path: content
+        for path, content in get_context().snippets.items()
+        if path.startswith(root + os.sep)
+    }
+
+
+def remove_snippets(paths):
+    """Remove Verilog snippets kept in memory (after their includes were replaced)"""
+    snippets = get_context().snippets
+    for path in paths:
+        snippets.pop(os.path.abspath(path), None)
+
+
+def write_snippets(root):
+    """Write Verilog snippets kept in memory inside given directory to disk"""
+    for path, content in sorted(get_snippets(root).items()):
+        _write_file(path, content)
+        remove_snippets([path])
+
+
+#
+# Verilog sources that include snippets
+#
+
+
+def _store_pending_source(path, data, final=False, source=None):
+    """Keep Verilog source in memory if it includes snippets, so that it is only
+    written once its include statements are replaced (see `write_pending_source()`).
+    returns: True if the source was kept in memory
+    """
+    context = get_context()
+    pending_sources = context.pending_sources
+    path = os.path.abspath(path)
+    if (
+        path.endswith(VERILOG_SOURCE_EXTENSIONS)
+        and SNIPPET_INCLUDE_RE.search(data)
+        and not any(
+            path.startswith(root + os.sep) for root in context.pending_sources_written
+        )
+    ):
+        pending_sources[path] = (data, final, source and os.path.abspath(source))
+        return True
+    # New content replaces source kept in memory
+    pending_sources.pop(path, None)
+    return False
+
+
+def _store_pending_copy(src, dst):
+    """Keep copied Verilog source in memory if it includes snippets"""
+    if not dst.endswith(VERILOG_SOURCE_EXTENSIONS):
+        return False
+    with open(src, "rb") as f:
+        data = f.read()
+    return _store_pending_source(dst, data, source=src)
+
+
+def is_pending_source(path):
+    """Check if a Verilog source is kept in memory until its includes are replaced"""
+    return os.path.abspath(path) in get_context().pending_sources
+
+
+def get_pending_source(path):
+    """Return content (bytes) of a Verilog source kept in memory, or None if it is not"""
+    entry = get_context().pending_sources.get(os.path.abspath(path))
+    return entry and entry[0]
+
+
+def get_pending_sources(root):
+    """Return Verilog sources kept in memory inside given directory.
+    returns: dictionary of absolute path -> content (bytes)
+    """
+    root = os.path.abspath(root)
+    return {
+        path: entry[0]
+        for path, entry in get_context().pending_sources.items()
+        if path.startswith(root + os.sep)
+    }
+
+
+def write_pending_source(path, content=None, final=None):
+    """Write a Verilog source kept in memory to disk.
+    param path: path of the source
+    param content: content to write (with its include statements replaced). By
+                   default, the content kept in memory is written.
+    param final: if the content is final (see `write_file()`). By default, the value
+                 given when the source was kept in memory.
+    returns: True if the file was written, False if it was not (or is no longer) kept
+             in memory, or already had that content
+    """
+    entry = get_context().pending_sources.pop(os.path.abspath(path), None)
+    if entry is None:
+        return False
+    data, pending_final, source = entry
+    written = _write_file(
+        path,
+        data if content is None else content,
+        pending_final if final is None else final,
+        source,
+        keep_pending=False,
+    )
+    if source and os.path.isfile(path):
+        # Same permissions as the source file (like a copy), and write permission
+        os.chmod(path, stat.S_IMODE(os.stat(source).st_mode) | 0o220)
+    return written
+
+
+def write_pending_sources(root):
+    """Write Verilog sources kept in memory inside given directory to disk, without
+    replacing their include statements. Sources written inside that directory later
+    (after the include statements were replaced) are written directly.
+    """
+    get_context().pending_sources_written.add(os.path.abspath(root))
+    for path in sorted(get_pending_sources(root)):
+        write_pending_source(path)
+
+
+#
+# Duplicate sources
+#
+
+
+def register_duplicate_sources(main_folder, subfolders):
+    """Register folders whose sources are not written if a source with the same
+    relative path exists in a main folder.
+    param main_folder: path of the main folder (like `<build_dir>/hardware/src`)
+    param subfolders: list of paths of folders that may have duplicate sources
+    """
+    get_context().duplicate_source_rules.append(
+        (
+            os.path.abspath(main_folder),
+            [os.path.abspath(folder) for folder in subfolders],
+        )
+    )
+
+
+def _get_main_sources(path):
+    """Return list of main sources that would make given file a duplicate"""
+    main_sources = []
+    for main_folder, subfolders in get_context().duplicate_source_rules:
+        for folder in subfolders:
+            if path.startswith(folder + os.sep):
+                main_sources.append(
+                    os.path.join(main_folder, os.path.relpath(path, folder))
+                )
+    return main_sources
+
+
+def _get_duplicates(path):
+    """Return list of sources that would be duplicates of given (main) file"""
+    duplicates = []
+    for main_folder, subfolders in get_context().duplicate_source_rules:
+        if path.startswith(main_folder + os.sep):
+            rel_path = os.path.relpath(path, main_folder)
+            duplicates += [os.path.join(folder, rel_path) for folder in subfolders]
+    return duplicates
+
+
+def _remove_duplicate(path, main_source):
+    context = get_context()
+    context.build_sources.pop(path, None)
+    context.pending_sources.pop(path, None)
+    context.duplicate_sources[path] = main_source
+    if os.path.isfile(path):
+        os.remove(path)
+
+
+def _add_source(path, source=None):
+    """Record a source written to the build directory in the ledger, and resolve its
+    duplicates. Sources written before that duplicate this one are removed.
+    Verilog snippets are never duplicates (they are removed after being included).
+    param path: path of the file
+    param source: path of the file that it was copied from (None if generated)
+    returns: False if the file is a duplicate (must not be written), True otherwise
+    """
+    context = get_context()
+    path = os.path.abspath(path)
+    source = source and os.path.abspath(source)
+    if not context.duplicate_source_rules or path.endswith(".vs"):
+        context.build_sources[path] = source
+        return True
+    with context.sources_lock:
+        for duplicate in _get_duplicates(path):
+            if duplicate in context.build_sources:
+                _remove_duplicate(duplicate, path)
+        for main_source in _get_main_sources(path):
+            # Main sources that are duplicates themselves also count (they existed
+            # when the duplicates of their folder were resolved)
+            if (
+                main_source in context.build_sources
+                or main_source in context.duplicate_sources
+            ):
+                context.build_sources.pop(path, None)
+                context.duplicate_sources[path] = main_source
+                return False
+        context.build_sources[path] = source
+        context.duplicate_sources.pop(path, None)
+    return True
+
+
+def record_source(path):
+    """Record a source found in the build directory, that was written by scripts that do
+    not use `write_file()`/`copy_file()`, and resolve its duplicates. The source is
+    removed if it duplicates a main source.
+    returns: False if the source was removed, True otherwise
+    """
+    if os.path.abspath(path) in get_context().build_sources:
+        return True
+    if _add_source(path):
+        return True
+    if os.path.isfile(path):
+        os.remove(path)
+    return False
+
+
+def is_duplicate_source(path):
+    """Check if a file was not written because it duplicates a main source"""
+    return os.path.abspath(path) in get_context().duplicate_sources
+
+
+def resolve_duplicate_sources():
+    """Remove duplicate sources that were not resolved when written: sources written
+    by parallel generation tasks at the same time as their main source, and sources
+    whose main source (or duplicate) was written by scripts that do not use
+    `write_file()`/`copy_file()`. Only files in the ledger are checked.
+    """
+    context = get_context()
+    with context.sources_lock:
+        for path in list(context.build_sources):
+            if path.endswith(".vs") or path not in context.build_sources:
+                continue
+            for main_source in _get_main_sources(path):
+                if (
+                    os.path.isfile(main_source)
+                    or main_source in context.duplicate_sources
+                ):
+                    _remove_duplicate(path, main_source)
+                    break
+            else:
+                if not os.path.isfile(path):
+                    continue
+                for duplicate in _get_duplicates(path):
+                    if os.path.isfile(duplicate):
+                        _remove_duplicate(duplicate, path)
+
+
+def _write_sources_json(build_dir):
+    """Store ledger of the sources of a build directory"""
+    context = get_context()
+
+    def rel(path):
+        return os.path.relpath(path, build_dir)
+
+    def in_build_dir(path):
+        return path.startswith(build_dir + os.sep) and not rel(path).startswith(
+            PY2HWSW_BUILD_DIR + os.sep
+        )
+
+    sources = {
+        rel(path): source
+        for path, source in context.build_sources.items()
+        if in_build_dir(path) and os.path.isfile(path)
+    }
+    duplicates = {
+        rel(path): rel(main_source)
+        for path, main_source in context.duplicate_sources.items()
+        if in_build_dir(path)
+    }
+    with open(os.path.join(build_dir, PY2HWSW_BUILD_DIR, SOURCES_NAME), "w") as f:
+        json.dump(
+            {
+                "format_version": MANIFEST_FORMAT_VERSION,
+                "sources": sources,
+                "duplicates": duplicates,
+            },
+            f,
+            indent=1,
+            sort_keys=True,
+        )
+
+
+#
+# Manifest
+#
+
+
+def _file_hash(path):
+    hash = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            hash.update(chunk)
+    return hash.hexdigest()
+
+
+def _file_entry(path, previous_entry=None):
+    """Return manifest entry for a file. Reuse hash of previous entry if file did not
+    change since then."""
+    st = os.stat(path)
+    if (
+        previous_entry
+        and previous_entry["mtime_ns"] == st.st_mtime_ns
+        and previous_entry["size"] == st.st_size
+    ):
+        sha1 = previous_entry["sha1"]
+    else:
+        sha1 = _file_hash(path)
+    return {"sha1": sha1, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _dir_listing_hash(path, build_dir):
+    """Return hash of the names of every file and directory in a directory tree (None if
+    the directory does not exist). Skips the build directory and python caches.
+    """
+    if not os.path.isdir(path):
+        return None
+    names = []
+    for root, dirs, files in os.walk(path, followlinks=True):
+        dirs[:] = [
+            name
+            for name in dirs
+            if name != "__pycache__" and os.path.join(root, name) != build_dir
+        ]
+        rel_root = os.path.relpath(root, path)
+        names += [os.path.join(rel_root, name) + "/" for name in dirs]
+        names += [os.path.join(rel_root, name) for name in files]
+    return hashlib.sha1("\0".join(sorted(names)).encode()).hexdigest()
+
+
+def _is_unchanged(path, entry):
+    """Check if file matches given manifest entry"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    if st.st_mtime_ns == entry["mtime_ns"] and st.st_size == entry["size"]:
+        return True
+    return st.st_size == entry["size"] and _file_hash(path) == entry["sha1"]
+
+
+def get_manifest_path(build_dir):
+    return os.path.join(build_dir, PY2HWSW_BUILD_DIR, MANIFEST_NAME)
+
+
+def read_manifest(build_dir):
+    """Read manifest of a build directory. Returns None if it does not exist."""
+    try:
+        with open(get_manifest_path(build_dir), "r") as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != MANIFEST_FORMAT_VERSION:
+            return None
+        return manifest
+    except (OSError, ValueError):
+        return None
+
+
+def begin_build(build_dir):
+    """Called before generating files in a build directory.
+    Stores previous manifest and checks which of its outputs were not modified since
+    then (only those may get their mtime restored).
+    """
+    build_dir = os.path.abspath(build_dir)
+    previous_manifests = get_context().previous_manifests
+    if build_dir in previous_manifests:
+        return
+    manifest = read_manifest(build_dir) or {
+        "inputs": {},
+        "input_dirs": {},
+        "outputs": {},
+    }
+    for rel_path, entry in manifest["outputs"].items():
+        try:
+            st = os.stat(os.path.join(build_dir, rel_path))
+            entry["pristine"] = (
+                st.st_mtime_ns == entry["mtime_ns"] and st.st_size == entry["size"]
+            )
+        except OSError:
+            entry["pristine"] = False
+    previous_manifests[build_dir] = manifest
+
+
+def finish_build(build_dir):
+    """Called at the end of the setup of a build directory.
+    Restores mtimes of outputs that did not change, and writes the new manifest (and
+    the ledger of sources).
+    """
+    context = get_context()
+    build_dir = os.path.abspath(build_dir)
+    previous = context.previous_manifests.pop(build_dir, None) or {
+        "inputs": {},
+        "input_dirs": {},
+        "outputs": {},
+    }
+    previous_outputs = previous["outputs"]
+
+    outputs = {}
+    for root, dirs, files in os.walk(build_dir):
+        if root == build_dir and PY2HWSW_BUILD_DIR in dirs:
+            dirs.remove(PY2HWSW_BUILD_DIR)
+        for file in files:
+            path = os.path.join(root, file)
+            rel_path = os.path.relpath(path, build_dir)
+            if not os.path.isfile(path) or os.path.islink(path):
+                continue
+            if not (
+                path in context.build_outputs
+                or rel_path in previous_outputs
+                or os.stat(path).st_mtime_ns >= context.start_time_ns
+            ):
+                continue
+            previous_entry = previous_outputs.get(rel_path)
+            entry = _file_entry(path, previous_entry)
+            # Restore mtime of output files rewritten with the same content
+            if (
+                previous_entry
+                and previous_entry["pristine"]
+                and previous_entry["sha1"] == entry["sha1"]
+                and previous_entry["mtime_ns"] != entry["mtime_ns"]
+            ):
+                os.utime(
+                    path, ns=(os.stat(path).st_atime_ns, previous_entry["mtime_ns"])
+                )
+                entry["mtime_ns"] = previous_entry["mtime_ns"]
+            outputs[rel_path] = entry
+
+    # Py2HWSW's own scripts are also inputs
+    scripts_dir = os.path.dirname(os.path.abspath(__file__))
+    for file in os.listdir(scripts_dir):
+        if file.endswith(".py"):
+            record_input(os.path.join(scripts_dir, file))
+    inputs = {}
+    for path in sorted(context.build_inputs):
+        if path.startswith(build_dir + os.sep) or not os.path.isfile(path):
+            continue
+        inputs[path] = _file_entry(path, previous["inputs"].get(path))
+    input_dirs = {}
+    for path in sorted(context.build_input_dirs):
+        if path == build_dir or path.startswith(build_dir + os.sep):
+            continue
+        input_dirs[path] = _dir_listing_hash(path, build_dir)
+
+    manifest = {
+        "format_version": MANIFEST_FORMAT_VERSION,
+        "py2hwsw_version": PY2HWSW_VERSION,
+        "args": context.build_args,
+        "inputs": inputs,
+        "input_dirs": input_dirs,
+        "outputs": outputs,
+    }
+    os.makedirs(os.path.join(build_dir, PY2HWSW_BUILD_DIR), exist_ok=True)
+    with open(get_manifest_path(build_dir), "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    _write_sources_json(build_dir)
+
+
+def check_build(build_dir):
+    """Check if build directory is up to date, based on its manifest.
+    returns: List of reasons why build directory is out of date. Empty if up to date.
+    """
+    manifest = read_manifest(build_dir)
+    if not manifest:
+        return [f"No manifest found in '{build_dir}'"]
+    build_args = get_context().build_args
+    reasons = []
+    if manifest["py2hwsw_version"] != PY2HWSW_VERSION:
+        reasons.append(
+            f"Py2HWSW version changed: {manifest['py2hwsw_version']} -> {PY2HWSW_VERSION}"
+        )
+    if manifest["args"] != json.loads(json.dumps(build_args)):
+        reasons.append(f"Arguments changed: {manifest['args']} -> {build_args}")
+    for path, entry in manifest["inputs"].items():
+        if not _is_unchanged(path, entry):
+            reasons.append(f"Input changed: {path}")
+    build_dir = os.path.abspath(build_dir)
+    for path, listing_hash in manifest["input_dirs"].items():
+        if _dir_listing_hash(path, build_dir) != listing_hash:
+            reasons.append(f"Files added or removed in input directory: {path}")
+    for rel_path, entry in manifest["outputs"].items():
+        if not _is_unchanged(os.path.join(build_dir, rel_path), entry):
+            reasons.append(f"Output changed: {rel_path}")
+    return reasons
+
+
+def print_check_build(build_dir):
+    """Print if build directory is up to date. Exit with code 1 if it is not."""
+    reasons = check_build(build_dir)
+    if not reasons:
+        print(
+            f"{iob_colors.INFO}Build directory '{build_dir}' is up to date.{iob_colors.ENDC}"
+        )
+        return
+    print(
+        f"{iob_colors.WARNING}Build directory '{build_dir}' is out of date:{iob_colors.ENDC}"
+    )
+    for reason in reasons[:20]:
+        print(f"  - {reason}")
+    if len(reasons) > 20:
+        print(f"  ... and {len(reasons) - 20} more.")
+    sys.exit(1)
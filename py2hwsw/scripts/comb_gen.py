@@ -4,6 +4,8 @@
 #
 # SPDX-License-Identifier: MIT
 
+from build_files import open_file
+
 
 def generate_comb(core):
     """Generate verilog code with the comb of this module.
@@ -21,5 +23,5 @@ def generate_comb_snippet(core):
     """
     code = generate_comb(core)
     out_dir = core.build_dir + "/hardware/src"
-    with open(f"{out_dir}/{core.name}_comb.vs", "w+") as f:
+    with open_file(f"{out_dir}/{core.name}_comb.vs", "w") as f:
         f.write(code)
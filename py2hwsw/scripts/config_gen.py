@@ -8,6 +8,7 @@ import os
 import re
 
 from latex import write_table
+from build_files import open_file
 
 
 def conf_vh(macros, top_module, out_dir):
@@ -16,7 +17,7 @@ def conf_vh(macros, top_module, out_dir):
     :param top_module: top module name
     :param out_dir: output directory
     """
-    file2create = open(f"{out_dir}/{top_module}_conf.vh", "w")
+    file2create = open_file(f"{out_dir}/{top_module}_conf.vh", "w")
     core_prefix = f"{top_module}_".upper()
 
     # These ifndefs cause issues when this file is included in multiple files and it contains other ifdefs inside this block.
@@ -85,6 +86,8 @@ def conf_vh(macros, top_module, out_dir):
             if macro.if_defined or macro.if_not_defined:
                 file2create.write("`endif\n")
 
+    file2create.close()
+
 
 def conf_h(macros, top_module, out_dir):
     """Given a list with groups of macros, generate a `*_conf.h` file with the software macro definitions.
@@ -95,7 +98,7 @@ def conf_h(macros, top_module, out_dir):
     if len(macros) == 0:
         return
     os.makedirs(out_dir, exist_ok=True)
-    file2create = open(f"{out_dir}/{top_module}_conf.h", "w")
+    file2create = open_file(f"{out_dir}/{top_module}_conf.h", "w")
     core_prefix = f"{top_module}_".upper()
     fname = f"{core_prefix}CONF"
     file2create.write(f"#ifndef H_{fname}_H\n")
@@ -126,7 +129,7 @@ def conf_h(macros, top_module, out_dir):
 
 
 def config_build_mk(python_module, top_module):
-    file2create = open(f"{python_module.build_dir}/config_build.mk", "w")
+    file2create = open_file(f"{python_module.build_dir}/config_build.mk", "w")
     file2create.write(f"NAME={python_module.name}\n")
     file2create.write("CSR_IF ?=iob\n")
     file2create.write(f"BUILD_DIR_NAME={top_module.build_dir.split('/')[-1]}\n")
@@ -150,13 +153,13 @@ endif
 
 # Append a string to the config_build.mk
 def append_str_config_build_mk(str_2_append, build_dir):
-    file = open(f"{build_dir}/config_build.mk", "a")
+    file = open_file(f"{build_dir}/config_build.mk", "a")
     file.write(str_2_append)
     file.close()
 
 
 def generate_config_tex(confs, out_dir):
-    confs_file = open(f"{out_dir}/config.tex", "w")
+    confs_file = open_file(f"{out_dir}/config.tex", "w")
 
     # Find all conf types present
     conf_types = []
@@ -273,7 +276,7 @@ def generate_confs_tex(confs, out_dir):
         write_table(f"{out_dir}/{group.name}_confs", tex_table)
 
         # Write list of derived parameters
-        file2create = open(f"{out_dir}/derived_params.tex", "w")
+        file2create = open_file(f"{out_dir}/derived_params.tex", "w")
         file2create.write("\\begin{description}\n")
         for derv_param in derv_params:
             # replace underscores and $clog2 with \_ and $\log_2
@@ -285,9 +288,10 @@ def generate_confs_tex(confs, out_dir):
                 f"  \\item[{derv_param[0]}] {derv_param[2]} Value: {derv_param[1]}.\n"
             )
         file2create.write("\\end{description}\n")
+        file2create.close()
 
         # Write list of constants
-        file2create = open(f"{out_dir}/constants.tex", "w")
+        file2create = open_file(f"{out_dir}/constants.tex", "w")
         file2create.write("\\begin{description}\n")
         for constant in constants:
             # replace underscores and $clog2 with \_ and $\log_2
@@ -312,6 +316,7 @@ def generate_confs_tex(confs, out_dir):
                     f"  \\item[{constant[0]}] {constant[2]} Value: {constant[1]}.\n"
                 )
         file2create.write("\\end{description}\n")
+        file2create.close()
 
 
 def generate_confs(core):
@@ -4,6 +4,7 @@
 
 # This module copies sources to the build directory
 import os
+import re
 import sys
 import subprocess
 from pathlib import Path
@@ -12,7 +13,10 @@ import importlib.util
 
 # IObundle scripts imported:
 import iob_colors
-from iob_base import nix_permission_hack
+from iob_base import add_write_permission
+from core_index import get_index
+import build_files
+from build_files import open_file, write_file
 
 
 def get_lib_dir():
@@ -55,13 +59,11 @@ def sim_setup(python_module):
     sim_dir = "hardware/simulation"
 
     # Copy LIB sim files
-    shutil.copytree(
+    build_files.copy_tree(
         f"{get_lib_dir()}/{sim_dir}",
         f"{build_dir}/{sim_dir}",
-        dirs_exist_ok=True,
         ignore=shutil.ignore_patterns("*.pdf", "*.py"),
     )
-    nix_permission_hack(f"{build_dir}/{sim_dir}")
 
     if python_module.is_tester:
         # Append UUT's verilog sources in Tester's simulation Makefile
@@ -114,13 +116,11 @@ def fpga_setup(python_module):
     tools_list = ["quartus", "vivado"]
 
     # Copy common fpga files in the fpga_dir (except for the directories in the tools list)
-    shutil.copytree(
+    build_files.copy_tree(
         src_dir,
         dst_dir,
-        dirs_exist_ok=True,
         ignore=shutil.ignore_patterns("*.pdf", "*.py", *tools_list),
     )
-    nix_permission_hack(dst_dir)
 
     if python_module.is_tester:
         # Append UUT's verilog sources in Tester's simulation Makefile
@@ -156,20 +156,18 @@ INCLUDE_DIRS+=../../{python_module.relative_path_to_UUT}/hardware/src
                 os.makedirs(os.path.join(dst_dir, tool), exist_ok=True)
                 setup_tool_dir = os.path.join(src_dir, tool)
                 # Copy only files (not directories) in tool directory
+                build_files.record_input_dir(setup_tool_dir)
                 for file in os.listdir(setup_tool_dir):
                     setup_tool_file = os.path.join(setup_tool_dir, file)
                     dst_file = os.path.join(dst_dir, tool, file)
                     if os.path.isfile(setup_tool_file):
-                        shutil.copy2(setup_tool_file, dst_file)
-                        nix_permission_hack(dst_file)
+                        build_files.copy_file(setup_tool_file, dst_file)
                 # then copy the fpga directory (excluding 'doc' directory)
-                shutil.copytree(
+                build_files.copy_tree(
                     setup_fpga_dir,
                     os.path.join(dst_dir, tool, fpga),
-                    dirs_exist_ok=True,
                     ignore=shutil.ignore_patterns("doc", "*.py"),
                 )
-                nix_permission_hack(os.path.join(dst_dir, tool, fpga))
 
 
 def lint_setup(python_module):
@@ -177,22 +175,10 @@ def lint_setup(python_module):
     lint_dir = "hardware/lint"
 
     # Copy LIB lint files
-    shutil.copytree(
-        f"{get_lib_dir()}/{lint_dir}",
-        f"{build_dir}/{lint_dir}",
-        dirs_exist_ok=True,
-    )
-    nix_permission_hack(f"{build_dir}/{lint_dir}")
+    build_files.copy_tree(f"{get_lib_dir()}/{lint_dir}", f"{build_dir}/{lint_dir}")
 
     # Write header of verilator lint config file
-    old_content = ""
-    file_path = f"{build_dir}/{lint_dir}/verilator_config.vlt"
-    if os.path.isfile(file_path):
-        with open(file_path, "r") as file:
-            old_content = file.read()
-    with open(file_path, "w") as file:
-        file.write(
-            f"""
+    header = f"""
 // SPDX-FileCopyrightText: 2025 IObundle
 //
 // SPDX-License-Identifier: MIT
@@ -200,8 +186,16 @@ def lint_setup(python_module):
 // Header lines generated by {os.path.basename(__file__)}
 `verilator_config
 """
-            + old_content
-        )
+    old_content = ""
+    file_path = f"{build_dir}/{lint_dir}/verilator_config.vlt"
+    if os.path.isfile(file_path):
+        with open(file_path, "r") as file:
+            old_content = file.read()
+        # Don't repeat header written by a previous setup
+        if old_content.startswith(header):
+            old_content = old_content[len(header) :]
+    with open_file(file_path, "w") as file:
+        file.write(header + old_content)
 
     if python_module.is_tester:
         # Append UUT's verilog sources in Tester's simulation Makefile
@@ -235,6 +229,7 @@ def syn_setup(python_module):
     build_dir = python_module.build_dir
     syn_dir = "hardware/syn"
 
+    build_files.record_input_dir(f"{get_lib_dir()}/{syn_dir}")
     for file in Path(f"{get_lib_dir()}/{syn_dir}").rglob("*"):
         src_file = file.as_posix()
         dest_file = os.path.join(
@@ -242,8 +237,7 @@ def syn_setup(python_module):
         )
         if os.path.isfile(src_file):
             os.makedirs(os.path.dirname(dest_file), exist_ok=True)
-            shutil.copyfile(f"{src_file}", f"{dest_file}")
-            nix_permission_hack(dest_file)
+            build_files.copy_file(f"{src_file}", f"{dest_file}")
 
     if python_module.is_tester:
         # Append UUT's verilog sources in Tester's simulation Makefile
@@ -319,10 +313,7 @@ def sw_setup(python_module):
 
     # os.makedirs(build_dir + "/software/src",
     # Copy LIB software Makefile
-    shutil.copytree(
-        f"{get_lib_dir()}/software", f"{build_dir}/software", dirs_exist_ok=True
-    )
-    nix_permission_hack(f"{build_dir}/software")
+    build_files.copy_tree(f"{get_lib_dir()}/software", f"{build_dir}/software")
 
     # Create 'scripts/' directory
     python_setup(build_dir)
@@ -340,7 +331,9 @@ def python_setup(build_dir):
         "makehex.py",
         "hex_join.py",
     ]:
-        shutil.copy(f"{get_lib_dir()}/scripts/{file}", f"{dest_dir}/{file}")
+        build_files.copy_file(
+            f"{get_lib_dir()}/scripts/{file}", f"{dest_dir}/{file}"
+        )
         os.chmod(f"{dest_dir}/{file}", 0o755)
 
 
@@ -351,15 +344,16 @@ def doc_setup(python_module):
     for subdir in doc_subdirs:
         # Copy LIB tex subdir files if not present
         os.makedirs(f"{build_dir}/document/{subdir}", exist_ok=True)
+        build_files.record_input_dir(f"{get_lib_dir()}/document/{subdir}")
         for file in os.listdir(f"{get_lib_dir()}/document/{subdir}"):
-            shutil.copy2(
+            build_files.copy_file(
                 f"{get_lib_dir()}/document/{subdir}/{file}", f"{build_dir}/document/{subdir}/{file}"
             )
-            nix_permission_hack(f"{build_dir}/document/{subdir}/{file}")
 
     # Copy document Makefile
-    shutil.copy2(f"{get_lib_dir()}/document/Makefile", f"{build_dir}/document/Makefile")
-    nix_permission_hack(f"{build_dir}/document/Makefile")
+    build_files.copy_file(
+        f"{get_lib_dir()}/document/Makefile", f"{build_dir}/document/Makefile"
+    )
 
     # General documentation
     write_git_revision_short_hash(f"{build_dir}/document/tsrc")
@@ -371,7 +365,7 @@ def write_git_revision_short_hash(dst_dir):
     # Use the shortHash.tex from the setup directory if it exists
     # This file is present in pip installations (cannot use git rev-parse in pip installations)
     if os.path.isfile(setup_dir_file):
-        shutil.copy2(
+        build_files.copy_file(
             setup_dir_file,
             f"{dst_dir}/{file_name}",
         )
@@ -388,7 +382,7 @@ def write_git_revision_short_hash(dst_dir):
 
     if not (os.path.exists(dst_dir)):
         os.makedirs(dst_dir)
-    with open(f"{dst_dir}/{file_name}", "w") as file:
+    with open_file(f"{dst_dir}/{file_name}", "w") as file:
         file.write(text)
 
 
@@ -414,9 +408,9 @@ def lib_module_setup(
     module_path = None
 
     # Search for module_name.py
-    for mod_path in Path(lib_dir).rglob(f"{module_name}.py"):
-        module_path = mod_path
-        break
+    rel_path = get_index(lib_dir).find(module_name, [".py"])
+    if rel_path:
+        module_path = Path(lib_dir, rel_path)
     # If module_name.py is not found, search for module_name.module_extension
     if not module_path:
         for mod_path in Path(lib_dir).rglob(f"{module_name}{module_extension}"):
@@ -470,7 +464,7 @@ def copy_files(src_dir, dest_dir, sources=[], pattern="*", copy_all=False):
                     or (os.stat(src_file).st_mtime < os.stat(dest_file).st_mtime)
                 ):
                     shutil.copy(src_file, dest_file)
-                    nix_permission_hack(dest_file)
+                    add_write_permission(dest_file)
                     files_copied.append(file)
                 elif not (os.path.isfile(src_file)):
                     print(
@@ -502,10 +496,10 @@ def version_file(
 
     os.makedirs(tex_dir, exist_ok=True)
     tex_file = f"{tex_dir}/{core_name}_version.tex"
-    with open(tex_file, "w") as tex_f:
+    with open_file(tex_file, "w") as tex_f:
         tex_f.write(core_version)
     tex_file = f"{tex_dir}/{core_name}_previous_version.tex"
-    with open(tex_file, "w") as tex_f:
+    with open_file(tex_file, "w") as tex_f:
         tex_f.write(core_previous_version)
 
 
@@ -513,37 +507,53 @@ def copy_with_rename(old_core_name, new_core_name):
     """Creates a function that:
     - Renames any '<old_core_name>' string inside the src file and in its filename,
     to the given '<new_core_name>' string argument.
+    Files are copied without changes if both names are equal, or if they are binary
+    (not utf-8 encoded).
     """
+    if old_core_name == new_core_name:
+        return lambda src, dst: build_files.copy_file(src, dst)
+
+    # Replace both lower and upper case names in a single pass
+    replacements = {
+        old_core_name: new_core_name,
+        old_core_name.upper(): new_core_name.upper(),
+    }
+    rename_re = re.compile("|".join(re.escape(old) for old in replacements))
+
+    def rename(text):
+        return rename_re.sub(lambda m: replacements[m.group(0)], text)
 
     def copy_func(src, dst):
-        # Add write permission due to Nix hack
-        nix_permission_hack(os.path.dirname(dst))
-        dst = os.path.join(
-            os.path.dirname(dst),
-            os.path.basename(
-                dst.replace(old_core_name, new_core_name).replace(
-                    old_core_name.upper(), new_core_name.upper()
-                )
-            ),
-        )
+        dst = os.path.join(os.path.dirname(dst), rename(os.path.basename(dst)))
         # print(f"### DEBUG: {src} {dst}", file=sys.stderr)
+        # Add write permission due to Nix hack
+        # (destination may be read-only if it was copied by a previous setup)
+        add_write_permission(os.path.dirname(dst))
+        with open(src, "rb") as file:
+            data = file.read()
         try:
-            file_perms = os.stat(src).st_mode
-            with open(src, "r") as file:
-                lines = file.readlines()
-            for idx in range(len(lines)):
-                lines[idx] = (
-                    lines[idx]
-                    .replace(old_core_name, new_core_name)
-                    .replace(old_core_name.upper(), new_core_name.upper())
-                )
-            with open(dst, "w") as file:
-                file.writelines(lines)
-        except Exception:
-            shutil.copyfile(src, dst)
+            text = data.decode()
+        except UnicodeDecodeError:
+            # Binary file
+            build_files.copy_file(src, dst)
+            return
+        build_files.record_input(src)
+        if "\r" in text:
+            # Use same line endings as python's text mode
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        add_write_permission(dst)
+        write_file(dst, rename(text), source=src)
+        # Duplicate sources, and Verilog snippets and sources kept in memory are not on
+        # disk (sources kept in memory get the permissions of their source when written)
+        if (
+            build_files.is_duplicate_source(dst)
+            or build_files.get_snippet(dst) is not None
+            or build_files.is_pending_source(dst)
+        ):
+            return
         # Set file permissions equal to source file
         # and add write permission due to Nix hack
-        os.chmod(dst, file_perms | 0o200)
+        os.chmod(dst, os.stat(src).st_mode | 0o220)
 
     return copy_func
 
@@ -565,11 +575,10 @@ def copy_rename_setup_subdir(core, directory, exclude_file_list=[]):
         if core.use_netlist:
             # copy SETUP_DIR/CORE.v netlist instead of
             # SETUP_DIR/hardware/src
-            shutil.copyfile(
+            build_files.copy_file(
                 os.path.join(core.setup_dir, f"{core.name}.v"),
                 os.path.join(core.build_dir, dst_directory, f"{core.name}.v"),
             )
-            nix_permission_hack(os.path.join(core.build_dir, dst_directory))
             return
     elif directory == "hardware/fpga":
         # Skip if board_list is empty
@@ -579,10 +588,9 @@ def copy_rename_setup_subdir(core, directory, exclude_file_list=[]):
         tools_list = ["quartus", "vivado"]
 
         # Copy everything except the tools directories
-        shutil.copytree(
+        build_files.copy_tree(
             os.path.join(core.setup_dir, directory),
             os.path.join(core.build_dir, directory),
-            dirs_exist_ok=True,
             copy_function=copy_with_rename(core.original_name, core.name),
             ignore=shutil.ignore_patterns(*exclude_file_list, *tools_list),
         )
@@ -600,6 +608,7 @@ def copy_rename_setup_subdir(core, directory, exclude_file_list=[]):
                 # if the fpga directory is found, copy it to the build_dir
                 if os.path.isdir(setup_fpga_dir):
                     # Copy the tools directory files only
+                    build_files.record_input_dir(setup_tools_dir)
                     for file in os.listdir(setup_tools_dir):
                         setup_file = os.path.join(setup_tools_dir, file)
                         if os.path.isfile(setup_file):
@@ -608,10 +617,9 @@ def copy_rename_setup_subdir(core, directory, exclude_file_list=[]):
                                 os.path.join(build_tools_dir, file),
                             )
                     # Copy the fpga directory
-                    shutil.copytree(
+                    build_files.copy_tree(
                         setup_fpga_dir,
                         build_fpga_dir,
-                        dirs_exist_ok=True,
                         copy_function=copy_with_rename(core.original_name, core.name),
                         ignore=shutil.ignore_patterns(*exclude_file_list),
                     )
@@ -621,7 +629,6 @@ def copy_rename_setup_subdir(core, directory, exclude_file_list=[]):
                     f"Note: The setup FPGA directory '{fpga}' not found in subdirectories of '{core.setup_dir}/hardware/fpga/'"
                 )
 
-        nix_permission_hack(os.path.join(core.build_dir, directory))
         # No need to copy any more files in this directory
         return
 
@@ -634,14 +641,12 @@ def copy_rename_setup_subdir(core, directory, exclude_file_list=[]):
     #       The main branch used a dedicated script to copy doc files
     #       without renaming them. Maybe here we should try to
     #       implement it with a try catch block.
-    shutil.copytree(
+    build_files.copy_tree(
         os.path.join(core.setup_dir, directory),
         os.path.join(core.build_dir, dst_directory),
-        dirs_exist_ok=True,
         copy_function=copy_with_rename(core.original_name, core.name),
         ignore=shutil.ignore_patterns(*exclude_file_list),
     )
-    nix_permission_hack(os.path.join(core.build_dir, dst_directory))
 
 
 def copy_rename_setup_directory(core, exclude_file_list=["*.py"]):
@@ -678,13 +683,17 @@ def copy_rename_setup_directory(core, exclude_file_list=["*.py"]):
             "document",
         ]
 
+    # Files (and directories) added to the setup dir may be copied by the next setup
+    if core.setup_dir:
+        build_files.record_input_dir(core.setup_dir)
+
     # Copy sources
     for directory in dir_list:
         copy_rename_setup_subdir(core, directory, exclude_file_list)
 
     # Copy custom_config_build.mk file if it exists
     if os.path.isfile(os.path.join(core.setup_dir, "custom_config_build.mk")):
-        shutil.copyfile(
+        build_files.copy_file(
             os.path.join(core.setup_dir, "custom_config_build.mk"),
             os.path.join(core.build_dir, "custom_config_build.mk"),
         )
@@ -703,5 +712,5 @@ def replace_str_in_file(file_path, old_str, new_str):
     # Replace all occurrences
     new_file_str = file_str.replace(old_str, new_str)
 
-    with open(file_path, "w") as f:
+    with open_file(file_path, "w") as f:
         f.write(new_file_str)
@@ -0,0 +1,222 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+#
+#    core_index.py: index of core setup files (.py/.json) found under a directory
+#
+# Searching for a core's setup file used to walk the whole project root and the
+# py2hwsw directory for every core lookup. This module walks each search directory
+# once per run, and persists the result on disk so that following runs only need to
+# stat the directories of the tree to validate it.
+#
+# Note: This module must not depend on other py2hwsw modules, as it is also used by
+# `setup.py` to precompute the index of the py2hwsw library at install time.
+#
+
+import os
+import json
+import hashlib
+
+# Extensions of core setup files
+SETUP_FILE_EXTENSIONS = [".py", ".json"]
+# Version of the on-disk index format. Increment when the format changes.
+INDEX_FORMAT_VERSION = 1
+# Name of the precomputed index file of the py2hwsw directory (created at install time)
+INSTALLED_INDEX_NAME = "core_index.json"
+# Directories whose subdirectories are not searched for lib cores
+LIB_CORES_SKIP_DIRS = ["scripts", "test", "document"]
+
+# Indexes already loaded by this process. Keys are absolute paths of the indexed dirs.
+_loaded_indexes = {}
+
+
+def get_cache_dir():
+    """Return path of py2hwsw's cache directory.
+    Can be overridden by the `PY2HWSW_CACHE_DIR` environment variable.
+    """
+    cache_dir = os.environ.get("PY2HWSW_CACHE_DIR")
+    if not cache_dir:
+        cache_dir = os.path.join(
+            os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+            "py2hwsw",
+        )
+    return cache_dir
+
+
+class core_index:
+    """Index of setup files found under a given directory.
+    Stores the setup files in the same order as `os.walk()` finds them, so that
+    lookups return the same file as a walk of the directory would.
+    """
+
+    def __init__(self, root, files=None, dir_mtimes=None):
+        """
+        param root: absolute path of indexed directory
+        param files: list of [relative dir, [file names]] pairs, in walk order
+        param dir_mtimes: dictionary with mtimes of every directory walked.
+                          Empty if index does not need validation.
+        """
+        self.root = root
+        self.files = files if files is not None else []
+        self.dir_mtimes = dir_mtimes if dir_mtimes is not None else {}
+        # Dictionary of name (without extension) -> list of relative file paths
+        self.names = {}
+        for rel_dir, file_names in self.files:
+            for file in file_names:
+                file_name = os.path.splitext(file)[0]
+                self.names.setdefault(file_name, []).append(
+                    os.path.join(rel_dir, file)
+                )
+
+    @staticmethod
+    def build(root):
+        """Walk the given directory and build its index"""
+        files = []
+        dir_mtimes = {}
+        for dir_path, _, file_names in os.walk(root):
+            rel_dir = os.path.relpath(dir_path, root)
+            if rel_dir == ".":
+                rel_dir = ""
+            try:
+                dir_mtimes[rel_dir] = os.stat(dir_path).st_mtime_ns
+            except OSError:
+                continue
+            setup_files = [
+                f
+                for f in file_names
+                if os.path.splitext(f)[1] in SETUP_FILE_EXTENSIONS
+            ]
+            if setup_files:
+                files.append([rel_dir, setup_files])
+        return core_index(root, files, dir_mtimes)
+
+    def is_valid(self):
+        """Check if the indexed directory tree did not change since the index was built.
+        A directory's mtime changes whenever entries are created, removed or renamed in it.
+        """
+        for rel_dir, mtime in self.dir_mtimes.items():
+            try:
+                if os.stat(os.path.join(self.root, rel_dir)).st_mtime_ns != mtime:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def to_dict(self, with_mtimes=True):
+        return {
+            "version": INDEX_FORMAT_VERSION,
+            "root": self.root,
+            "files": self.files,
+            "dir_mtimes": self.dir_mtimes if with_mtimes else {},
+        }
+
+    @staticmethod
+    def from_file(path):
+        """Load index from a json file. Returns None if file does not exist or is invalid."""
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+            if data["version"] != INDEX_FORMAT_VERSION:
+                return None
+            return core_index(data["root"], data["files"], data["dir_mtimes"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def write(self, path, with_mtimes=True):
+        """Write index to a json file. Failing to write the index is not an error."""
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.to_dict(with_mtimes), f)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def find(self, name_without_ext, filter_extensions=[]):
+        """Find relative path of a file (without extension) in the index.
+        Returns the first file found by an `os.walk()` of the directory.
+        param name_without_ext: name of the file without extension
+        param filter_extensions: list of extensions to filter (example: [".py", ".json"])
+        """
+        for rel_path in self.names.get(name_without_ext, []):
+            if (
+                filter_extensions == []
+                or os.path.splitext(rel_path)[1] in filter_extensions
+            ):
+                return rel_path
+        return None
+
+    def get_lib_cores(self, lib_dir="lib"):
+        """Return relative paths of lib cores found under the given subdirectory.
+        Follows the same rules as the walk of `iob_base.get_lib_cores()`:
+        Directories named like LIB_CORES_SKIP_DIRS are skipped, and subdirectories of a
+        directory containing a core are not searched.
+        """
+        cores = []
+        core_dirs = set()
+        for rel_dir, file_names in self.files:
+            if rel_dir != lib_dir and not rel_dir.startswith(lib_dir + os.sep):
+                continue
+            parts = os.path.relpath(rel_dir, lib_dir).split(os.sep)
+            if parts == ["."]:
+                parts = []
+            # Skip directories (and their subdirectories) with skip names
+            if any(part in LIB_CORES_SKIP_DIRS for part in parts):
+                continue
+            # Skip subdirectories of other cores
+            if any(
+                os.path.join(lib_dir, *parts[:i]) in core_dirs
+                for i in range(len(parts))
+            ):
+                continue
+            core_dirs.add(rel_dir)
+            cores += [os.path.join(rel_dir, f) for f in file_names]
+        return cores
+
+
+def _get_cache_path(root):
+    """Return path of the persistent index for the given (absolute) directory"""
+    root_hash = hashlib.sha1(root.encode()).hexdigest()[:16]
+    return os.path.join(get_cache_dir(), "core_index", f"{root_hash}.json")
+
+
+def get_index(search_directory):
+    """Return index of setup files under the given directory.
+    The index is built at most once per process for each directory.
+    If an index precomputed at install time exists in the directory, it is used as is.
+    Otherwise, a persistent index stored in the cache directory is used, as long as
+    the mtimes of the directories in the tree did not change.
+    param search_directory: directory to index
+    """
+    root = os.path.realpath(search_directory)
+    if root in _loaded_indexes:
+        return _loaded_indexes[root]
+
+    index = core_index.from_file(os.path.join(root, INSTALLED_INDEX_NAME))
+    if index:
+        # Installed index always refers to the directory where it is located
+        index.root = root
+    else:
+        cache_path = _get_cache_path(root)
+        index = core_index.from_file(cache_path)
+        if not index or index.root != root or not index.is_valid():
+            index = core_index.build(root)
+            index.write(cache_path)
+
+    _loaded_indexes[root] = index
+    return index
+
+
+def write_installed_index(package_dir, dest_dir=None):
+    """Build the index of a py2hwsw package directory and store it in it (or in
+    `dest_dir`). Used at install time, since the installed files do not change.
+    param package_dir: py2hwsw package directory to index
+    param dest_dir: optional directory to store the index in
+    """
+    index = core_index.build(package_dir)
+    index.write(
+        os.path.join(dest_dir or package_dir, INSTALLED_INDEX_NAME), with_mtimes=False
+    )
+    return index
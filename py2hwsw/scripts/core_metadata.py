@@ -0,0 +1,153 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+#
+#    core_metadata.py: query top-level attributes of a core without elaborating it
+#
+# Queries like `py2hwsw <core> print name,version,build_dir` only need a few
+# attributes of the core. These are obtained from the dictionary returned by the
+# core's setup file, without creating the core object (which would parse its
+# subblocks, interfaces and confs), and without loading py2hwsw's generators.
+# Cores based on a 'parent' core are still elaborated, since their attributes depend
+# on the parent.
+#
+
+import os
+import json
+import pathlib
+
+from py2hwsw_version import PY2HWSW_VERSION
+from iob_context import get_context
+from iob_base import fail_with_msg, find_file, import_python_module
+
+# Attributes that may be queried
+METADATA_FIELDS = ["name", "version", "build_dir", "original_name"]
+
+
+def parse_fields(fields_str):
+    """Parse comma separated list of metadata fields.
+    returns: list of field names (every field if none given)
+    raises: ValueError if a field does not exist
+    """
+    fields = [field.strip() for field in (fields_str or "").split(",") if field.strip()]
+    for field in fields:
+        if field not in METADATA_FIELDS:
+            raise ValueError(
+                f"Unknown field '{field}'. Fields: {', '.join(METADATA_FIELDS)}."
+            )
+    return fields or list(METADATA_FIELDS)
+
+
+def find_module_setup_dir(core_name):
+    """Searches for a core's setup directory
+    param core_name: The core_name object
+    returns: The path to the setup directory
+    returns: The file extension
+    """
+    context = get_context()
+    file_path = find_file(
+        context.project_root, core_name, [".py", ".json"]
+    ) or find_file(
+        os.path.join(os.path.dirname(__file__), ".."),
+        core_name,
+        [".py", ".json"],
+    )
+    if not file_path:
+        fail_with_msg(
+            f"Python/JSON setup file of '{core_name}' core not found under path '{context.project_root}'!",
+            ModuleNotFoundError,
+        )
+
+    file_ext = os.path.splitext(file_path)[1]
+
+    filepath = pathlib.Path(file_path)
+    # Force core file to be contained in a folder with the same name.
+    # Skip this check if we are the top module (no top defined) or trying to setup the top module again (same name as previous defined top)
+    if filepath.parent.name != core_name and (
+        context.top_module and core_name != context.top_module.original_name
+    ):
+        fail_with_msg(
+            f"Setup file of '{core_name}' must be contained in a folder with the same name!\n"
+            f"It should be in a path like: '{filepath.parent.resolve()}/{core_name}/{filepath.name}'.\n"
+            f"But found incorrect path:    '{filepath.resolve()}'."
+        )
+
+    # print("Found setup dir based on location of: " + file_path, file=sys.stderr)
+    if file_ext == ".py" or file_ext == ".json":
+        return os.path.dirname(file_path), file_ext
+
+
+def _read_core_dict(core_name, py_params):
+    """Return py2hwsw dictionary of a core, as given to `iob_core.py2hw()`"""
+    context = get_context()
+    core_dir, file_ext = find_module_setup_dir(core_name)
+    file_path = os.path.join(core_dir, f"{core_name}{file_ext}")
+    # Record setup file as input of the query (like `build_files.record_input()`)
+    context.build_inputs.add(os.path.abspath(file_path))
+    if file_ext == ".py":
+        core_module = import_python_module(file_path)
+        core_dict = core_module.setup(
+            {
+                "build_dir": context.build_dir,
+                "py2hwsw_target": context.special_target,
+                "instantiator": "",
+                "py2hwsw_version": PY2HWSW_VERSION,
+                **py_params,
+            }
+        )
+    else:
+        with open(file_path) as f:
+            core_dict = json.load(f)
+    py2_core_dict = {
+        "original_name": core_name,
+        "name": core_name,
+        "setup_dir": core_dir,
+    }
+    py2_core_dict.update(core_dict)
+    return py2_core_dict
+
+
+def get_core_metadata(core_name, fields=METADATA_FIELDS, **py_params):
+    """Return top-level attributes of a core (as the top module of a run).
+    param core_name: name of the core
+    param fields: list of attributes to return (see `METADATA_FIELDS`)
+    param py_params: python parameters of the core
+    returns: dictionary of attribute name -> value
+    """
+    context = get_context()
+    # Set project wide special target (will prevent normal setup)
+    context.special_target = "print"
+    core_dict = _read_core_dict(core_name, py_params)
+    if core_dict.get("parent"):
+        # Attributes are inherited from the parent core
+        from iob_core import iob_core
+
+        module = iob_core.get_core_obj(core_name, **py_params)
+        return {field: getattr(module, field) for field in fields}
+
+    version = core_dict.get("version", PY2HWSW_VERSION)
+    metadata = {
+        "original_name": core_dict["original_name"],
+        "name": core_dict["name"],
+        "version": version,
+        "build_dir": core_dict.get("build_dir")
+        or context.build_dir
+        or f"../{core_dict['name']}_V{version}",
+    }
+    return {field: metadata[field] for field in fields}
+
+
+def print_core_metadata(core_name, fields=METADATA_FIELDS, as_json=False, **py_params):
+    """Print top-level attributes of a core, one per line (or as a json object).
+    param core_name: name of the core
+    param fields: list of attributes to print (see `METADATA_FIELDS`)
+    param as_json: print attributes as a json object
+    param py_params: python parameters of the core
+    """
+    metadata = get_core_metadata(core_name, fields, **py_params)
+    if as_json:
+        print(json.dumps(metadata, indent=4))
+        return
+    for field in fields:
+        print(metadata[field])
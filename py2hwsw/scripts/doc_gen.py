@@ -13,6 +13,7 @@ import block_gen
 
 from latex import write_table, escape_latex
 from iob_base import fail_with_msg, find_path, get_lib_cores
+from build_files import open_file
 
 
 def generate_docs(core):
@@ -40,7 +41,7 @@ def generate_tex_file(file_path, contents):
     :param str file_path: Path to the file
     :param str contents: TeX contents
     """
-    with open(file_path, "w") as f:
+    with open_file(file_path, "w") as f:
         f.write(escape_latex(contents))
 
 
@@ -124,7 +125,7 @@ def generate_py_params_tex(python_parameters, out_dir):
     :param str out_dir: path to output directory
     """
 
-    py_params_file = open(f"{out_dir}/py_params.tex", "w")
+    py_params_file = open_file(f"{out_dir}/py_params.tex", "w")
 
     # FIXME: These python parameters are only used during the setup process. So from the point of view of the build directory, they are not needed.
     # Maybe we should have a user guide specific for the setup stage?
@@ -202,7 +203,7 @@ def process_tex_macros(tex_src_dir):
             if line.strip().startswith("% py2_macro:"):
                 lines[idx] = process_tex_macro(line)
 
-        with open(os.path.join(tex_src_dir, file), "w") as f:
+        with open_file(os.path.join(tex_src_dir, file), "w") as f:
             f.writelines(lines)
 
 
@@ -0,0 +1,213 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+#
+#    dry_run.py: elaborate cores and generate build trees without modifying build directories
+#
+# Queries (like `print_build_dir` or `clean`) only elaborate the core: cores created
+# with a special target do not generate files (see `iob_core.__init__()`).
+# `elaborate()` returns the core object of such a query, created in a new context.
+#
+# `dry_run_setup()` runs the setup of a core into a private staging directory (with
+# the same name as the build directory, since some generated files use it), and
+# returns the generated files as a `build_tree` object kept in memory. The setup
+# still writes every file of the build directory to disk, in the staging directory,
+# which is removed afterwards. Only the build directory is not modified. The tree
+# can be inspected, compared with other trees or with a build directory, and written
+# to disk later with `build_tree.flush()`. Example:
+#     tree = dry_run_setup("iob_and", build_dir="../iob_and_V0.81")
+#     print(tree.diff_dir())
+#     tree.flush()
+#
+# Note: Caches outside of the build directory (like the core index and the lint and
+# format caches) are still updated.
+#
+
+import os
+import stat
+import shutil
+import tempfile
+
+import iob_colors
+from iob_context import new_context
+from build_files import PY2HWSW_BUILD_DIR
+
+
+class build_tree:
+    """Files of a build directory, kept in memory"""
+
+    def __init__(self, build_dir, files={}, modes={}):
+        """
+        param build_dir: path of the build directory of the tree
+        param files: dictionary of relative path -> content (bytes)
+        param modes: dictionary of relative path -> permission bits
+        """
+        self.build_dir = build_dir
+        self.files = dict(files)
+        self.modes = dict(modes)
+
+    @classmethod
+    def from_dir(cls, path, build_dir=None):
+        """Read files of a directory (except py2hwsw internal files) into a tree.
+        An empty tree is returned if the directory does not exist.
+        param path: directory to read
+        param build_dir: build directory of the tree (default: path)
+        """
+        tree = cls(build_dir or path)
+        for root, dirs, files in os.walk(path):
+            if root == path and PY2HWSW_BUILD_DIR in dirs:
+                dirs.remove(PY2HWSW_BUILD_DIR)
+            for file in files:
+                file_path = os.path.join(root, file)
+                if not os.path.isfile(file_path):
+                    continue
+                rel_path = os.path.relpath(file_path, path)
+                with open(file_path, "rb") as f:
+                    tree.files[rel_path] = f.read()
+                tree.modes[rel_path] = stat.S_IMODE(os.stat(file_path).st_mode)
+        return tree
+
+    def paths(self):
+        """Return sorted list of relative paths of the files in the tree"""
+        return sorted(self.files)
+
+    def read(self, rel_path):
+        """Return content of a file of the tree, as a string"""
+        return self.files[rel_path].decode()
+
+    def __contains__(self, rel_path):
+        return rel_path in self.files
+
+    def __len__(self):
+        return len(self.files)
+
+    def diff(self, other):
+        """Compare this tree with another.
+        returns: dictionary with lists of relative paths of files only in this tree
+                 ("added"), only in the other tree ("removed"), and in both with
+                 different content ("changed")
+        """
+        return {
+            "added": sorted(set(self.files) - set(other.files)),
+            "removed": sorted(set(other.files) - set(self.files)),
+            "changed": sorted(
+                path
+                for path in set(self.files) & set(other.files)
+                if self.files[path] != other.files[path]
+            ),
+        }
+
+    def diff_dir(self, path=None):
+        """Compare this tree with the files of a directory (see `diff()`).
+        param path: directory to compare with (default: build directory of the tree)
+        """
+        return self.diff(build_tree.from_dir(path or self.build_dir))
+
+    def flush(self, build_dir=None):
+        """Write the tree to disk, replacing the build directory (and every file in it,
+        including py2hwsw internal files) at once.
+        The tree is written to a temporary directory next to the build directory, that
+        is renamed to the build directory when complete.
+        param build_dir: directory to write (default: build directory of the tree)
+        """
+        build_dir = os.path.normpath(build_dir or self.build_dir)
+        parent_dir = os.path.dirname(os.path.abspath(build_dir))
+        os.makedirs(parent_dir, exist_ok=True)
+        new_dir = tempfile.mkdtemp(
+            prefix=f".{os.path.basename(build_dir)}.", dir=parent_dir
+        )
+        try:
+            for rel_path, content in self.files.items():
+                path = os.path.join(new_dir, rel_path)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(content)
+                if rel_path in self.modes:
+                    os.chmod(path, self.modes[rel_path])
+            os.chmod(new_dir, 0o777 & ~_get_umask())
+            if os.path.exists(build_dir):
+                old_dir = new_dir + ".old"
+                os.rename(build_dir, old_dir)
+                os.rename(new_dir, build_dir)
+                shutil.rmtree(old_dir)
+            else:
+                os.rename(new_dir, build_dir)
+        except BaseException:
+            shutil.rmtree(new_dir, ignore_errors=True)
+            raise
+
+
+def _get_umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+def elaborate(core_name, py_params={}, special_target="elaborate", **kwargs):
+    """Create the core object of a core, without generating files.
+    param core_name: name of the core
+    param py_params: python parameters of the core
+    param special_target: special target of the run (see `iob_core.__init__()`)
+    param kwargs: arguments of the `iob_context` constructor (like 'build_dir' or
+                  'project_root')
+    returns: The core object
+    """
+    from iob_core import iob_core
+
+    with new_context(special_target=special_target, **kwargs):
+        return iob_core.get_core_obj(core_name, **py_params)
+
+
+def dry_run_setup(core_name, py_params={}, build_args={}, **kwargs):
+    """Run the setup of a core without modifying its build directory.
+    The setup writes the files to a temporary staging directory, that is read into
+    the returned tree and removed.
+    param core_name: name of the core
+    param py_params: python parameters of the core
+    param build_args: py2hwsw arguments of the setup (see `iob_context.build_args`)
+    param kwargs: arguments of the `iob_context` constructor (like 'build_dir',
+                  'project_root' or 'jobs')
+    returns: `build_tree` with the files of the build directory
+    """
+    from iob_core import iob_core
+
+    build_dir = elaborate(core_name, py_params, **kwargs).build_dir
+    with tempfile.TemporaryDirectory(prefix="py2hwsw_dry_run_") as tmp_dir:
+        staging_dir = os.path.join(
+            tmp_dir, os.path.basename(os.path.normpath(build_dir))
+        )
+        kwargs["build_dir"] = staging_dir
+        with new_context(dry_run=True, **kwargs) as context:
+            context.build_args = dict(build_args)
+            iob_core.get_core_obj(core_name, **py_params)
+        return build_tree.from_dir(staging_dir, build_dir)
+
+
+def print_dry_run_setup(core_name, py_params={}, build_args={}, **kwargs):
+    """Run the setup of a core without modifying its build directory, and print the
+    files that the setup would add or change in it.
+    """
+    tree = dry_run_setup(core_name, py_params, build_args, **kwargs)
+    diff = tree.diff_dir()
+    for rel_path in diff["added"]:
+        print(f"  A {rel_path}")
+    for rel_path in diff["changed"]:
+        print(f"  M {rel_path}")
+    unchanged = len(tree) - len(diff["added"]) - len(diff["changed"])
+    print(
+        f"{iob_colors.INFO}Dry run of '{core_name}' setup: {len(diff['added'])} new, {len(diff['changed'])} changed and {unchanged} unchanged files in build directory '{tree.build_dir}'.{iob_colors.ENDC}"
+    )
+
+
+def print_dry_run_clean(core_name, **kwargs):
+    """Print the build directory that would be removed by the 'clean' target"""
+    build_dir = elaborate(core_name, special_target="clean", **kwargs).build_dir
+    if not os.path.exists(build_dir):
+        print(
+            f"{iob_colors.INFO}Dry run of '{core_name}' clean: build directory '{build_dir}' does not exist.{iob_colors.ENDC}"
+        )
+        return
+    print(
+        f"{iob_colors.INFO}Dry run of '{core_name}' clean: would remove build directory '{build_dir}'.{iob_colors.ENDC}"
+    )
@@ -4,6 +4,8 @@
 #
 # SPDX-License-Identifier: MIT
 
+from build_files import open_file
+
 
 def generate_fsm(core):
     """Generate verilog code with the fsm of this module.
@@ -21,5 +23,5 @@ def generate_fsm_snippet(core):
     """
     code = generate_fsm(core)
     out_dir = core.build_dir + "/hardware/src"
-    with open(f"{out_dir}/{core.name}_fsm.vs", "w+") as f:
+    with open_file(f"{out_dir}/{core.name}_fsm.vs", "w") as f:
         f.write(code)
@@ -7,11 +7,16 @@
 # this script generates interfaces for Verilog modules and testbenches to add a
 # new standard interface, add the name to the interface_names list, and an
 # interface dictionary as below run this script with the -h option for help
-from copy import deepcopy
-from dataclasses import dataclass, field
+import os
+import io
+import sys
+import time
+import threading
+from dataclasses import dataclass, field, replace
 from typing import Dict
 from iob_signal import iob_signal, iob_signal_reference
 from iob_globals import iob_globals
+from build_files import open_file
 
 mem_if_details = [
     {
@@ -330,28 +335,36 @@ def dict2interface(interface_dict):
     return interface(**new_interface_dict, widths=widths)
 
 
+# Lock for the global width variables changed by `parse_widths`.
+# Allows interfaces to be generated by concurrent runs (each in its own iob_context).
+_widths_lock = threading.RLock()
+
+
 def parse_widths(func):
     """Decorator to temporarily change values of global variables based on `widths` dictionary."""
 
     def inner(widths={}, params=None):
-        vars_backup = {}
-        interface_name = func.__name__[4:-6]
-        # Backup global variables
-        for k, v in widths.items():
-            assert (
-                k in globals()
-            ), f"The provided width variable '{k}' does not exist for interface '{interface_name}'!"
-            vars_backup[k] = globals()[k]
-            globals()[k] = v
-        # Call the function
-        if params is not None:
-            return_obj = func(params)
-        else:
-            return_obj = func()
-        # Restore global variables
-        for k in widths:
-            globals()[k] = vars_backup[k]
-        return return_obj
+        with _widths_lock:
+            vars_backup = {}
+            interface_name = func.__name__[4:-6]
+            # Backup global variables
+            for k, v in widths.items():
+                assert (
+                    k in globals()
+                ), f"The provided width variable '{k}' does not exist for interface '{interface_name}'!"
+                vars_backup[k] = globals()[k]
+                globals()[k] = v
+            # Call the function
+            try:
+                if params is not None:
+                    return_obj = func(params)
+                else:
+                    return_obj = func()
+            finally:
+                # Restore global variables
+                for k in vars_backup:
+                    globals()[k] = vars_backup[k]
+            return return_obj
 
     return inner
 
@@ -603,6 +616,7 @@ def remove_duplicates(ports):
 # SE: Single enable for entire data word
 # Xil: Xilinx IP implementation
 
+
 @parse_widths
 def get_rom_2p_ports():
     ports = (
@@ -1422,11 +1436,15 @@ def reverse_direction(direction):
 
 
 def reverse_signals_dir(signals):
-    new_signals = deepcopy(signals)
-    for signal in new_signals:
-        signal.direction = reverse_direction(signal.direction)
-        signal.name = reverse_name_direction(signal.name)
-    return new_signals
+    return [
+        replace(
+            signal,
+            name=reverse_name_direction(signal.name),
+            direction=reverse_direction(signal.direction),
+            reg_signals=list(signal.reg_signals),
+        )
+        for signal in signals
+    ]
 
 
 # testbench signal direction
@@ -1565,6 +1583,106 @@ def write_s_tb_wire(fout, prefix, wires):
 # GENERATE INTERFACES
 #
 
+# Functions that return the signals of each interface
+ports_functions = {
+    "iob_clk": get_iob_clk_ports,
+    "iob": get_iob_ports,
+    "axil_read": get_axil_read_ports,
+    "axil_write": get_axil_write_ports,
+    "axil": get_axil_ports,
+    "axi_read": get_axi_read_ports,
+    "axi_write": get_axi_write_ports,
+    "axi": get_axi_ports,
+    "apb": get_apb_ports,
+    "ahb": get_ahb_ports,
+    "axis": get_axis_ports,
+    "rs232": get_rs232_ports,
+    "wb": get_wb_ports,
+    "wb_full": get_wb_full_ports,
+    "rom_2p": get_rom_2p_ports,
+    "rom_atdp": get_rom_atdp_ports,
+    "rom_sp": get_rom_sp_ports,
+    "rom_tdp": get_rom_tdp_ports,
+    "ram_2p": get_ram_2p_ports,
+    "ram_at2p": get_ram_at2p_ports,
+    "ram_atdp": get_ram_atdp_ports,
+    "ram_atdp_be": get_ram_atdp_be_ports,
+    "ram_sp": get_ram_sp_ports,
+    "ram_sp_be": get_ram_sp_be_ports,
+    "ram_sp_se": get_ram_sp_se_ports,
+    "ram_t2p": get_ram_t2p_ports,
+    "ram_t2p_be": get_ram_t2p_be_ports,
+    "ram_t2p_tiled": get_ram_t2p_tiled_ports,
+    "ram_tdp": get_ram_tdp_ports,
+    "ram_tdp_be": get_ram_tdp_be_ports,
+    "ram_tdp_be_xil": get_ram_tdp_be_xil_ports,
+    "regfile_2p": get_regfile_2p_ports,
+    "regfile_at2p": get_regfile_at2p_ports,
+    "regfile_sp": get_regfile_sp_ports,
+}
+
+# Functions that write each type of snippet
+snippet_writers = {
+    "m_port": write_m_port,
+    "s_port": write_s_port,
+    "m_portmap": write_m_portmap,
+    "s_portmap": write_s_portmap,
+    "m_m_portmap": write_m_m_portmap,
+    "s_s_portmap": write_s_s_portmap,
+    "wire": write_wire,
+    "m_tb_wire": write_m_tb_wire,
+    "s_tb_wire": write_s_tb_wire,
+}
+
+# Interface signals are the same for every port/wire with the same interface
+# configuration, so they are only generated once (per direction).
+# Key: (name, if_type, params, widths, reset polarity), Value: tuple of signals.
+# These signals are templates: `get_signals()` returns copies of them.
+_signals_cache = {}
+# Text of snippets generated by `gen_if()` and `gen_wires()`.
+# Key: (signals key, if_type, mult, prefixes), Value: snippet text
+_snippets_cache = {}
+
+
+def _get_signals_key(name, if_type, widths, params):
+    """Return key of `_signals_cache` for an interface configuration.
+    The signals of the 'iob_clk' interface also depend on the global reset polarity.
+    returns: key, or None if the configuration can not be used as a key
+    """
+    key = (
+        name,
+        if_type == "subordinate",
+        params,
+        tuple(sorted(widths.items())),
+        getattr(iob_globals(), "reset_polarity", "positive"),
+    )
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def _get_signal_templates(name, if_type, widths, params):
+    """Return tuple of signals of an interface (shared, must not be modified)"""
+    key = _get_signals_key(name, if_type, widths, params)
+    signals = _signals_cache.get(key) if key else None
+    if signals is None:
+        if name not in ports_functions:
+            raise ValueError(
+                f"Unknown interface '{name}'. Interfaces: {', '.join(ports_functions)}."
+            )
+        signals = ports_functions[name](params=params, widths=widths)
+        # Set direction according to if_type
+        if if_type == "subordinate":
+            signals = reverse_signals_dir(signals)
+        # TODO: Code to support other if_types
+        # For example, the rs232 has not type.
+        signals = tuple(signals)
+        if key:
+            _signals_cache[key] = signals
+    return signals
+
 
 def get_signals(name, if_type="", mult=1, widths={}, params=None, signal_prefix=""):
     """Get list of signals for given interface
@@ -1572,85 +1690,97 @@ def get_signals(name, if_type="", mult=1, widths={}, params=None, signal_prefix=
                    Examples: '' (unspecified), 'manager', 'subordinate', ...
     param mult: Multiplication factor for all signal widths.
     param widths: Dictionary for configuration of specific signal widths.
+    returns: list of new signals (may be modified by the caller)
     """
-    eval_str = "get_" + name + "_ports(params=params,widths=widths)"
-    # print(eval_str)
-    signals = eval(eval_str)
-
-    # Set direction according to if_type
-    if if_type == "subordinate":
-        signals = reverse_signals_dir(signals)
-    # TODO: Code to support other if_types
-    # For example, the rs232 has not type.
-
-    if mult != 1:
-        for signal in signals:
-            signal.width = f"({mult}*{signal.width})"
-
-    for signal in signals:
-        signal.name = signal_prefix + signal.name
-
+    signals = []
+    for signal in _get_signal_templates(name, if_type, widths, params):
+        width = signal.width
+        if mult != 1:
+            width = f"({mult}*{width})"
+        signals.append(
+            replace(
+                signal,
+                name=signal_prefix + signal.name,
+                width=width,
+                reg_signals=list(signal.reg_signals),
+            )
+        )
     return signals
 
 
-def gen_if(interface):
-    """Generate verilog snippets for all possible subtypes of a given interface"""
-    name = interface.type
-    file_prefix = interface.file_prefix
-    portmap_port_prefix = interface.portmap_port_prefix
-    prefix = interface.prefix
-    mult = interface.mult
-    params = interface.params
-    widths = interface.widths
+def _get_snippet(interface, if_type, prefix1, prefix2=None):
+    """Return text of snippet of given type for an interface
+    param interface: interface of the snippet
+    param if_type: type of snippet (see `if_types`)
+    param prefix1: prefix of the signals (of the ports, for portmaps)
+    param prefix2: prefix of the wires connected to the ports (only for portmaps)
+    """
+    signals_if_type = ""
+    if if_type != "wire":
+        signals_if_type = "subordinate" if if_type.startswith("s") else "manager"
+    signals_key = _get_signals_key(
+        interface.type, signals_if_type, interface.widths, interface.params
+    )
+    key = None
+    if signals_key:
+        key = (signals_key, if_type, interface.mult, prefix1, prefix2)
+        if key in _snippets_cache:
+            return _snippets_cache[key]
+
+    ports = get_signals(
+        name=interface.type,
+        if_type=signals_if_type,
+        mult=interface.mult,
+        widths=interface.widths,
+        params=interface.params,
+    )
+    fout = io.StringIO()
+    if prefix2 is None:
+        snippet_writers[if_type](fout, prefix1, ports)
+    else:
+        snippet_writers[if_type](fout, prefix1, prefix2, ports)
+    text = fout.getvalue()
+    if key:
+        _snippets_cache[key] = text
+    return text
 
+
+def gen_if(interface, out_dir="."):
+    """Generate verilog snippets for all possible subtypes of a given interface
+    param interface: interface to generate snippets for
+    param out_dir: directory to write snippets to
+    """
     #
     # GENERATE SNIPPETS FOR ALL TYPES OF PORTS AND WIRES
     #
     for if_type in if_types:
-        fout = open(file_prefix + name + "_" + if_type + ".vs", "w")
-
         # get prefixes
-        prefix1 = prefix
-        prefix2_str = ""
+        prefix1 = interface.prefix
+        prefix2 = None
         if "portmap" in if_type:
-            prefix1 = portmap_port_prefix
-            prefix2_str = " prefix,"
-
-        # get ports
-        if if_type.startswith("s"):
-            ports = get_signals(
-                name=name,
-                if_type="subordinate",
-                mult=mult,
-                widths=widths,
-                params=params,
-            )
-        else:
-            ports = get_signals(
-                name=name, if_type="manager", mult=mult, widths=widths, params=params
-            )
+            prefix1 = interface.portmap_port_prefix
+            prefix2 = interface.prefix
 
-        eval_str = f"write_{if_type}(fout, prefix1,{prefix2_str} ports)"
-        # print(eval_str, prefix1)
-        eval(eval_str)
+        fout = open_file(
+            os.path.join(
+                out_dir, interface.file_prefix + interface.type + "_" + if_type + ".vs"
+            ),
+            "w",
+        )
+        fout.write(_get_snippet(interface, if_type, prefix1, prefix2))
         fout.close()
 
 
-def gen_wires(interface):
-    """Generate wires snippet for given interface"""
-    name = interface.type
-    file_prefix = interface.file_prefix
-    prefix = interface.prefix
-    mult = interface.mult
-    params = interface.params
-    widths = interface.widths
-
-    signals = get_signals(
-        name=name, if_type="", mult=mult, widths=widths, params=params
+def gen_wires(interface, out_dir="."):
+    """Generate wires snippet for given interface
+    param interface: interface to generate snippet for
+    param out_dir: directory to write snippet to
+    """
+    fout = open_file(
+        os.path.join(out_dir, interface.file_prefix + interface.type + "_wire.vs"),
+        "w",
     )
-
-    fout = open(file_prefix + name + "_wire.vs", "w")
-    write_wire(fout, prefix, signals)
+    fout.write(_get_snippet(interface, "wire", interface.prefix))
     fout.close()
 
 
@@ -1659,7 +1789,41 @@ def gen_wires(interface):
 #
 
 
+def benchmark(repeat=1000):
+    """Print time to generate the signals and snippets of every interface in
+    `if_details`, for the first (uncached) and the following (cached) calls.
+    param repeat: number of calls timed for each interface
+    """
+    print(f"{'Interface':<16}{'Signals':>8}{'First (us)':>12}{'Next (us)':>12}")
+    for if_name in if_names:
+        itf = interface(type=if_name, prefix="bench_", portmap_port_prefix="port_")
+        times = []
+        for n_calls in [1, repeat]:
+            start = time.perf_counter()
+            for _ in range(n_calls):
+                try:
+                    signals = get_signals(if_name, "manager", params=itf.params)
+                    for if_type in if_types:
+                        _get_snippet(
+                            itf,
+                            if_type,
+                            itf.portmap_port_prefix if "portmap" in if_type else "",
+                            itf.prefix if "portmap" in if_type else None,
+                        )
+                except NotImplementedError:
+                    signals = None
+                    break
+            times.append((time.perf_counter() - start) * 1e6 / n_calls)
+        if signals is None:
+            print(f"{if_name:<16}{'-':>8}{'(not implemented)':>24}")
+            continue
+        print(f"{if_name:<16}{len(signals):>8}{times[0]:>12.1f}{times[1]:>12.1f}")
+
+
 if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark()
+        sys.exit(0)
     for if_name in if_names:
         gen_if(
             interface(
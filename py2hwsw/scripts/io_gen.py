@@ -8,10 +8,10 @@
 #    ios.py: build Verilog module IO and documentation
 #
 from latex import write_table
-import os
 
 import if_gen
 from iob_signal import iob_signal
+from build_files import open_file
 
 
 def reverse_port(port_type):
@@ -64,7 +64,7 @@ def generate_ports_snippet(core):
     """
     code = generate_ports(core)
     out_dir = core.build_dir + "/hardware/src"
-    with open(f"{out_dir}/{core.name}_io.vs", "w+") as f:
+    with open_file(f"{out_dir}/{core.name}_io.vs", "w") as f:
         f.write(code)
 
     for port_idx, port in enumerate(core.ports):
@@ -75,17 +75,12 @@ def generate_ports_snippet(core):
         # Note: This is only used by manually written verilog modules.
         #       May not be needed in the future.
         if port.interface:
-            if_gen.gen_if(port.interface)
-
-            # move all .vs files from current directory to out_dir
-            for file in os.listdir("."):
-                if file.endswith(".vs"):
-                    os.rename(file, f"{out_dir}/{file}")
+            if_gen.gen_if(port.interface, out_dir)
 
 
 # Generate if.tex file with list TeX tables of IOs
 def generate_if_tex(ports, out_dir):
-    if_file = open(f"{out_dir}/if.tex", "w")
+    if_file = open_file(f"{out_dir}/if.tex", "w")
 
     if_file.write(
         """The interface signals of the core are described in the following tables.
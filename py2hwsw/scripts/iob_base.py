@@ -4,16 +4,22 @@
 
 import sys
 import os
+import stat
 import shlex
 import argparse
 from dataclasses import dataclass
-import importlib
+import importlib.util
 import traceback
 from functools import wraps
 import inspect
 import shutil
+import weakref
+import time
+from types import SimpleNamespace
 
 import iob_colors
+from core_index import get_index, SETUP_FILE_EXTENSIONS
+from iob_context import get_context
 
 
 class iob_base:
@@ -33,14 +39,15 @@ class iob_base:
         param name: name of the attribute
         param value: value to set
         param datatype: optional data type of the attribute to check
-        param set_attribute_handler: function to call to set the attribute
-                                     Related to `parse_attributes_dict()` of iob_core.py
+        param set_attribute_handler: function to call to set the attribute, with
+                                     arguments (obj, value). Related to
+                                     `parse_attributes_dict()` of iob_core.py
         param descr: description of the attribute
         """
         if not hasattr(self, name):
             setattr(self, name, value)
         elif datatype is not None:
-            if type(getattr(self, name)) != datatype:
+            if not isinstance(getattr(self, name), datatype):
                 raise TypeError(
                     iob_colors.FAIL
                     + f"Attribute '{name}' must be of type {datatype}"
@@ -49,39 +56,40 @@ class iob_base:
         # Ensure that `ATTRIBUTE_PROPERTIES` dictionary exists
         # The 'ATTRIBUTE_PROPERTIES' is a dictionary that stores information about the
         # attributes, including the handlers used to set their values.
-        if "ATTRIBUTE_PROPERTIES" not in self.__dict__:
-            self.ATTRIBUTE_PROPERTIES = {}
+        # It is shared by all instances of a class (a core has dozens of attributes, and
+        # a system may have thousands of cores), so handlers receive the object whose
+        # attribute is set as their first argument.
+        cls = type(self)
+        if "ATTRIBUTE_PROPERTIES" not in cls.__dict__:
+            cls.ATTRIBUTE_PROPERTIES = {}
         # Define the function to call to set the attribute from info given in a dict.
         # See `parse_attributes_dict()` of iob_core.py for details.
         # For example, the info given about this attribute may be of the type 'dict',
         # but we may want to set a type 'object' instead.
         # The `set_attribute_handler` is responsible for converting between these two
         # datatypes.
-        if name in self.ATTRIBUTE_PROPERTIES:
-            properties = self.ATTRIBUTE_PROPERTIES[name]
-        else:
-            properties = iob_attribute_properties()
+        properties = cls.ATTRIBUTE_PROPERTIES.get(name)
+        if not properties:
+            properties = iob_attribute_properties(
+                set_handler=lambda obj, v: setattr(obj, name, v)
+            )
+            cls.ATTRIBUTE_PROPERTIES[name] = properties
         if datatype:
             properties.datatype = datatype
         if set_attribute_handler:
             # Set custom set_handler
             properties.set_handler = set_attribute_handler
-        elif not properties.set_handler:
-            # Set default set_handler
-            properties.set_handler = lambda v: setattr(self, name, v)
         if descr:
             properties.descr = descr
 
-        self.ATTRIBUTE_PROPERTIES[name] = properties
-
 
-@dataclass
+@dataclass(slots=True)
 class iob_attribute_properties:
     """Class that stores properties of an attribute"""
 
     datatype: object = None
     # Function to use to set the attribute value based on info given in the 'py2hw'
-    # interface
+    # interface. Called with arguments (obj, value).
     set_handler: object = None
     descr: str = "Default attribute description"
 
@@ -91,7 +99,114 @@ class iob_attribute_properties:
 #
 
 
-def find_obj_in_list(obj_list, obj_name, process_func=lambda o: o):
+def _identity(obj):
+    return obj
+
+
+class iob_named_list(list):
+    """List of objects (or dictionaries) with a 'name', indexed by name.
+    Behaves like a normal list. Lookups by name (see `find_obj_in_list()`) use an index
+    built on the first lookup, so they do not scan the list. The index is updated when
+    elements are appended, and rebuilt (on the next lookup) after other changes to the
+    list.
+    Note: Objects must not be renamed after being found in the list.
+    """
+
+    # Cores have many of these lists (one for the signals of each port and wire)
+    __slots__ = ("_indexes",)
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        # Indexes of the list (None until the first lookup). Key: 'process_func' of
+        # the lookup, Value: dictionary of name -> first object with that name
+        self._indexes = None
+
+    def find(self, obj_name, process_func=_identity):
+        """Returns the first object with a given name (see `find_obj_in_list()`)"""
+        if self._indexes is None:
+            self._indexes = {}
+        index = self._indexes.get(process_func)
+        if index is None:
+            if len(self._indexes) >= 8:
+                # Lookups with new functions each time would keep too many indexes
+                self._indexes.clear()
+            index = {}
+            for obj in self:
+                self._add_to_index(index, obj, process_func)
+            self._indexes[process_func] = index
+        return index.get(obj_name)
+
+    def _add_to_index(self, index, obj, process_func):
+        obj_processed = process_func(obj)
+        if not obj_processed:
+            return
+        # Support dictionaries as well
+        if isinstance(self[0], dict):
+            name = obj_processed["name"]
+        else:
+            name = obj_processed.name
+        index.setdefault(name, obj)
+
+    def _invalidate(self):
+        self._indexes = None
+
+    def append(self, obj):
+        super().append(obj)
+        for process_func, index in (self._indexes or {}).items():
+            self._add_to_index(index, obj, process_func)
+
+    def extend(self, objs):
+        super().extend(objs)
+        self._invalidate()
+
+    def __iadd__(self, objs):
+        self.extend(objs)
+        return self
+
+    def insert(self, *args):
+        super().insert(*args)
+        self._invalidate()
+
+    def remove(self, *args):
+        super().remove(*args)
+        self._invalidate()
+
+    def pop(self, *args):
+        obj = super().pop(*args)
+        self._invalidate()
+        return obj
+
+    def clear(self):
+        super().clear()
+        self._invalidate()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._invalidate()
+
+    def reverse(self):
+        super().reverse()
+        self._invalidate()
+
+    def __setitem__(self, *args):
+        super().__setitem__(*args)
+        self._invalidate()
+
+    def __delitem__(self, *args):
+        super().__delitem__(*args)
+        self._invalidate()
+
+    def __imul__(self, *args):
+        super().__imul__(*args)
+        self._invalidate()
+        return self
+
+    def __reduce__(self):
+        # Copies and pickles do not include the indexes
+        return (self.__class__, (list(self),))
+
+
+def find_obj_in_list(obj_list, obj_name, process_func=_identity):
     """Returns an object with a given name from a list of objects
     param obj_list: list of objects (or dictionaries) to search
     param obj_name: name of the object to find
@@ -99,6 +214,8 @@ def find_obj_in_list(obj_list, obj_name, process_func=lambda o: o):
     """
     if not obj_list:
         return None
+    if isinstance(obj_list, iob_named_list):
+        return obj_list.find(obj_name, process_func)
     processed_objs = list(process_func(o) for o in obj_list)
     # Support dictionaries as well
     if isinstance(obj_list[0], dict):
@@ -154,17 +271,16 @@ def warn_with_msg(msg):
 #
 # Exception handling
 #
-printed_traceback = False
 
 
 def add_traceback_msg(msg):
     """Should be called in exception handler block of try/except block.
-    It prints the traceback on the first call.
+    It prints the traceback on the first call (of each run).
     It also prints the message given.
     """
-    global printed_traceback
-    if not printed_traceback:
-        printed_traceback = True
+    context = get_context()
+    if not context.printed_traceback:
+        context.printed_traceback = True
         traceback.print_exc()
     print(iob_colors.FAIL + msg + iob_colors.ENDC)
 
@@ -172,7 +288,6 @@ def add_traceback_msg(msg):
 #
 # Debug
 #
-debug_level = 0
 
 
 def debug(msg, level=0):
@@ -180,7 +295,7 @@ def debug(msg, level=0):
     :param str msg: message to print
     :param int level: debug level
     """
-    if debug_level >= level:
+    if get_context().debug_level >= level:
         print(f"[Debug {level}]: " + msg)
 
 
@@ -398,6 +513,12 @@ def find_file(search_directory, name_without_ext, filter_extensions=[]):
     param search_directory: directory to search
     param filter_extensions: list of extensions to filter (example: [".py", ".tex"])
     """
+    # Setup files are looked up in the (cached) core index of the directory
+    if filter_extensions and all(
+        ext in SETUP_FILE_EXTENSIONS for ext in filter_extensions
+    ):
+        rel_path = get_index(search_directory).find(name_without_ext, filter_extensions)
+        return os.path.join(search_directory, rel_path) if rel_path else None
     for root, _, files in os.walk(search_directory):
         for file in files:
             file_name, file_ext = os.path.splitext(file)
@@ -447,29 +568,71 @@ def find_path(search_directory, path):
     return None
 
 
+# Modules imported by `import_python_module()` (of any run)
+_setup_modules = weakref.WeakSet()
+
+
 def import_python_module(module_path, module_name=None):
     """Import a python module from a given filepath
     param module_path: path of the module's python file
     param module_name: optinal name of the module. By default equal to file name.
+    returns: The imported python module
     """
     if not module_name:
         module_name = os.path.splitext(os.path.basename(module_path))[0]
 
-    # Don't import the same module twice
-    if module_name in sys.modules:
-        return
+    # Don't import the same module twice in the same run
+    modules = get_context().modules
+    module_key = os.path.realpath(module_path)
+    if module_key in modules:
+        return modules[module_key]
+    # Reuse module if it was imported by python's import system (like `iob_csrs`, imported by `ipxact_gen`),
+    # even if it was found in another directory (for example, in a copy of the py2hwsw lib)
+    module = sys.modules.get(module_name)
+    if module and module not in _setup_modules:
+        modules[module_key] = module
+        return module
 
     spec = importlib.util.spec_from_file_location(module_name, module_path)
     module = importlib.util.module_from_spec(spec)
+    modules[module_key] = module
+    _setup_modules.add(module)
+    # Also register by name, for setup files that access `sys.modules[__name__]`
     sys.modules[module_name] = module
     spec.loader.exec_module(module)
+    return module
+
+
+def add_write_permission(path):
+    """Add user and group write permissions to a file or directory (not recursive), if
+    it does not have them. Files copied from the Nix store are read-only.
+    """
+    try:
+        mode = os.stat(path).st_mode
+    except OSError:
+        return
+    if mode & 0o220 != 0o220:
+        os.chmod(path, stat.S_IMODE(mode) | 0o220)
 
 
 def nix_permission_hack(path):
     """Set write permissions on all files and subdirectories in a given directory
     This is a hack to prevent issues with permissions on Nix systems.
+    Each path is only fixed once per run. Files copied with `build_files.copy_file()`
+    and `build_files.copy_tree()` already get write permissions when they are copied.
     """
-    os.system("chmod -R ug+w " + path)
+    fixed_paths = get_context().permission_fixed_paths
+    path = os.path.abspath(path)
+    if path in fixed_paths:
+        return
+    fixed_paths.add(path)
+    add_write_permission(path)
+    # Symbolic links found inside the directory are not followed (like `chmod -R`)
+    for root, dirs, files in os.walk(path):
+        for name in dirs + files:
+            entry = os.path.join(root, name)
+            if not os.path.islink(entry):
+                add_write_permission(entry)
 
 
 def assert_attributes(
@@ -486,21 +649,14 @@ def assert_attributes(
 
 def get_lib_cores():
     """Search for py2hwsw library cores and return a list with their file paths"""
-    lib_path = os.path.join(os.path.dirname(__file__), "../lib")
-    cores = []
-    # Find all .py files under lib_path
-    for root, dirs, files in os.walk(lib_path):
-        # Skip specific directories
-        if os.path.basename(root) in ["scripts", "test", "document"]:
-            dirs[:] = []
-            continue
-        for file in files:
-            if file.endswith(".py") or file.endswith(".json"):
-                cores.append(os.path.join(root, file))
-                # Skip subdirectories of this core to avoid including subblocks specific of this core
-                dirs[:] = []
-                continue
-    return cores
+    py2hwsw_dir = os.path.join(os.path.dirname(__file__), "..")
+    # Lib cores are obtained from the (cached) core index of the py2hwsw directory.
+    # Directories named 'scripts', 'test' and 'document' are skipped, and so are
+    # subdirectories of cores, to avoid including subblocks specific of a core.
+    return [
+        os.path.join(py2hwsw_dir, rel_path)
+        for rel_path in get_index(py2hwsw_dir).get_lib_cores("lib")
+    ]
 
 
 # Browse/Copy/Manage py2hwsw files
@@ -587,3 +743,53 @@ def validate_verilog_const(value: str, direction: str):
         fail_with_msg(
             f"Invalid direction '{direction}' for wire '{value}'! Expected input or output."
         )
+
+
+#
+# Test this Python module
+#
+
+
+def benchmark(sizes=(100, 1000, 10000, 100000), plain_lookups=1000):
+    """Print time of lookups by name in lists of increasing size. Lookups in an
+    `iob_named_list` should take the same time for every size, and lookups in a plain
+    list should grow with its size.
+    param sizes: numbers of objects of the lists
+    param plain_lookups: maximum number of lookups timed in plain lists
+    """
+    print(
+        f"{'Size':>8}{'Append+find (us)':>18}{'Find (us)':>12}{'Plain list find (us)':>22}"
+    )
+    for size in sizes:
+        objs = [SimpleNamespace(name=f"obj{i}") for i in range(size)]
+
+        # Append objects one at a time, and look each one up (like connecting wires)
+        named_list = iob_named_list()
+        start = time.perf_counter()
+        for obj in objs:
+            named_list.append(obj)
+            find_obj_in_list(named_list, obj.name)
+        append_time = (time.perf_counter() - start) * 1e6 / size
+
+        # Look up every object of a complete list
+        named_list = iob_named_list(objs)
+        find_obj_in_list(named_list, objs[0].name)  # Build index
+        start = time.perf_counter()
+        for obj in objs:
+            find_obj_in_list(named_list, obj.name)
+        find_time = (time.perf_counter() - start) * 1e6 / size
+
+        # Same lookups in a plain list (each one scans the whole list)
+        plain_objs = objs[-plain_lookups:]
+        start = time.perf_counter()
+        for obj in plain_objs:
+            find_obj_in_list(objs, obj.name)
+        plain_time = (time.perf_counter() - start) * 1e6 / len(plain_objs)
+
+        print(f"{size:>8}{append_time:>18.2f}{find_time:>12.2f}{plain_time:>22.1f}")
+
+
+if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark()
+        sys.exit(0)
@@ -7,9 +7,9 @@ from iob_base import (
     fail_with_msg,
     add_traceback_msg,
     debug,
+    iob_named_list,
 )
 
-
 attrs = [
     "core_name",
     "instance_name",
@@ -78,7 +78,7 @@ def create_block(
     core.update_global_top_module()
 
     # Ensure list given by 'blocks_attribute_name' exists
-    core.set_default_attribute(blocks_attribute_name, [])
+    core.set_default_attribute(blocks_attribute_name, iob_named_list())
 
     # Set submodule destination dir equal to current module
     if "dest_dir" not in kwargs:
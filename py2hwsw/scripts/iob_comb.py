@@ -6,8 +6,8 @@ import re
 
 from dataclasses import dataclass
 from iob_snippet import iob_snippet
-from iob_base import fail_with_msg, assert_attributes
-from iob_wire import find_signal_in_wires
+from iob_base import fail_with_msg, assert_attributes, find_obj_in_list
+from iob_wire import get_signal_index
 from iob_signal import get_real_signal
 
 
@@ -49,23 +49,16 @@ class iob_comb(iob_snippet):
         for match in nxt_regex.findall(self.verilog_code):
             nxt_vars.add(match)
 
+        signals = get_signal_index(core)
         for signal_name in outputs | nxt_vars:
             if signal_name.endswith("_o"):
-                signal = find_signal_in_wires(
-                    core.ports,
-                    signal_name,
-                    process_func=generate_direction_process_func("output"),
-                )
+                signal = signals.find(signal_name, direction="output")
                 signal.isvar = True
             elif signal_name.endswith("_io"):
-                signal = find_signal_in_wires(
-                    core.ports,
-                    signal_name,
-                    process_func=generate_direction_process_func("inout"),
-                )
+                signal = signals.find(signal_name, direction="inout")
                 signal.isvar = True
             elif signal_name.endswith("_nxt"):
-                signal = find_signal_in_wires(core.wires + core.ports, signal_name[:-4])
+                signal = signals.find(signal_name[:-4])
                 if not signal:
                     fail_with_msg(
                         f"Could not find signal '{signal_name[:-4]}' in wires of '{core.name}' for register implied by '{signal_name}'."
@@ -73,21 +66,21 @@ class iob_comb(iob_snippet):
                 signal.isreg = True
                 signal.reg_signals.append("_nxt")
             elif signal_name.endswith("_rst"):
-                signal = find_signal_in_wires(core.wires + core.ports, signal_name[:-4])
+                signal = signals.find(signal_name[:-4])
                 if not signal:
                     fail_with_msg(
                         f"Could not find signal '{signal_name[:-4]}' in wires of '{core.name}' for register implied by '{signal_name}'."
                     )
                 signal.reg_signals.append("_rst")
             elif signal_name.endswith("_en"):
-                signal = find_signal_in_wires(core.wires + core.ports, signal_name[:-3])
+                signal = signals.find(signal_name[:-3])
                 if not signal:
                     fail_with_msg(
                         f"Could not find signal '{signal_name[:-3]}' in wires of '{core.name}' for register implied by '{signal_name}'."
                     )
                 signal.reg_signals.append("_en")
             else:
-                signal = find_signal_in_wires(core.wires + core.ports, signal_name)
+                signal = signals.find(signal_name)
                 signal.isvar = True
 
             if signal is None:
@@ -106,21 +99,26 @@ class iob_comb(iob_snippet):
     def infer_registers(self, core):
         """Infer registers from the combinatory code and create the necessary subblocks"""
 
+        # Clock interface port, and number of ports when it was searched
+        clk_port = None
+        n_ports = None
+        # Instance names of subblocks
+        instance_names = {block.instance_name for block in core.subblocks}
         for wire in core.wires + core.ports:
             for signal_ref in wire.signals:
                 signal = get_real_signal(signal_ref)
                 if signal.isreg:
+                    if n_ports != len(core.ports):
+                        clk_port = self.find_clk_port(core)
+                        n_ports = len(core.ports)
                     clk_if_name = "clk_en_rst_s"
-                    # Find the clock interface if it exists
-                    # and overwrite the default one
-                    for port in core.ports:
-                        if port.interface:
-                            if port.interface.type == "iob_clk" and port.interface.prefix == self.clk_prefix:
-                                clk_if_name = port.name
-                                if port.interface.params:
-                                    port_params = port.interface.params
-                                else:
-                                    port_params = "c_a"
+                    # Overwrite the default clock interface if it exists
+                    if clk_port:
+                        clk_if_name = clk_port.name
+                        if clk_port.interface.params:
+                            port_params = clk_port.interface.params
+                        else:
+                            port_params = "c_a"
 
                     # Connect the register
                     connect = {
@@ -132,9 +130,7 @@ class iob_comb(iob_snippet):
                     # Find the register signals (if any)
                     if any(reg_signal == "_nxt" for reg_signal in signal.reg_signals):
                         # If the _nxt wire does not already exists, create it
-                        if not any(
-                            wire.name == f"{signal.name}_nxt" for wire in core.wires
-                        ):
+                        if not find_obj_in_list(core.wires, f"{signal.name}_nxt"):
                             core.create_wire(
                                 name=f"{signal.name}_nxt",
                                 signals=[
@@ -184,16 +180,15 @@ class iob_comb(iob_snippet):
                         port_params = port_params + "_r"
 
                     if any(x in port_params for x in ["_r", "_e"]):
-                        if not any(
-                            wire.name == f"{signal.name}_reg_signals"
-                            for wire in core.wires
+                        if not find_obj_in_list(
+                            core.wires, f"{signal.name}_reg_signals"
                         ):
                             core.create_wire(
                                 name=f"{signal.name}_reg_signals", signals=_reg_signals
                             )
 
                     # Create the clock interface in the core, if it does not exist
-                    if not any(port.name == "clk_en_rst_s" for port in core.ports):
+                    if not find_obj_in_list(core.ports, "clk_en_rst_s"):
                         core.create_port(
                             name="clk_en_rst_s",
                             signals={"type": "iob_clk", "params": self.clk_if},
@@ -206,10 +201,8 @@ class iob_comb(iob_snippet):
 
                     # Create the subblock for the register
                     # if it does not already exist
-                    if not any(
-                        block.instance_name == f"{signal.name}_reg"
-                        for block in core.subblocks
-                    ):
+                    if f"{signal.name}_reg" not in instance_names:
+                        instance_names.add(f"{signal.name}_reg")
                         core.create_subblock(
                             core_name="iob_reg",
                             instance_name=f"{signal.name}_reg",
@@ -219,18 +212,18 @@ class iob_comb(iob_snippet):
                             instance_description=f"{signal.name} register",
                         )
 
-
-def generate_direction_process_func(direction):
-    """Generates a process function that returns a signal if it matches the direction"""
-
-    def filter_signal(signal):
-        signal = get_real_signal(signal)
-        if signal.direction == direction:
-            return signal
-        # Return empty object if not correct signal direction
-        return None
-
-    return filter_signal
+    def find_clk_port(self, core):
+        """Return the last clock interface port of the core with the prefix of this
+        circuit's clock interface (or None if there is none)"""
+        clk_port = None
+        for port in core.ports:
+            if port.interface:
+                if (
+                    port.interface.type == "iob_clk"
+                    and port.interface.prefix == self.clk_prefix
+                ):
+                    clk_port = port
+        return clk_port
 
 
 def create_comb(core, *args, **kwargs):
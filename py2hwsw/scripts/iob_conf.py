@@ -10,6 +10,7 @@ from iob_base import (
     str_to_kwargs,
     assert_attributes,
     find_obj_in_list,
+    iob_named_list,
 )
 
 
@@ -93,7 +94,7 @@ def create_conf_group(core, *args, **kwargs):
     """
     try:
         # Ensure 'confs' list exists
-        core.set_default_attribute("confs", [])
+        core.set_default_attribute("confs", iob_named_list())
 
         general_group_ref = None
         group_kwargs = kwargs
@@ -0,0 +1,187 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+#
+#    iob_context.py: state of an elaboration (setup) run
+#
+# Every piece of state shared by the cores of a run (project settings, top module,
+# special target, post setup callbacks, iob_globals, loaded core modules, and files
+# tracked by `build_files.py`) is stored in an `iob_context` object.
+#
+# The current context is kept in a `contextvars.ContextVar`, so several independent
+# runs may elaborate their own top module in the same process, either sequentially
+# (using `new_context()`) or concurrently (each thread/task with its own context).
+# Code that does not select a context uses the default context of the process.
+#
+# Note: This module must only depend on python's standard library, as it is
+# imported by most py2hwsw modules.
+#
+
+import time
+import threading
+import contextlib
+import contextvars
+
+
+class iob_context:
+    """State of an elaboration run"""
+
+    def __init__(
+        self,
+        build_dir="",
+        project_root=".",
+        project_vformat=True,
+        project_vlint=True,
+        clang_format_rules_filepath=None,
+        special_target="",
+        debug_level=0,
+        jobs=1,
+        post_setup_only=[],
+        post_setup_skip=[],
+        write_snippets=False,
+        dry_run=False,
+    ):
+        """
+        param build_dir: build directory of the top module
+        param project_root: directory to search for core setup files
+        param project_vformat: if verilog files should be formatted
+        param project_vlint: if verilog files should be linted
+        param clang_format_rules_filepath: path to custom clang-format rules file
+        param special_target: project wide special target. Used when we don't want to run
+                              normal setup (for example, when cleaning).
+        param debug_level: debug level of `iob_base.debug()` messages
+        param jobs: number of threads used to generate the files of subblocks
+        param post_setup_only: if not empty, only these post setup steps are run
+        param post_setup_skip: post setup steps that are not run
+        param write_snippets: if Verilog snippets ('.vs' files) should be written to disk
+                              (and kept after their includes are replaced)
+        param dry_run: if the build directory is a staging directory of a dry run
+                       (see `dry_run.py`)
+        """
+        # Project settings
+        self.build_dir = build_dir
+        self.project_root = project_root
+        self.project_vformat = project_vformat
+        self.project_vlint = project_vlint
+        self.clang_format_rules_filepath = clang_format_rules_filepath
+        self.special_target = special_target
+        self.debug_level = debug_level
+        self.jobs = jobs
+        self.post_setup_only = list(post_setup_only)
+        self.post_setup_skip = list(post_setup_skip)
+        self.write_snippets = write_snippets
+        self.dry_run = dry_run
+        # First module created in this run. Datatype is 'iob_module'.
+        self.top_module = None
+        # List of callbacks to run at post setup stage
+        self.post_setup_callbacks = []
+        # The `iob_globals` instance of this run
+        self.globals = None
+        # Python modules loaded by this run (core setup files).
+        # Key: absolute path of module file, Value: python module
+        self.modules = {}
+        # If a traceback was already printed by `iob_base.add_traceback_msg()`
+        self.printed_traceback = False
+        # Results of core setup functions (see `setup_cache.py`).
+        # Key: path of core's python file, Value: list of stored results
+        self.setup_memo = {}
+        # Modules already generated in the build directory by cores created from stored
+        # setup results. Key: (kind, name, build_dir), Value: module key of last core
+        # that generated files with that name.
+        self.generated_modules = {}
+
+        # Files tracked by `build_files.py`
+        # Arguments given to py2hwsw that affect the generated build directory.
+        self.build_args = {}
+        # Files read and written by this run. Sets of absolute paths.
+        self.build_inputs = set()
+        self.build_outputs = set()
+        # Directories whose files were copied by this run (a file added to them changes
+        # the build directory). Set of absolute paths.
+        self.build_input_dirs = set()
+        # Files modified after this time are considered outputs of this run.
+        # Uses a margin to account for coarse timestamps of some file systems.
+        self.start_time_ns = time.time_ns() - 2_000_000_000
+        # Manifests found in build directories before they were modified by this run.
+        # Dictionary of absolute build dir path -> manifest
+        self.previous_manifests = {}
+        # Ledger of sources written/copied to build directories by this run.
+        # Key: absolute path, Value: absolute path of source file (None if generated)
+        self.build_sources = {}
+        # Sources not written (or removed) because they duplicate a main source.
+        # Key: absolute path, Value: absolute path of main source
+        self.duplicate_sources = {}
+        # Folders with duplicate sources. List of tuples (main folder, subfolders)
+        self.duplicate_source_rules = []
+        self.sources_lock = threading.Lock()
+        # Verilog snippets kept in memory (not written to disk).
+        # Key: absolute path of snippet file, Value: content
+        self.snippets = {}
+        # Verilog sources with snippet include statements, kept in memory until their
+        # includes are replaced. Key: absolute path of source file,
+        # Value: tuple (content, final, path of the file it was copied from or None)
+        self.pending_sources = {}
+        # Directories whose pending sources were written. Sources written inside them
+        # later are written directly. Set of absolute paths.
+        self.pending_sources_written = set()
+
+        # License headers added when files are written (see `manage_headers.py`).
+        # Header of files in each build directory. Key: absolute build dir path
+        self.build_headers = {}
+        # Files that got their header when written. Key: absolute path,
+        # Value: tuple (size, mtime_ns, header, True if the header was added)
+        self.written_headers = {}
+
+        # Paths whose permissions were fixed by `iob_base.nix_permission_hack()`
+        self.permission_fixed_paths = set()
+
+        # Parallel generation of subblocks (see `parallel_setup.py`)
+        self.generation_executor = None
+        # Pending generation tasks (futures), in serial order
+        self.generation_tasks = []
+        # Last task submitted for each core name/setup dir. Key: (kind, name)
+        self.generation_task_keys = {}
+        self.generation_task_count = 0
+        # Sequence number of the last generation task that wrote each file.
+        # Key: absolute file path
+        self.output_owners = {}
+        # Locks of the output files written by generation tasks (indexed by path hash)
+        self.output_locks = [threading.Lock() for _ in range(64)]
+
+
+# Context used by code that did not select one
+_default_context = iob_context()
+_current_context = contextvars.ContextVar("iob_context", default=_default_context)
+
+
+def get_context():
+    """Return the context of the current run"""
+    return _current_context.get()
+
+
+def set_context(context):
+    """Select the context of the current run (in the current thread/task).
+    returns: Token to restore the previous context with `reset_context()`.
+    """
+    return _current_context.set(context)
+
+
+def reset_context(token):
+    """Restore context that was selected before `set_context()` returned given token"""
+    _current_context.reset(token)
+
+
+@contextlib.contextmanager
+def new_context(**kwargs):
+    """Run code inside a new context. Example:
+    with new_context(build_dir="../my_build_dir") as context:
+        iob_core.get_core_obj("iob_and")
+    param kwargs: arguments of the `iob_context` constructor
+    """
+    context = iob_context(**kwargs)
+    token = set_context(context)
+    try:
+        yield context
+    finally:
+        reset_context(token)
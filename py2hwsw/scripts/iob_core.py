@@ -9,11 +9,13 @@ import json
 from pathlib import Path
 import copy
 from types import SimpleNamespace
-import pathlib
 
 import iob_colors
 
 import copy_srcs
+import parallel_setup
+import setup_cache
+import build_files
 
 import config_gen
 import param_gen
@@ -26,28 +28,33 @@ import snippet_gen
 import doc_gen
 import verilog_gen
 import ipxact_gen
+import post_setup
 
 from py2hwsw_version import PY2HWSW_VERSION
 from iob_python_parameter import create_python_parameter_group
 from if_gen import mem_if_names
 from iob_module import iob_module, get_list_attr_handler
 from iob_instance import iob_instance
+from iob_context import get_context, new_context
+from core_metadata import find_module_setup_dir, print_core_metadata
 from iob_base import (
     find_obj_in_list,
     fail_with_msg,
     find_file,
     import_python_module,
-    nix_permission_hack,
     add_traceback_msg,
     debug,
     get_lib_cores,
+    iob_named_list,
 )
 from iob_license import iob_license, update_license
 import sw_tools
 import verilog_format
 import verilog_lint
-from manage_headers import generate_headers
+from manage_headers import generate_headers, register_build_header
 from iob_signal import remove_signal_direction_suffixes
+from iob_wire import invalidate_signal_index
+from post_setup import post_setup_step, ALL_RESOURCES
 
 
 class iob_core(iob_module, iob_instance):
@@ -56,17 +63,8 @@ class iob_core(iob_module, iob_instance):
     # List of global wires.
     # See 'TODO' in iob_core.py for more info: https://github.com/IObundle/py2hwsw/blob/a1e2e2ee12ca6e6ad81cc2f8f0f1c1d585aaee73/py2hwsw/scripts/iob_core.py#L251-L259
     global_wires: list
-    # Project settings
-    global_build_dir: str = ""
-    global_project_root: str = "."
-    global_project_vformat: bool = True
-    global_project_vlint: bool = True
-    # Project wide special target. Used when we don't want to run normal setup (for example, when cleaning).
-    global_special_target: str = ""
-    # Clang format rules
-    global_clang_format_rules_filepath: str = None
-    # List of callbacks to run at post setup stage
-    global_post_setup_callbacks: list = []
+    # Project settings, global top module, special target and post setup callbacks
+    # are stored in the `iob_context` of the current run. See `iob_context.py`.
 
     def __init__(self, *args, **kwargs):
         """Build a core (includes module and instance attributes)
@@ -91,6 +89,7 @@ class iob_core(iob_module, iob_instance):
         :param bool is_parent: If this core is a parent core
         """
         # Arguments used by this class
+        module_key = kwargs.pop("module_key", None)
         dest_dir = kwargs.get("dest_dir", "hardware/src")
         attributes = kwargs.get("attributes", {})
         connect = kwargs.get("connect", {})
@@ -183,7 +182,7 @@ class iob_core(iob_module, iob_instance):
         )
         self.set_default_attribute(
             "is_top_module",
-            __class__.global_top_module == self,
+            get_context().top_module == self,
             bool,
             descr="Selects if core is top module. Auto-filled. DO NOT CHANGE.",
         )
@@ -202,16 +201,16 @@ class iob_core(iob_module, iob_instance):
         # List of core Python Parameters (for documentation)
         self.set_default_attribute(
             "python_parameters",
-            [],
+            iob_named_list(),
             list,
-            get_list_attr_handler(self.create_python_parameter_group),
+            get_list_attr_handler(iob_core.create_python_parameter_group),
             descr="List of core Python Parameters. Used for documentation.",
         )
         self.set_default_attribute(
             "license",
             iob_license(),  # Create a default license
             iob_license,
-            lambda y: update_license(self, **y),
+            lambda obj, y: update_license(obj, **y),
             descr="License for the core.",
         )
         self.set_default_attribute(
@@ -234,25 +233,37 @@ class iob_core(iob_module, iob_instance):
 
         self.attributes_dict = copy.deepcopy(attributes)
 
+        context = get_context()
         self.abort_reason = None
         # Don't setup this core if using a project wide special target.
-        if __class__.global_special_target:
-            if __class__.global_special_target == "ipxact_gen":
+        if context.special_target:
+            if context.special_target == "ipxact_gen":
                 # Will cause setup to abort except for iob_csrs (to generate memory map)
                 self.abort_reason = "ipxact_gen"
             else:
                 self.abort_reason = "special_target"
 
-        # Temporarily change global_build_dir to match tester's directory (for tester blocks)
-        build_dir_backup = __class__.global_build_dir
+        # Temporarily change global build_dir to match tester's directory (for tester blocks)
+        build_dir_backup = context.build_dir
         if attributes.get("is_tester", False):
             # If is tester, build dir is same "dest_dir". (default: tester)
             self.relative_path_to_tester = kwargs.get("dest_dir", "tester")
-            __class__.global_build_dir = os.path.join(
-                __class__.global_build_dir, self.relative_path_to_tester
+            context.build_dir = os.path.join(
+                context.build_dir, self.relative_path_to_tester
             )
             self.dest_dir = "hardware/src"
 
+        # Register license header of files written in the build directory (of the top
+        # module or tester). The license is set first, so that files generated by
+        # subblocks already get their header when written.
+        if (
+            (self.is_top_module and not is_parent) or attributes.get("is_tester", False)
+        ) and not context.special_target:
+            if "license" in attributes:
+                self.parse_attributes_dict({"license": attributes.pop("license")})
+            register_build_header(context.build_dir, **self.__get_header_args())
+            self.__register_duplicate_sources(context.build_dir, build_dir_backup)
+
         # Read 'attributes' dictionary and set corresponding core attributes
         superblocks = attributes.pop("superblocks", [])
         # Note: Parsing attributes (specifically the subblocks list) also causes the setup process for subblocks to run
@@ -291,24 +302,63 @@ class iob_core(iob_module, iob_instance):
             param_gen.generate_inst_params(self.instantiator)
 
         if not self.is_top_module:
-            self.build_dir = __class__.global_build_dir
+            self.build_dir = context.build_dir
         # print(
         #     f"DEBUG: {self.name} {self.original_name} {self.build_dir} {self.is_top_module}",
         #     file=sys.stderr,
         # )
 
-        # Restore global_build_dir (previously changed for tester blocks)
+        # Restore global build_dir (previously changed for tester blocks)
         if self.is_tester:
-            __class__.global_build_dir = build_dir_backup
+            context.build_dir = build_dir_backup
 
         if self.abort_reason:
             return
 
+        if self.is_top_module or self.is_tester:
+            # Subblocks must be generated before the top module (and testers)
+            parallel_setup.wait_generation_tasks()
+            self._generate_files()
+        elif self.__is_module_generated(module_key):
+            # Another instance of the same module already generated its files.
+            # Only generate the files of this instance.
+            parallel_setup.submit_generation_task(
+                self, lambda: param_gen.generate_inst_params_snippet(self)
+            )
+        else:
+            # May run in parallel with other subblocks (`--jobs` option)
+            parallel_setup.submit_generation_task(self, self._generate_files)
+
+        if (self.is_top_module and not is_parent) or self.is_tester:
+            self.post_setup()
+
+    def __is_module_generated(self, module_key):
+        """Check if the files of this core's module were already generated by another
+        instance created from the same setup result (see `setup_cache.py`).
+        Also registers this core as the last one to generate files with its names.
+        param module_key: key of this core's module. None if it can not be identified.
+        """
+        generated_modules = get_context().generated_modules
+        keys = [
+            ("name", self.name, self.build_dir),
+            ("original_name", self.original_name, self.build_dir),
+        ]
+        is_generated = module_key is not None and all(
+            generated_modules.get(key) == module_key for key in keys
+        )
+        for key in keys:
+            generated_modules[key] = module_key
+        return is_generated
+
+    def _generate_files(self):
+        """Generate the files of this core in the build directory.
+        Generation of subblocks may run in parallel (see `parallel_setup.py`).
+        """
         self.__create_build_dir()
 
         if self.is_tester:
             self.relative_path_to_UUT = os.path.relpath(
-                __class__.global_build_dir, self.build_dir
+                get_context().build_dir, self.build_dir
             )
 
         # Copy files from LIB to setup various flows
@@ -321,7 +371,7 @@ class iob_core(iob_module, iob_instance):
 
         # Generate config_build.mk
         if self.is_top_module or self.is_tester:
-            config_gen.config_build_mk(self, __class__.global_top_module)
+            config_gen.config_build_mk(self, get_context().top_module)
 
         # Generate configuration files
         config_gen.generate_confs(self)
@@ -362,58 +412,149 @@ class iob_core(iob_module, iob_instance):
         # TODO as well: Each module has a local `snippets` list.
         # Note: The 'width' attribute of many module's signals are generaly not needed, because most of them will be connected to global wires (that already contain the width).
 
-        if (self.is_top_module and not is_parent) or self.is_tester:
-            self.post_setup()
-
     def post_setup(self):
-        """Scripts to run at the end of the top module's setup"""
-        # Replace Verilog snippet includes
-        self._replace_snippet_includes()
-        # Clean duplicate sources in `hardware/src` and its subfolders (like `hardware/simulation/src`)
-        self._remove_duplicate_sources()
-        if self.is_tester:
-            # Add callback to: Remove duplicate sources from tester dirs, that already exist in UUT's `hardware/src` folder
-            __class__.global_post_setup_callbacks.append(
-                lambda: self._remove_duplicate_sources(
-                    main_folder=os.path.join(self.relative_path_to_UUT, "hardware/src"),
-                    subfolders=[
-                        "hardware/src",
-                        "hardware/simulation/src",
-                        "hardware/fpga/src",
-                        "hardware/common_src",
-                    ],
+        """Scripts to run at the end of the top module's setup.
+        Steps that do not use the same files run in parallel (see `post_setup.py`).
+        """
+        if not post_setup.is_step_selected("snippets"):
+            # Include statements are kept, so snippets must be written to disk
+            get_context().write_snippets = True
+            build_files.write_snippets(self.build_dir)
+            build_files.write_pending_sources(self.build_dir)
+        steps = [
+            post_setup_step(
+                "snippets",
+                self._replace_snippet_includes,
+                inputs=["verilog"],
+                outputs=["verilog"],
+            ),
+            post_setup_step(
+                "sources",
+                self.__remove_unused_sources,
+                inputs=["verilog", "software"],
+                outputs=["verilog", "software"],
+            ),
+        ]
+        if not self.is_tester:
+            steps.append(
+                post_setup_step(
+                    "callbacks",
+                    self.__run_post_setup_callbacks,
+                    inputs=[ALL_RESOURCES],
+                    outputs=[ALL_RESOURCES],
+                )
+            )
+        steps += [
+            post_setup_step(
+                "docs", lambda: doc_gen.generate_docs(self), outputs=["docs"]
+            ),
+            post_setup_step(
+                "ipxact",
+                lambda: ipxact_gen.generate_ipxact_xml(
+                    self, self.build_dir + "/ipxact"
+                ),
+                outputs=["ipxact"],
+            ),
+            post_setup_step(
+                "lint", self.__lint_verilog, inputs=["verilog"], outputs=["lint"]
+            ),
+            post_setup_step(
+                "verilog_format",
+                self.__format_verilog,
+                inputs=["verilog"],
+                outputs=["verilog"],
+            ),
+            post_setup_step(
+                "sw_format",
+                self.__format_sw,
+                inputs=["software"],
+                outputs=["software"],
+            ),
+            # Add SPDX license headers to files in build dir that did not get them when written
+            post_setup_step(
+                "headers",
+                self.__generate_headers,
+                inputs=[ALL_RESOURCES],
+                outputs=[ALL_RESOURCES],
+            ),
+        ]
+        # Store manifest of generated files (testers are included in the top's manifest)
+        # Dry runs do not store it, since their build directory is temporary.
+        if not self.is_tester and not get_context().dry_run:
+            steps.append(
+                post_setup_step(
+                    "manifest",
+                    lambda: build_files.finish_build(self.build_dir),
+                    inputs=[ALL_RESOURCES],
+                    outputs=[ALL_RESOURCES],
                 )
             )
-        else:  # Not tester
-            # Run post setup callbacks
-            for callback in __class__.global_post_setup_callbacks:
-                callback()
-        # Generate docs
-        doc_gen.generate_docs(self)
-        # Generate ipxact file
-        ipxact_gen.generate_ipxact_xml(self, self.build_dir + "/ipxact")
+        post_setup.run_steps(steps)
+        if get_context().dry_run:
+            return
+        print(
+            f"{iob_colors.INFO}Setup of '{self.original_name}' core successful. Generated build directory: '{self.build_dir}'.{iob_colors.ENDC}"
+        )
+
+    def __remove_unused_sources(self):
+        # Remove duplicate sources not resolved when written (see `build_files.py`)
+        build_files.resolve_duplicate_sources()
         # Remove 'iob_v_tb.v' from build dir if 'iob_v_tb.vh' does not exist
         sim_src_dir = "hardware/simulation/src"
         if "iob_v_tb.vh" not in os.listdir(os.path.join(self.build_dir, sim_src_dir)):
             os.remove(f"{self.build_dir}/{sim_src_dir}/iob_v_tb.v")
-        # Lint and format sources
-        self.lint_and_format()
-        print(
-            f"{iob_colors.INFO}Setup of '{self.original_name}' core successful. Generated build directory: '{self.build_dir}'.{iob_colors.ENDC}"
-        )
-        # Add SPDX license headers to every file in build dir
-        custom_header=f"Py2HWSW Version {PY2HWSW_VERSION} has generated this code (https://github.com/IObundle/py2hwsw)."
+
+    def __run_post_setup_callbacks(self):
+        for callback in get_context().post_setup_callbacks:
+            callback()
+
+    def __generate_headers(self):
         generate_headers(
             root=self.build_dir,
-            copyright_holder=self.license.author,
-            copyright_year=self.license.year,
-            license_name=self.license.name,
-            header_template="spdx",
-            custom_header_suffix=custom_header,
+            **self.__get_header_args(),
             skip_existing_headers=True,
             verbose=False,
+            ignore_paths=[
+                os.path.join(self.build_dir, build_files.PY2HWSW_BUILD_DIR),
+                os.path.join(self.build_dir, "LICENSES"),
+            ],
+        )
+
+    def __register_duplicate_sources(self, build_dir, uut_build_dir):
+        """Register folders of the build directory (of the top module or tester) whose
+        sources are not written if they already exist in `hardware/src`.
+        param build_dir: build directory of this core
+        param uut_build_dir: build directory of the UUT (for testers)
+        """
+        build_files.register_duplicate_sources(
+            os.path.join(build_dir, "hardware/src"),
+            [
+                os.path.join(build_dir, "hardware/simulation/src"),
+                os.path.join(build_dir, "hardware/fpga/src"),
+                os.path.join(build_dir, "hardware/common_src"),
+            ],
         )
+        if build_dir != uut_build_dir:
+            # Tester sources that already exist in UUT's `hardware/src` folder
+            build_files.register_duplicate_sources(
+                os.path.join(uut_build_dir, "hardware/src"),
+                [
+                    os.path.join(build_dir, "hardware/src"),
+                    os.path.join(build_dir, "hardware/simulation/src"),
+                    os.path.join(build_dir, "hardware/fpga/src"),
+                    os.path.join(build_dir, "hardware/common_src"),
+                ],
+            )
 
+    def __get_header_args(self):
+        """Return arguments of the SPDX license header of files in the build directory"""
+        return {
+            "copyright_holder": self.license.author,
+            "copyright_year": self.license.year,
+            "license_name": self.license.name,
+            "header_template": "spdx",
+            "custom_header_suffix": f"Py2HWSW Version {PY2HWSW_VERSION} has generated this code (https://github.com/IObundle/py2hwsw).",
+        }
 
     def create_python_parameter_group(self, *args, **kwargs):
         create_python_parameter_group(self, *args, **kwargs)
@@ -437,15 +578,16 @@ class iob_core(iob_module, iob_instance):
             f"Parent and child cannot have the same name: '{parent['core_name']}'"
         )
 
-        belongs_to_top_module = not __class__.global_top_module
+        context = get_context()
+        belongs_to_top_module = not context.top_module
         # Check if this child module is the first one called (It is the leaf child of the top module. Does not have any other childs.)
         is_first_module_called = belongs_to_top_module and not is_parent
 
         name = attributes.get("name", attributes["original_name"])
         # Update global build dir to match this module's name and version
-        if is_first_module_called and not __class__.global_build_dir:
+        if is_first_module_called and not context.build_dir:
             version = attributes.get("version", PY2HWSW_VERSION)
-            __class__.global_build_dir = f"../{name}_V{version}"
+            context.build_dir = f"../{name}_V{version}"
 
         filtered_parent_py_params = dict(parent)
         filtered_parent_py_params.pop("core_name", None)
@@ -537,8 +679,9 @@ class iob_core(iob_module, iob_instance):
                           Will be used to get the core name and version if available.
         """
         super().update_global_top_module()
+        context = get_context()
         # Ensure top module has a build dir (and associated attributes)
-        if __class__.global_top_module == self:
+        if context.top_module == self:
             original_name = attributes.get("original_name", self.__class__.__name__)
             name = attributes.get("name", self.original_name)
             version = attributes.get("version", PY2HWSW_VERSION)
@@ -549,9 +692,12 @@ class iob_core(iob_module, iob_instance):
                 self.name = name
             if not hasattr(self, "version") or not self.version:
                 self.version = version
-            if not __class__.global_build_dir:
-                __class__.global_build_dir = f"../{self.name}_V{self.version}"
-            self.set_default_attribute("build_dir", __class__.global_build_dir)
+            if not context.build_dir:
+                context.build_dir = f"../{self.name}_V{self.version}"
+            self.set_default_attribute("build_dir", context.build_dir)
+            # Store state of build dir before generating files in it
+            if not context.special_target:
+                build_files.begin_build(context.build_dir)
 
     def __fix_subblock_cbus_widths(self):
         """Used specifically for iob_system type cores
@@ -598,7 +744,9 @@ class iob_core(iob_module, iob_instance):
                 "descr": port.descr,
             }
         )
-        _port = find_obj_in_list(instantiator.ports + instantiator.wires, _name)
+        _port = find_obj_in_list(instantiator.ports, _name) or find_obj_in_list(
+            instantiator.wires, _name
+        )
         port.connect_external(_port, bit_slices=[])
 
     def __connect_clk_interface(self, port, instantiator):
@@ -623,6 +771,7 @@ class iob_core(iob_module, iob_instance):
                         )
                         p.signals = []
                         p.__post_init__()
+                        invalidate_signal_index(instantiator)
                     port.connect_external(p, bit_slices=[])
                     return
         instantiator.create_port(name=_name, signals=_signals, descr=port.descr)
@@ -667,10 +816,15 @@ class iob_core(iob_module, iob_instance):
                     instantiator.wires, wire_name
                 ) or find_obj_in_list(instantiator.ports, wire_name)
                 if not wire:
-                    debug(f"Creating implicit wire '{port.name}' in '{instantiator.name}'.", 1)
+                    debug(
+                        f"Creating implicit wire '{port.name}' in '{instantiator.name}'.",
+                        1,
+                    )
                     # Add wire to instantiator
                     wire_signals = remove_signal_direction_suffixes(port.signals)
-                    instantiator.create_wire(name=wire_name, signals=wire_signals, descr=port.descr)
+                    instantiator.create_wire(
+                        name=wire_name, signals=wire_signals, descr=port.descr
+                    )
                     # Add wire to attributes_dict as well
                     instantiator.attributes_dict["wires"].append(
                         {
@@ -758,31 +912,9 @@ class iob_core(iob_module, iob_instance):
         os.makedirs(f"{self.build_dir}/document", exist_ok=True)
         os.makedirs(f"{self.build_dir}/document/tsrc", exist_ok=True)
 
-        shutil.copyfile(
+        build_files.copy_file(
             f"{copy_srcs.get_lib_dir()}/build.mk", f"{self.build_dir}/Makefile"
         )
-        nix_permission_hack(f"{self.build_dir}/Makefile")
-
-    def _remove_duplicate_sources(self, main_folder="hardware/src", subfolders=None):
-        """Remove sources in the build directory from subfolders that exist in `hardware/src`"""
-        if not subfolders:
-            subfolders = [
-                "hardware/simulation/src",
-                "hardware/fpga/src",
-                "hardware/common_src",
-            ]
-
-        # Go through all subfolders that may contain duplicate sources
-        for subfolder in subfolders:
-            # Get common srcs between main_folder and current subfolder
-            common_srcs = find_common_deep(
-                os.path.join(self.build_dir, main_folder),
-                os.path.join(self.build_dir, subfolder),
-            )
-            # Remove common sources
-            for src in common_srcs:
-                os.remove(os.path.join(self.build_dir, subfolder, src))
-                # print(f'{iob_colors.INFO}Removed duplicate source: {os.path.join(subfolder, src)}{iob_colors.ENDC}')
 
     def _replace_snippet_includes(self):
         verilog_gen.replace_includes(
@@ -799,15 +931,20 @@ class iob_core(iob_module, iob_instance):
         # and use it to set the attribute
         for attr_name, attr_value in attributes.items():
             if attr_name in self.ATTRIBUTE_PROPERTIES:
-                self.ATTRIBUTE_PROPERTIES[attr_name].set_handler(attr_value),
+                self.ATTRIBUTE_PROPERTIES[attr_name].set_handler(self, attr_value)
             else:
                 fail_with_msg(
                     f"Unknown attribute '{attr_name}' in core {attributes['original_name']}"
                 )
 
     def lint_and_format(self):
-        """Run Linters and Formatters in setup and build directories."""
-        # Find Verilog sources and headers from build dir
+        """Run Linters and Formatters in build directory."""
+        self.__lint_verilog()
+        self.__format_verilog()
+        self.__format_sw()
+
+    def __get_verilog_files(self):
+        """Return list of Verilog headers and sources of the build directory"""
         verilog_headers = []
         verilog_sources = []
         for path in Path(os.path.join(self.build_dir, "hardware")).rglob("*.vh"):
@@ -825,31 +962,35 @@ class iob_core(iob_module, iob_instance):
                 continue
             verilog_sources.append(str(path))
             # print(str(path))
+        return verilog_headers + verilog_sources
 
+    def __lint_verilog(self):
         # Run Verilog linter
         # FIXME: Don't run for tester since iob_system is still full of warnings (and we may not even need to lint tester files?)
-        if __class__.global_project_vlint and not self.is_tester:
-            verilog_lint.lint_files(verilog_headers + verilog_sources)
+        if get_context().project_vlint and not self.is_tester:
+            verilog_lint.lint_files(
+                self.__get_verilog_files(),
+                report_path=os.path.join(
+                    self.build_dir, build_files.PY2HWSW_BUILD_DIR, "verilog_lint.json"
+                ),
+            )
 
+    def __format_verilog(self):
         # Run Verilog formatter
-        if __class__.global_project_vformat:
+        if get_context().project_vformat:
             verilog_format.format_files(
-                verilog_headers + verilog_sources,
+                self.__get_verilog_files(),
                 os.path.join(os.path.dirname(__file__), "verible-format.rules"),
             )
 
-        # Run Python formatter
-        sw_tools.run_tool("black")
-        sw_tools.run_tool("black", self.build_dir)
-
-        # Run C formatter
-        sw_tools.run_tool(
-            "clang", rules_file_path=__class__.global_clang_format_rules_filepath
-        )
-        sw_tools.run_tool(
+    def __format_sw(self):
+        # Run Python and C formatters on files generated for this build
+        build_outputs = build_files.get_build_outputs(self.build_dir)
+        sw_tools.format_files("black", build_outputs)
+        sw_tools.format_files(
             "clang",
-            self.build_dir,
-            rules_file_path=__class__.global_clang_format_rules_filepath,
+            build_outputs,
+            rules_file_path=get_context().clang_format_rules_filepath,
         )
 
     @classmethod
@@ -889,7 +1030,7 @@ class iob_core(iob_module, iob_instance):
     def clean_build_dir(core_name):
         """Clean build directory."""
         # Set project wide special target (will prevent normal setup)
-        __class__.global_special_target = "clean"
+        get_context().special_target = "clean"
         # Build a new module instance, to obtain its attributes
         module = __class__.get_core_obj(core_name)
         # Don't try to clean if build dir doesn't exist
@@ -908,7 +1049,7 @@ class iob_core(iob_module, iob_instance):
     def deliver_core(core_name):
         """Deliver core."""
         # Set project wide special target (will prevent normal setup)
-        __class__.global_special_target = "deliver"
+        get_context().special_target = "deliver"
         # Build a new module instance, to obtain its attributes
         module = __class__.get_core_obj(core_name)
         # Don't try to deliver if build dir doesn't exist
@@ -921,36 +1062,37 @@ class iob_core(iob_module, iob_instance):
         print(f"{iob_colors.INFO}Delivering core: {core_name} {iob_colors.ENDC}")
         os.system(f"CORE={core_name} BUILD_DIR={module.build_dir} delivery.sh")
 
+    @staticmethod
+    def check_build_dir(core_name, **kwargs):
+        """Check if build directory is up to date, based on its manifest.
+        Exits with code 1 if it is not.
+        """
+        build_dir = get_context().build_dir
+        if not build_dir:
+            # Set project wide special target (will prevent normal setup)
+            get_context().special_target = "check"
+            # Build a new module instance, to obtain its build directory
+            build_dir = __class__.get_core_obj(core_name, **kwargs).build_dir
+        build_files.print_check_build(build_dir)
+
     @staticmethod
     def print_build_dir(core_name, **kwargs):
         """Print build directory."""
-        # Set project wide special target (will prevent normal setup)
-        __class__.global_special_target = "print_build_dir"
-        # Build a new module instance, to obtain its attributes
-        module = __class__.get_core_obj(core_name, **kwargs)
-        print(module.build_dir)
+        print_core_metadata(core_name, ["build_dir"], **kwargs)
 
     def print_core_name(core_name, **kwargs):
         """Print build directory."""
-        # Set project wide special target (will prevent normal setup)
-        __class__.global_special_target = "print_core_name"
-        # Build a new module instance, to obtain its attributes
-        module = __class__.get_core_obj(core_name, **kwargs)
-        print(module.name)
+        print_core_metadata(core_name, ["name"], **kwargs)
 
     def print_core_version(core_name, **kwargs):
         """Print build directory."""
-        # Set project wide special target (will prevent normal setup)
-        __class__.global_special_target = "print_core_version"
-        # Build a new module instance, to obtain its attributes
-        module = __class__.get_core_obj(core_name, **kwargs)
-        print(module.version)
+        print_core_metadata(core_name, ["version"], **kwargs)
 
     @staticmethod
     def print_core_dict(core_name, **kwargs):
         """Print core attributes dictionary."""
         # Set project wide special target (will prevent normal setup)
-        __class__.global_special_target = "print_core_dict"
+        get_context().special_target = "print_core_dict"
         # Build a new module instance, to obtain its attributes
         module = __class__.get_core_obj(core_name, **kwargs)
         print(json.dumps(module.attributes_dict, indent=4))
@@ -961,7 +1103,7 @@ class iob_core(iob_module, iob_instance):
         The attributes listed can be used in the 'attributes' dictionary of cores.
         """
         # Set project wide special target (will prevent normal setup)
-        __class__.global_special_target = "print_attributes"
+        get_context().special_target = "print_attributes"
         # Build a new dummy module instance, to obtain its attributes
         module = __class__()
         print("Attributes supported by the 'py2hwsw' core dictionary interface:")
@@ -979,31 +1121,35 @@ class iob_core(iob_module, iob_instance):
         python object based on info stored in those files, and info passed via python
         parameters.
         Calling this method may also begin the setup process of the core, depending on
-        the value of the `global_special_target` attribute.
+        the special target of the current run's context.
         """
         core_dir, file_ext = find_module_setup_dir(core_name)
+        build_files.record_input(os.path.join(core_dir, f"{core_name}{file_ext}"))
 
         if file_ext == ".py":
-            import_python_module(
+            core_module = import_python_module(
                 os.path.join(core_dir, f"{core_name}.py"),
             )
-            core_module = sys.modules[core_name]
             instantiator = kwargs.pop("instantiator", None)
             # Call `setup(<py_params_dict>)` function of `<core_name>.py` to
             # obtain the core's py2hwsw dictionary.
             # Give it a dictionary with all arguments of this function, since the user
             # may want to use any of them to manipulate the core attributes.
-            core_dict = core_module.setup(
+            # Results are reused for instances of the same core with the same
+            # python parameters (see `setup_cache.py`).
+            core_dict, memo_id = setup_cache.run_setup(
+                core_module,
+                os.path.join(core_dir, f"{core_name}.py"),
                 {
                     # "core_name": core_name,
-                    "build_dir": __class__.global_build_dir,
-                    "py2hwsw_target": __class__.global_special_target or "setup",
+                    "build_dir": get_context().build_dir,
+                    "py2hwsw_target": get_context().special_target or "setup",
                     "instantiator": (
                         instantiator.attributes_dict if instantiator else ""
                     ),
                     "py2hwsw_version": PY2HWSW_VERSION,
                     **kwargs,
-                }
+                },
             )
             py2_core_dict = {
                 "original_name": core_name,
@@ -1014,6 +1160,9 @@ class iob_core(iob_module, iob_instance):
             instance = __class__.py2hw(
                 py2_core_dict,
                 instantiator=instantiator,
+                module_key=setup_cache.module_key(
+                    memo_id, get_context().build_dir, kwargs
+                ),
                 # Note, any of the arguments below can have their values overridden by
                 # the py2_core_dict
                 **kwargs,
@@ -1044,7 +1193,7 @@ class iob_core(iob_module, iob_instance):
         with open(f"{core.build_dir}/document/tsrc/{core.name}_version.tex", "w") as f:
             f.write(py2_version)
         # Build a new dummy module instance, to obtain its attributes
-        __class__.global_special_target = "print_attributes"
+        get_context().special_target = "print_attributes"
         dummy_module = __class__()
         doc_gen.generate_tex_py2hwsw_attributes(
             dummy_module, f"{core.build_dir}/document/tsrc"
@@ -1068,17 +1217,19 @@ class iob_core(iob_module, iob_instance):
     @staticmethod
     def browse_lib():
         """Generate IP-XACT library with all lib cores"""
-        # Set as special target to avoid setting up the cores
-        __class__.global_special_target = "ipxact_gen"
+        context = get_context()
 
         cores = get_lib_cores()
         for path in cores:
             file = os.path.basename(path)
             print(f"Generating IP-XACT for '{file}'.")
-            # Create the core object as a top module to obtain its attributes.
+            # Create the core object as a top module (in a new context, with special
+            # target to avoid setting up the cores) to obtain its attributes.
             # Also, always set python parameter `demo=True`, since some lib cores use this parameter to generate a demo core.
-            __class__.global_top_module = None
-            module = __class__.get_core_obj(os.path.splitext(file)[0], demo=True)
+            with new_context(
+                project_root=context.project_root, special_target="ipxact_gen"
+            ):
+                module = __class__.get_core_obj(os.path.splitext(file)[0], demo=True)
             # Generate IP-XACT for the core
             ipxact_gen.generate_ipxact_xml(module, "ipxact_lib")
 
@@ -1093,60 +1244,3 @@ class iob_core(iob_module, iob_instance):
         version_str = version_str.replace("V", "")
         major_ver, minor_ver = version_str.split(".")
         return f"{int(major_ver):02d}{int(minor_ver):02d}"
-
-
-def find_common_deep(path1, path2):
-    """Find common files (recursively) inside two given directories
-    Taken from: https://stackoverflow.com/a/51625515
-    :param str path1: Directory path 1
-    :param str path2: Directory path 2
-    """
-    return set.intersection(
-        *(
-            set(
-                os.path.relpath(os.path.join(root, file), path)
-                for root, _, files in os.walk(path)
-                for file in files
-            )
-            for path in (path1, path2)
-        )
-    )
-
-
-def find_module_setup_dir(core_name):
-    """Searches for a core's setup directory
-    param core_name: The core_name object
-    returns: The path to the setup directory
-    returns: The file extension
-    """
-    file_path = find_file(
-        iob_core.global_project_root, core_name, [".py", ".json"]
-    ) or find_file(
-        os.path.join(os.path.dirname(__file__), ".."),
-        core_name,
-        [".py", ".json"],
-    )
-    if not file_path:
-        fail_with_msg(
-            f"Python/JSON setup file of '{core_name}' core not found under path '{iob_core.global_project_root}'!",
-            ModuleNotFoundError,
-        )
-
-    file_ext = os.path.splitext(file_path)[1]
-
-    filepath = pathlib.Path(file_path)
-    # Force core file to be contained in a folder with the same name.
-    # Skip this check if we are the top module (no top defined) or trying to setup the top module again (same name as previous defined top)
-    if filepath.parent.name != core_name and (
-        iob_core.global_top_module
-        and core_name != iob_core.global_top_module.original_name
-    ):
-        fail_with_msg(
-            f"Setup file of '{core_name}' must be contained in a folder with the same name!\n"
-            f"It should be in a path like: '{filepath.parent.resolve()}/{core_name}/{filepath.name}'.\n"
-            f"But found incorrect path:    '{filepath.resolve()}'."
-        )
-
-    # print("Found setup dir based on location of: " + file_path, file=sys.stderr)
-    if file_ext == ".py" or file_ext == ".json":
-        return os.path.dirname(file_path), file_ext
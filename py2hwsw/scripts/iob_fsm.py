@@ -6,7 +6,7 @@ import re
 
 from dataclasses import dataclass
 from iob_comb import iob_comb
-from iob_base import assert_attributes
+from iob_base import assert_attributes, find_obj_in_list
 
 
 @dataclass
@@ -107,7 +107,7 @@ def create_fsm(core, *args, **kwargs):
     )
 
     # Check if the FSM wire is already created, if not create it
-    if not any(wire.name == fsm.state_reg_name for wire in core.wires):
+    if not find_obj_in_list(core.wires, fsm.state_reg_name):
         core.create_wire(
             name=fsm.state_reg_name,
             descr="FSM state",
@@ -3,26 +3,27 @@
 # SPDX-License-Identifier: MIT
 
 from iob_base import fail_with_msg
+from iob_context import get_context
 
 
 class iob_globals:
-    _instance = None
-    _is_set = False
+    """Global attributes of a run. There is a single instance per `iob_context`."""
 
     def __new__(cls, **kwargs):
-        if cls._is_set:
+        context = get_context()
+        if context.globals is not None:
             # Only set new attributes — ignore existing ones
             for k, v in kwargs.items():
-                if not hasattr(cls._instance, k):
-                    setattr(cls._instance, k, v)
-            return cls._instance
+                if not hasattr(context.globals, k):
+                    setattr(context.globals, k, v)
+            return context.globals
 
         # First-time init
-        cls._instance = super().__new__(cls)
+        instance = super().__new__(cls)
         for k, v in kwargs.items():
-            setattr(cls._instance, k, v)
-        cls._is_set = True
-        return cls._instance
+            setattr(instance, k, v)
+        context.globals = instance
+        return instance
 
     def __setattr__(self, key, value):
         if hasattr(self, key):
@@ -35,7 +36,7 @@ class iob_globals:
 
 def create_globals(core, attr_name, value):
     """
-    Create a singleton instance of iob_globals with the given attributes.
+    Create the iob_globals instance of the current run with the given attributes.
     If the instance already exists, it will not be modified.
     """
     if core.is_top_module:
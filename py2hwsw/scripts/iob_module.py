@@ -2,12 +2,18 @@
 #
 # SPDX-License-Identifier: MIT
 
-from iob_base import iob_base, process_elements_from_list, fail_with_msg
+from iob_base import (
+    iob_base,
+    iob_named_list,
+    process_elements_from_list,
+    fail_with_msg,
+)
 from iob_conf import create_conf_group
 from iob_port import create_port
 from iob_wire import create_wire, get_wire_signal
 from iob_snippet import create_snippet
 from iob_globals import iob_globals, create_globals
+from iob_context import get_context
 from iob_comb import iob_comb, create_comb
 from iob_fsm import iob_fsm, create_fsm
 from iob_block import create_block
@@ -16,8 +22,6 @@ from iob_block import create_block
 class iob_module(iob_base):
     """Class to describe a (Verilog) module"""
 
-    global_top_module = None  # Datatype is 'iob_module'
-
     def __init__(self, *args, **kwargs):
         # Original name of the module.
         # (The module name commonly used in the files of the setup dir.)
@@ -41,29 +45,29 @@ class iob_module(iob_base):
             "reset_polarity",
             None,
             str,
-            self.set_rst_polarity,
+            iob_module.set_rst_polarity,
             "Global reset polarity of the module. Can be 'positive' or 'negative'. (Will override all subblocks' reset polarities).",
         )
         # List of module macros and Verilog (false-)parameters
         self.set_default_attribute(
             "confs",
-            [],
+            iob_named_list(),
             list,
-            get_list_attr_handler(self.create_conf_group),
+            get_list_attr_handler(iob_module.create_conf_group),
             "List of module macros and Verilog (false-)parameters.",
         )
         self.set_default_attribute(
             "ports",
-            [],
+            iob_named_list(),
             list,
-            get_list_attr_handler(self.create_port),
+            get_list_attr_handler(iob_module.create_port),
             "List of module ports.",
         )
         self.set_default_attribute(
             "wires",
-            [],
+            iob_named_list(),
             list,
-            get_list_attr_handler(self.create_wire),
+            get_list_attr_handler(iob_module.create_wire),
             "List of module wires.",
         )
         # List of core Verilog snippets
@@ -71,7 +75,7 @@ class iob_module(iob_base):
             "snippets",
             [],
             list,
-            get_list_attr_handler(self.create_snippet),
+            get_list_attr_handler(iob_module.create_snippet),
             "List of core Verilog snippets.",
         )
         # List of core Verilog combinatory circuits
@@ -79,7 +83,7 @@ class iob_module(iob_base):
             "comb",
             None,
             iob_comb,
-            lambda y: self.create_comb(**y),
+            lambda obj, y: obj.create_comb(**y),
             "Verilog combinatory circuit.",
         )
         # List of core Verilog finite state machines
@@ -87,31 +91,31 @@ class iob_module(iob_base):
             "fsm",
             None,
             iob_fsm,
-            lambda y: self.create_fsm(**y),
+            lambda obj, y: obj.create_fsm(**y),
             "Verilog finite state machine.",
         )
         # List of instances of other cores inside this core
         self.set_default_attribute(
             "subblocks",
-            [],
+            iob_named_list(),
             list,
-            get_list_attr_handler(self.create_subblock),
+            get_list_attr_handler(iob_module.create_subblock),
             "List of instances of other cores inside this core.",
         )
         # List of wrappers for this core
         self.set_default_attribute(
             "superblocks",
-            [],
+            iob_named_list(),
             list,
-            get_list_attr_handler(self.create_superblock),
+            get_list_attr_handler(iob_module.create_superblock),
             "List of wrappers for this core. Will only be setup if this core is a top module, or a wrapper of the top module.",
         )
         # List of software modules required by this core
         self.set_default_attribute(
             "sw_modules",
-            [],
+            iob_named_list(),
             list,
-            get_list_attr_handler(self.create_sw_instance),
+            get_list_attr_handler(iob_module.create_sw_instance),
             "List of software modules required by this core.",
         )
 
@@ -169,10 +173,12 @@ class iob_module(iob_base):
 
     def update_global_top_module(self):
         """Update global top module if it has not been set before.
-        The first module to call this method is the global top module.
+        The first module to call this method is the global top module (of the current
+        run's context).
         """
-        if not __class__.global_top_module:
-            __class__.global_top_module = self
+        context = get_context()
+        if not context.top_module:
+            context.top_module = self
 
     def handle_instantiator_subblock(self, *args, **kwargs):
         """If given kwargs describes the instantiator subblock, return True. Otherwise return False.
@@ -211,12 +217,13 @@ class iob_module(iob_base):
 def get_list_attr_handler(func):
     """Returns a handler function to set attributes from a list using the function given
     The returned function has the format:
-        returned_func(x), where x is a list of elements, likely in the 'py2hw' syntax.
-    This 'returned_func' will run the given 'func' on each element of the list 'x'
+        returned_func(obj, x), where x is a list of elements, likely in the 'py2hw' syntax.
+    This 'returned_func' will run the given 'func' (with 'obj' as first argument) on each
+    element of the list 'x'
     """
-    return lambda x: process_elements_from_list(
+    return lambda obj, x: process_elements_from_list(
         x,
         # 'y' is a dictionary describing an object in py2hw syntax
         # '**y' is used to unpack the dictionary and pass it as arguments to 'func'
-        lambda y: (func(**y) if isinstance(y, dict) else func(y)),
+        lambda y: (func(obj, **y) if isinstance(y, dict) else func(obj, y)),
     )
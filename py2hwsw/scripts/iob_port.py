@@ -14,11 +14,12 @@ from iob_base import (
     assert_attributes,
     find_obj_in_list,
     validate_verilog_const,
+    iob_named_list,
 )
 from iob_signal import iob_signal, get_real_signal
 
 
-@dataclass
+@dataclass(slots=True)
 class iob_port(iob_wire):
     """Describes an IO port."""
 
@@ -35,6 +36,9 @@ class iob_port(iob_wire):
         if not self.name:
             fail_with_msg("All ports must have a name!", ValueError)
 
+        if not isinstance(self.signals, iob_named_list):
+            self.signals = iob_named_list(self.signals)
+
         _sufix_dict = {
             "_i": "input",
             "_o": "output",
@@ -211,7 +215,7 @@ def create_port(core, *args, signals=[], **kwargs):
     param core: core object
     """
     # Ensure 'ports' list exists
-    core.set_default_attribute("ports", [])
+    core.set_default_attribute("ports", iob_named_list())
     sig_obj_list = []
     interface_obj = None
     if type(signals) is list:
@@ -230,5 +234,5 @@ def create_port(core, *args, signals=[], **kwargs):
         error_msg=f"Invalid {kwargs.get('name', '')} port attribute '[arg]'!",
     )
     port = iob_port(*args, signals=sig_obj_list, interface=interface_obj, **kwargs)
-    replace_duplicate_signals_by_references(core.ports, port.signals)
+    replace_duplicate_signals_by_references(core, port.signals, ports_only=True)
     core.ports.append(port)
@@ -11,6 +11,7 @@ from iob_base import (
     str_to_kwargs,
     assert_attributes,
     find_obj_in_list,
+    iob_named_list,
 )
 
 
@@ -62,7 +63,7 @@ def create_python_parameter_group(core, *args, **kwargs):
     """
     try:
         # Ensure 'python_parameters' list exists
-        core.set_default_attribute("python_parameters", [])
+        core.set_default_attribute("python_parameters", iob_named_list())
 
         general_group_ref = None
         group_kwargs = kwargs
@@ -8,7 +8,7 @@ import copy
 from iob_base import fail_with_msg
 
 
-@dataclass
+@dataclass(slots=True)
 class iob_signal:
     """Class that represents a wire/port signal"""
 
@@ -30,6 +30,10 @@ class iob_signal:
     # See 'TODO' in iob_core.py for more info: https://github.com/IObundle/py2hwsw/blob/a1e2e2ee12ca6e6ad81cc2f8f0f1c1d585aaee73/py2hwsw/scripts/iob_core.py#L251-L259
     value: str or int = 0
 
+    # Direction of the signal ('input', 'output' or 'inout'). Set from the suffix of
+    # the signal name (like '_i', '_o' or '_io'), if it has one.
+    direction: str = ""
+
     def __post_init__(self):
         if not self.name:
             fail_with_msg("Signal name is not set", ValueError)
@@ -70,7 +74,7 @@ class iob_signal:
             return self.width
 
 
-@dataclass
+@dataclass(slots=True)
 class iob_signal_reference:
     """Class that references another signal
     Use to distinguish from a real signal (for generator scripts)
@@ -2,7 +2,7 @@
 #
 # SPDX-License-Identifier: MIT
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from typing import List
 
 import if_gen
@@ -13,11 +13,12 @@ from iob_base import (
     add_traceback_msg,
     str_to_kwargs,
     assert_attributes,
+    iob_named_list,
 )
 from iob_signal import iob_signal, iob_signal_reference, get_real_signal
 
 
-@dataclass
+@dataclass(slots=True)
 class iob_wire:
     """Class to represent a wire in an iob module"""
 
@@ -32,12 +33,15 @@ class iob_wire:
     if_not_defined: str = ""
     # List of signals belonging to this wire
     # (each signal represents a hardware Verilog wire).
-    signals: List = field(default_factory=list)
+    signals: List = field(default_factory=iob_named_list)
 
     def __post_init__(self):
         if not self.name:
             fail_with_msg("All wires must have a name!", ValueError)
 
+        if not isinstance(self.signals, iob_named_list):
+            self.signals = iob_named_list(self.signals)
+
         if self.interface:
             self.signals += if_gen.get_signals(
                 name=self.interface.type,
@@ -53,7 +57,7 @@ class iob_wire:
                 # Skip signal references
                 if isinstance(signal, iob_signal_reference):
                     continue
-                if hasattr(signal, "direction"):
+                if signal.direction:
                     suffix = if_gen.get_suffix(signal.direction)
                     if signal.name.endswith(suffix):
                         signal.name = signal.name[: -len(suffix)]
@@ -74,13 +78,13 @@ def create_wire(core, *args, signals=[], **kwargs):
     """
     try:
         # Ensure 'wires' list exists
-        core.set_default_attribute("wires", [])
+        core.set_default_attribute("wires", iob_named_list())
         # Check if there are any references to signals in other wires/ports
         sig_obj_list = []
         interface_obj = None
         if type(signals) is list:
             # Convert user signal dictionaries into 'iob_signal' objects
-            replace_duplicate_signals_by_references(core.wires + core.ports, signals)
+            replace_duplicate_signals_by_references(core, signals)
             sig_obj_list = convert_dict2obj_list(signals, iob_signal)
         elif type(signals) is dict:
             # Convert user interface dictionary into 'if_gen.interface' object
@@ -95,7 +99,7 @@ def create_wire(core, *args, signals=[], **kwargs):
             error_msg=f"Invalid {kwargs.get('name', '')} wire attribute '[arg]'!",
         )
         wire = iob_wire(*args, signals=sig_obj_list, interface=interface_obj, **kwargs)
-        replace_duplicate_signals_by_references(core.wires + core.ports, wire.signals)
+        replace_duplicate_signals_by_references(core, wire.signals)
         core.wires.append(wire)
     except Exception:
         add_traceback_msg(f"Failed to create wire '{kwargs['name']}'.")
@@ -123,31 +127,116 @@ def get_wire_signal(core, wire_name: str, signal_name: str):
     return iob_signal_reference(signal=signal)
 
 
-def replace_duplicate_signals_by_references(wires, signals):
+class signal_index:
+    """Index of the signals of the wires and ports of a core, by name.
+    Lookups give the same result as searching the wires and then the ports of the core
+    (with `find_signal_in_wires()`), but do not scan them.
+    Use `get_signal_index()` to obtain the (updated) index of a core.
+    """
+
+    def __init__(self):
+        # Lists of wires and ports indexed, and number of elements indexed of each.
+        self.wires = None
+        self.ports = None
+        self.n_wires = 0
+        self.n_ports = 0
+        # First signal of the wires with each name. Key: name, Value: signal
+        self.wire_signals = {}
+        # Signals of the ports with each name. Key: name, Value: list of signals
+        self.port_signals = {}
+
+    def update(self, core):
+        """Index wires and ports added to the core since the last update.
+        The index is rebuilt if the lists of wires/ports were replaced or shortened.
+        """
+        if (
+            self.wires is not core.wires
+            or self.ports is not core.ports
+            or len(core.wires) < self.n_wires
+            or len(core.ports) < self.n_ports
+        ):
+            self.__init__()
+            self.wires = core.wires
+            self.ports = core.ports
+        for wire in core.wires[self.n_wires :]:
+            for signal in wire.signals:
+                signal = get_real_signal(signal)
+                self.wire_signals.setdefault(signal.name, signal)
+        for port in core.ports[self.n_ports :]:
+            for signal in port.signals:
+                signal = get_real_signal(signal)
+                self.port_signals.setdefault(signal.name, []).append(signal)
+        self.n_wires = len(core.wires)
+        self.n_ports = len(core.ports)
+
+    def find(self, signal_name, ports_only=False, direction=None):
+        """Return the (real) signal with given name, or None if it does not exist.
+        param signal_name: name of signal to search for
+        param ports_only: only search the signals of the ports
+        param direction: only search signals with this direction
+        """
+        if not ports_only and not direction:
+            signal = self.wire_signals.get(signal_name)
+            if signal:
+                return signal
+        for signal in self.port_signals.get(signal_name, []):
+            if not direction or signal.direction == direction:
+                return signal
+        return None
+
+
+def get_signal_index(core):
+    """Return the signal index of a core, updated with its current wires and ports.
+    Note: Signals added to (or renamed in) wires/ports that were already indexed are
+    only indexed after `invalidate_signal_index()`.
+    """
+    core.set_default_attribute("wires", iob_named_list())
+    core.set_default_attribute("ports", iob_named_list())
+    index = core.__dict__.get("_signal_index")
+    if index is None:
+        index = signal_index()
+        core._signal_index = index
+    index.update(core)
+    return index
+
+
+def invalidate_signal_index(core):
+    """Rebuild the signal index of a core on the next `get_signal_index()`"""
+    core.__dict__.pop("_signal_index", None)
+
+
+def replace_duplicate_signals_by_references(core, signals, ports_only=False):
     """Ensure that given list of 'signals' does not contain duplicates of other signals
-    in the given 'wires' list, by replacing the duplicates with references to the
+    of the core's wires and ports, by replacing the duplicates with references to the
     original.
-    param wires: list of wires with (original) signals
+    param core: core with the (original) signals
     param signals: list of new signals to be processed. If this list has a signal with
-    the same name as another signal in the wires list, then this signal is replaced by a
+    the same name as another signal of the core, then this signal is replaced by a
     reference to the original.
+    param ports_only: only search for duplicates in the signals of the core's ports
     """
+    index = get_signal_index(core)
     for idx, signal in enumerate(signals):
         if isinstance(signal, iob_signal_reference):
             continue
         if type(signal) is iob_signal:
-            signal = signal.__dict__
-        original_signal = find_signal_in_wires(wires, signal["name"])
+            # Direction is derived from the name (and kept by wires that remove the
+            # suffix of their signals), so it is not a parameter given by the user
+            signal = {
+                f.name: getattr(signal, f.name)
+                for f in fields(signal)
+                if f.name != "direction"
+            }
+        original_signal = index.find(signal["name"], ports_only)
         if not original_signal:
             continue
-        original_signal = get_real_signal(original_signal)
         # print(f"[DEBUG] Replacing signal '{signal['name']}' by reference to original.")
         # Verify that new signal has same parameters as the original_signal
         for key, value in signal.items():
-            if original_signal.__dict__[key] != value:
+            if getattr(original_signal, key) != value:
                 fail_with_msg(
                     f"Signal reference '{signal['name']}' has different '{key}' than the original signal!\n"
-                    f"Original signal '{original_signal.name}' value: '{original_signal.__dict__[key]}'.\n"
+                    f"Original signal '{original_signal.name}' value: '{getattr(original_signal, key)}'.\n"
                     f"Signal reference '{signal['name']}' value: '{value}'."
                 )
         # Replace signal by a reference to the original
@@ -156,6 +245,7 @@ def replace_duplicate_signals_by_references(wires, signals):
 
 def find_signal_in_wires(wires, signal_name, process_func=get_real_signal):
     """Search for a signal in given list of wires
+    To search the wires and ports of a core, `get_signal_index()` is faster.
     param wires: list of wires
     param signal_name: name of signal to search for
     param process_func: function to process each signal before search
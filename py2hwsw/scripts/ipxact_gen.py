@@ -11,6 +11,7 @@ import os
 import sys
 from iob_signal import iob_signal
 from if_gen import if_details
+from build_files import open_file
 
 sys.path.append(
     os.path.join(os.path.dirname(os.path.abspath(__file__)), "../lib/hardware/iob_csrs")
@@ -459,7 +460,7 @@ def gen_bus_interface_xml_file(bus_interface, dest_dir):
         os.makedirs(dest_dir)
 
     # Create the Bus Definition file for the interface
-    with open(
+    with open_file(
         f"{dest_dir}/interface_{bus_interface.type}.{bus_details['version']}.xml", "w"
     ) as f:
         f.write(
@@ -769,7 +770,7 @@ def generate_ipxact_xml(core, dest_dir):
         os.makedirs(dest_dir)
 
     # Create the xml file
-    xml_file = open(dest_dir + "/" + core_name + ".xml", "w+")
+    xml_file = open_file(dest_dir + "/" + core_name + ".xml", "w")
 
     # Write the xml header
     xml_text = f"""<?xml version=\"1.0\" encoding=\"UTF-8\"?>
@@ -8,10 +8,12 @@
 
 import re
 
+from build_files import open_file
+
 
 def write_table(outfile, table):
     """Write Latex table"""
-    fout = open(outfile + "_tab.tex", "w")
+    fout = open_file(outfile + "_tab.tex", "w")
     for i in range(len(table)):
         if (i % 2) != 0:
             fout.write("\\rowcolor{iob-blue}\n")
@@ -37,7 +39,7 @@ def write_table(outfile, table):
 
 def write_description(outfile, text):
     """Write Latex description"""
-    fout = open(outfile + "_desc.tex", "w")
+    fout = open_file(outfile + "_desc.tex", "w")
     for line in text:
         fout.write("\\item[" + line[0] + "] " + "{" + line[1] + "}\n")
     fout.close()
@@ -13,7 +13,8 @@ After running this script with the 'spdx' header template, you can use the `reus
 to check if the project is compliant with REUSE Specification.
 Check project compliance: `reuse lint`
 
-Download MIT license file: `reuse download MIT`
+License texts are copied from the ones shipped with py2hwsw (or from py2hwsw's cache
+directory). They are never downloaded.
 
 By default, the spdx header of this script should match the changes made by the `reuse`
 tool with this command:
@@ -24,12 +25,26 @@ And this script overrides existing headers (does not keep old license headers).
 """
 
 import os
+import io
 import argparse
 from datetime import datetime
 from jinja2 import Template
 
+import iob_colors
+import build_files
+from core_index import get_cache_dir
+from iob_context import get_context
+
 FILE_WITH_IGNORE_INFO = ".ignore_file_headers"
 
+# Directories with license texts (`<license_name>.txt`)
+LICENSE_TEXT_DIRS = [
+    # Installed py2hwsw package (see `setup.py`)
+    os.path.join(os.path.dirname(__file__), "../LICENSES"),
+    # py2hwsw repository
+    os.path.join(os.path.dirname(__file__), "../../LICENSES"),
+]
+
 comment_char = {
     ".c": "/*",
     ".cpp": "/*",
@@ -111,6 +126,13 @@ headers = {
     # NOTE: Add other header templates here
 }
 
+# Files (usually generated) whose content is only final at the end of the setup, after
+# Verilog snippets are inlined and files are formatted. They get their header when
+# written with `final=True`.
+FINAL_HEADER_EXTENSIONS = (".v", ".vh", ".py", ".c", ".h", ".cpp", ".hpp")
+# Verilog snippets are inlined in other files, so they never get a header when written
+NO_WRITE_HEADER_EXTENSIONS = (".vs",)
+
 DEBUG = 0
 VERBOSE = 0
 
@@ -221,6 +243,10 @@ def generate_headers(
         ignore_paths = []
 
     ignore_paths += ["./LICENSES"]
+    # License texts of build directories (including testers inside this one)
+    ignore_paths += [
+        os.path.join(build_dir, "LICENSES") for build_dir in get_context().build_headers
+    ]
 
     ignore_files = []
     # Read FILE_WITH_IGNORE_INFO if it exists
@@ -251,27 +277,26 @@ def generate_headers(
         print("\n".join(files))
         return
 
-    template_context = {
-        "copyright_lines": [
-            f"SPDX-FileCopyrightText: {copyright_year} {copyright_holder}",
-        ],
-        "contributor_lines": [],
-        "spdx_expressions": [license_name],
-        "custom_header_suffix": custom_header_suffix,
-        # Note: spdx_prefix is only needed because otherwise the `reuse` tool has a bug that would miss identify the template line as legitimate SPDX header for this file.
-        "spdx_prefix": "SPDX",
-    }
-
-    header = render_jinja_template(headers[header_template], template_context)
+    header = render_header(
+        copyright_holder,
+        copyright_year,
+        license_name,
+        header_template,
+        custom_header_suffix,
+    )
 
     for file in files:
+        # Skip files that already got this header when written
+        written_header = get_written_header(file)
+        if written_header and written_header[0] == header:
+            continue
         modify_file_header(
             file,
             header,
-            comment_char=comment_char[
-                next(ext for ext in comment_char if file.endswith(ext))
-            ],
-            skip_existing_headers=skip_existing_headers,
+            comment_char=get_comment_char(file),
+            # Replace header added when written, if it was a different one
+            skip_existing_headers=skip_existing_headers
+            and not (written_header and written_header[1]),
             delete_only=delete_only,
         )
 
@@ -286,15 +311,175 @@ def generate_headers(
     for file in files:
         write_independent_lic_file(file, header)
 
-    # Download license using `reuse` tool
+    # Copy license text
     if not os.path.isfile(os.path.join(root, f"LICENSES/{license_name}.txt")):
-        os.system(f"reuse --root {root} download {license_name}")
+        copy_license_text(root, license_name)
+
+
+def render_header(
+    copyright_holder="IObundle",
+    copyright_year=datetime.now().year,
+    license_name="MIT",
+    header_template="spdx",
+    custom_header_suffix="",
+):
+    """Return header text (without comment characters) for the given license"""
+    template_context = {
+        "copyright_lines": [
+            f"SPDX-FileCopyrightText: {copyright_year} {copyright_holder}",
+        ],
+        "contributor_lines": [],
+        "spdx_expressions": [license_name],
+        "custom_header_suffix": custom_header_suffix,
+        # Note: spdx_prefix is only needed because otherwise the `reuse` tool has a bug that would miss identify the template line as legitimate SPDX header for this file.
+        "spdx_prefix": "SPDX",
+    }
+    return render_jinja_template(headers[header_template], template_context)
+
+
+def get_comment_char(filepath):
+    """Return comment character of a file's header, or None if not supported"""
+    return next(
+        (comment_char[ext] for ext in comment_char if filepath.endswith(ext)), None
+    )
+
+
+def copy_license_text(root, license_name):
+    """Copy text of a license to the `LICENSES` folder of given directory.
+    Texts are copied from LICENSE_TEXT_DIRS, or from the `licenses` folder of
+    py2hwsw's cache directory.
+    """
+    text_dirs = LICENSE_TEXT_DIRS + [os.path.join(get_cache_dir(), "licenses")]
+    for text_dir in text_dirs:
+        text_path = os.path.join(text_dir, f"{license_name}.txt")
+        if os.path.isfile(text_path):
+            os.makedirs(os.path.join(root, "LICENSES"), exist_ok=True)
+            build_files.copy_file(text_path, os.path.join(root, "LICENSES"))
+            return
+    print(
+        f"{iob_colors.WARNING}Text of license '{license_name}' not found in {text_dirs}. Not copied to '{os.path.join(root, 'LICENSES')}'.{iob_colors.ENDC}"
+    )
 
 
 def write_independent_lic_file(file, header):
     """Given a file path, write a corresponding independent license file."""
-    with open(file + ".license", "w") as f:
-        f.writelines(header)
+    build_files.write_file(file + ".license", header)
+
+
+#
+# Headers added when files are written
+#
+# The header of files in each build directory is registered at the start of its setup
+# (see `iob_core.py`). Files written or copied with `build_files.py` get their header
+# at that moment, instead of in the post-pass of `generate_headers()` (which only
+# processes files that did not get the same header when written).
+#
+
+
+def register_build_header(build_dir, **kwargs):
+    """Register header of files written in a build directory.
+    Headers are not added when files are written if there is a FILE_WITH_IGNORE_INFO.
+    param build_dir: path of the build directory
+    param kwargs: header arguments (see `render_header()`)
+    """
+    if os.path.isfile(FILE_WITH_IGNORE_INFO):
+        return
+    get_context().build_headers[os.path.abspath(build_dir)] = render_header(**kwargs)
+
+
+def get_build_header(path, final=False):
+    """Return header of a file written in a registered build directory.
+    param path: path of the file
+    param final: if the content of the file is final (see FINAL_HEADER_EXTENSIONS)
+    returns: tuple (header, comment_char), or None if the file does not get a header
+             when written. Independent license files are always written by the
+             post-pass (they may be overwritten by copies of the original ones).
+    """
+    build_headers = get_context().build_headers
+    if not build_headers:
+        return None
+    path = os.path.abspath(path)
+    # Most specific build directory (testers are inside the build dir of the top)
+    build_dir = os.path.dirname(path)
+    while build_dir not in build_headers:
+        parent = os.path.dirname(build_dir)
+        if parent == build_dir:
+            return None
+        build_dir = parent
+    if os.path.relpath(path, build_dir).split(os.sep)[0] in [
+        build_files.PY2HWSW_BUILD_DIR,
+        "LICENSES",
+    ]:
+        return None
+
+    char = get_comment_char(path)
+    if (
+        not char
+        or path.endswith(NO_WRITE_HEADER_EXTENSIONS)
+        or (path.endswith(FINAL_HEADER_EXTENSIONS) and not final)
+    ):
+        return None
+    return build_headers[build_dir], char
+
+
+def add_build_header(path, data, final=False):
+    """Add header to the content of a file written in a registered build directory.
+    Existing headers are kept (like `generate_headers(skip_existing_headers=True)`).
+    param path: path of the file
+    param data: bytes to write to the file
+    param final: if the content of the file is final (see FINAL_HEADER_EXTENSIONS)
+    returns: tuple (data, header_status). header_status is None if the file did not
+             get its header (the post-pass adds it), True if the header was added, or
+             False if the file already had a header.
+    """
+    build_header = get_build_header(path, final)
+    if not build_header:
+        return data, None
+    header, char = build_header
+    try:
+        text = data.decode()
+    except UnicodeDecodeError:
+        return data, None
+    # Content of empty files may be appended later
+    if not text.strip():
+        return data, None
+    # Read lines like `modify_file_header()` (with universal newlines)
+    lines = io.StringIO(text, newline=None).readlines()
+    new_lines = replace_header_lines(lines, header, char, skip_existing_headers=True)
+    if new_lines is None:
+        return data, False
+    return "".join(new_lines).encode(), True
+
+
+def record_written_header(path, added):
+    """Record file that got its header when written (see `add_build_header()`)
+    param path: path of the file
+    param added: if the header was added to the file's content
+    """
+    st = os.stat(path)
+    get_context().written_headers[os.path.abspath(path)] = (
+        st.st_size,
+        st.st_mtime_ns,
+        get_build_header(path, final=True)[0],
+        added,
+    )
+
+
+def get_written_header(path):
+    """Return header that a file got when written.
+    returns: tuple (header, True if the header was added), or None if the file did not
+             get a header when written (or was modified after being written)
+    """
+    entry = get_context().written_headers.get(os.path.abspath(path))
+    if not entry:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if (st.st_size, st.st_mtime_ns) != entry[:2]:
+        return None
+    return entry[2:]
 
 
 def modify_file_header(
@@ -313,114 +498,27 @@ def modify_file_header(
     """
     global DEBUG
     try:
-        empty_file = 0
         with open(filepath, "r") as file:
             lines = file.readlines()
-            empty_file = not len(lines)
-
-        header_start_index = 0
-        insert_blank_line = False
-        is_multiline = comment_char in multiline_comments
-        if not empty_file:
-            # Check if file has shebang line
-            if lines[0].startswith("#!") or lines[0].startswith("<?xml"):
-                header_start_index = 1
-                insert_blank_line = True
-
-            if (
-                insert_blank_line
-                and not lines[header_start_index].strip()
-                and lines[header_start_index + 1].startswith(comment_char)
-            ):
-                # Remove blank line before header
-                lines.pop(header_start_index)
 
-            # Check if file already has a header
-            if skip_existing_headers and lines[header_start_index].startswith(
-                comment_char
-            ):
-                if VERBOSE:
-                    print(f"Header skipped in {filepath}")
-                return
-
-            # Only delete headers if they are recognized as old versions of the new header.
-            # Otherwise, they may just be comments that happen to be at the start of the file, so they should not be deleted.
-            # if update_headers_only and header_recognize( "".join(lines[header_start_index:]), new_header):
-
-            # Multi-line
-            if is_multiline and lines[header_start_index].startswith(comment_char):
-                body_comment_char = multiline_comments[comment_char][0]
-                end_comment_char = multiline_comments[comment_char][1]
-                # Remove multiline start
-                lines.pop(header_start_index)
-                # Remove old header body
-                while lines[header_start_index].startswith(
-                    body_comment_char
-                ) and not lines[header_start_index].startswith(end_comment_char):
-                    lines.pop(header_start_index)
-                # Remove multiline end
-                lines.pop(header_start_index)
-                # Remove blank line after header (if any)
-                if (
-                    len(lines) > header_start_index
-                    and not lines[header_start_index].strip()
-                ):
-                    lines.pop(header_start_index)
-            # Not multi-line
-            elif lines[header_start_index].startswith(comment_char):
-                # Remove old header
-                while len(lines) and lines[header_start_index].startswith(comment_char):
-                    lines.pop(header_start_index)
-                # Remove blank line after header (if any)
-                if (
-                    len(lines) > header_start_index
-                    and not lines[header_start_index].strip()
-                ):
-                    lines.pop(header_start_index)
-
-        # Create the new header lines
-        new_header_lines = []
-
-        if insert_blank_line and not delete_only:
-            new_header_lines.append("\n")
-
-        # Multi-line
-        if is_multiline and not delete_only:
-            body_comment_char = multiline_comments[comment_char][0]
-            body_comment_char = f"{body_comment_char} " if body_comment_char else ""
-            end_comment_char = multiline_comments[comment_char][1]
-            new_header_lines.append(f"{comment_char}\n")
-            for line in new_header.splitlines():
-                body_line_prefix = body_comment_char
-                if not line.strip():
-                    body_line_prefix = body_comment_char[:-1]
-                new_header_lines.append(f"{body_line_prefix}{line}\n")
-            new_header_lines.append(f"{end_comment_char}\n")
-            new_header_lines.append("\n")
-        # Not multi-line
-        elif not delete_only:
-            for line in new_header.splitlines():
-                if line.strip():
-                    new_header_lines.append(f"{comment_char} {line}\n")
-                else:
-                    new_header_lines.append(f"{comment_char}\n")
-            new_header_lines.append("\n")
-
-        # Prepare the new content
-        if empty_file:
-            new_content = new_header_lines  # New header lines
-        else:
-            new_content = lines[:header_start_index]  # Lines before the header
-            new_content += new_header_lines  # New header lines
-            new_content += lines[header_start_index:]  # Lines after the old header
+        new_content = replace_header_lines(
+            lines,
+            new_header,
+            comment_char=comment_char,
+            skip_existing_headers=skip_existing_headers,
+            delete_only=delete_only,
+        )
+        if new_content is None:
+            if VERBOSE:
+                print(f"Header skipped in {filepath}")
+            return
 
         if DEBUG:
             print("".join(new_content))
             return
 
         # Write the new content back to the file
-        with open(filepath, "w") as file:
-            file.writelines(new_content)
+        build_files.write_file(filepath, "".join(new_content))
 
         if VERBOSE:
             print(f"Header modified successfully in {filepath}")
@@ -430,6 +528,120 @@ def modify_file_header(
         raise (e)
 
 
+def replace_header_lines(
+    lines,
+    new_header,
+    comment_char="#",
+    skip_existing_headers=False,
+    delete_only=False,
+):
+    """
+    Replaces the header of a file's content with a new header.
+
+    :param lines: The lines of the file (with line endings).
+    :param new_header: The new header text to insert.
+    :param comment_char: The character that starts each header line (default: "#").
+    :return: The new lines, or None if the file already has a header and
+             skip_existing_headers is set.
+    """
+    lines = list(lines)
+    empty_file = not len(lines)
+
+    header_start_index = 0
+    insert_blank_line = False
+    is_multiline = comment_char in multiline_comments
+    if not empty_file:
+        # Check if file has shebang line
+        if lines[0].startswith("#!") or lines[0].startswith("<?xml"):
+            header_start_index = 1
+            insert_blank_line = True
+
+        if (
+            insert_blank_line
+            and not lines[header_start_index].strip()
+            and lines[header_start_index + 1].startswith(comment_char)
+        ):
+            # Remove blank line before header
+            lines.pop(header_start_index)
+
+        # Check if file already has a header
+        if skip_existing_headers and lines[header_start_index].startswith(comment_char):
+            return None
+
+        # Only delete headers if they are recognized as old versions of the new header.
+        # Otherwise, they may just be comments that happen to be at the start of the file, so they should not be deleted.
+        # if update_headers_only and header_recognize( "".join(lines[header_start_index:]), new_header):
+
+        # Multi-line
+        if is_multiline and lines[header_start_index].startswith(comment_char):
+            body_comment_char = multiline_comments[comment_char][0]
+            end_comment_char = multiline_comments[comment_char][1]
+            # Remove multiline start
+            lines.pop(header_start_index)
+            # Remove old header body
+            while lines[header_start_index].startswith(body_comment_char) and not lines[
+                header_start_index
+            ].startswith(end_comment_char):
+                lines.pop(header_start_index)
+            # Remove multiline end
+            lines.pop(header_start_index)
+            # Remove blank line after header (if any)
+            if (
+                len(lines) > header_start_index
+                and not lines[header_start_index].strip()
+            ):
+                lines.pop(header_start_index)
+        # Not multi-line
+        elif lines[header_start_index].startswith(comment_char):
+            # Remove old header
+            while len(lines) and lines[header_start_index].startswith(comment_char):
+                lines.pop(header_start_index)
+            # Remove blank line after header (if any)
+            if (
+                len(lines) > header_start_index
+                and not lines[header_start_index].strip()
+            ):
+                lines.pop(header_start_index)
+
+    # Create the new header lines
+    new_header_lines = []
+
+    if insert_blank_line and not delete_only:
+        new_header_lines.append("\n")
+
+    # Multi-line
+    if is_multiline and not delete_only:
+        body_comment_char = multiline_comments[comment_char][0]
+        body_comment_char = f"{body_comment_char} " if body_comment_char else ""
+        end_comment_char = multiline_comments[comment_char][1]
+        new_header_lines.append(f"{comment_char}\n")
+        for line in new_header.splitlines():
+            body_line_prefix = body_comment_char
+            if not line.strip():
+                body_line_prefix = body_comment_char[:-1]
+            new_header_lines.append(f"{body_line_prefix}{line}\n")
+        new_header_lines.append(f"{end_comment_char}\n")
+        new_header_lines.append("\n")
+    # Not multi-line
+    elif not delete_only:
+        for line in new_header.splitlines():
+            if line.strip():
+                new_header_lines.append(f"{comment_char} {line}\n")
+            else:
+                new_header_lines.append(f"{comment_char}\n")
+        new_header_lines.append("\n")
+
+    # Prepare the new content
+    if empty_file:
+        new_content = new_header_lines  # New header lines
+    else:
+        new_content = lines[:header_start_index]  # Lines before the header
+        new_content += new_header_lines  # New header lines
+        new_content += lines[header_start_index:]  # Lines after the old header
+
+    return new_content
+
+
 def find_files_with_extensions(directory, extensions, ignore_paths=[], ignore_files=[]):
     """
     Search for files with specified extensions in a directory recursively.
@@ -439,11 +651,12 @@ def find_files_with_extensions(directory, extensions, ignore_paths=[], ignore_fi
     :return: A list of file paths that match the specified extensions.
     """
     matching_files = []
+    ignore_paths = [os.path.abspath(path) for path in ignore_paths]
 
     # Walk through the directory
     for root, dirs, files in os.walk(directory):
         # Ignore specified paths
-        if root in ignore_paths:
+        if os.path.abspath(root) in ignore_paths:
             dirs[:] = []
             if VERBOSE:
                 print(f"Ignoring path {root}")
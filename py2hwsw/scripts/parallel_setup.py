@@ -0,0 +1,103 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+#
+#    parallel_setup.py: generate files of subblocks in parallel (`py2hwsw --jobs N`)
+#
+# The elaboration of cores (reading their attributes, running their `setup()`
+# functions, and connecting them) always runs serially, in the same order as the
+# subblocks are listed. Only the generation phase of each subblock (copying its
+# sources and writing its snippets and Verilog module) is deferred to a thread pool.
+#
+# The build directory is the same as the one of a serial setup:
+# - Tasks of cores with the same name (or same setup directory) run one after another,
+#   in serial order.
+# - When tasks of different cores write the same file, the content written by the
+#   task that comes last in serial order is kept (see `build_files.py`).
+# - The generation of the top module (and of testers), and the post setup scripts,
+#   only run after every pending task finished.
+#
+
+import os
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from iob_context import get_context
+from iob_base import add_traceback_msg
+
+# Sequence number of the generation task running in the current thread (None if not
+# running in a generation task). Tasks are numbered in serial order.
+_task_seq = contextvars.ContextVar("generation_task_seq", default=None)
+
+
+def get_task_seq():
+    """Return sequence number of the current generation task, or None if the code is
+    not running in a parallel generation task."""
+    return _task_seq.get()
+
+
+def _run_task(core, func, seq, dependencies):
+    # Wait for tasks of cores that write the same files.
+    # These were submitted before, so they are already running (or done).
+    wait(dependencies)
+    _task_seq.set(seq)
+    try:
+        func()
+    except Exception:
+        add_traceback_msg(f"Failed to setup core '{core.name}'.")
+        raise
+
+
+def submit_generation_task(core, func):
+    """Run generation phase of a (non-top) core. If the current run uses more than one
+    job, the function is run by a thread pool. Otherwise, it is called immediately.
+    param core: core being generated
+    param func: function that generates the files of the core
+    """
+    context = get_context()
+    if context.jobs <= 1:
+        func()
+        return
+
+    if not context.generation_executor:
+        context.generation_executor = ThreadPoolExecutor(
+            max_workers=context.jobs, thread_name_prefix="py2hwsw_gen"
+        )
+    seq = context.generation_task_count
+    context.generation_task_count += 1
+    keys = [("name", core.name), ("original_name", core.original_name)]
+    # Cores with different names may copy the sources of the same setup directory
+    if core.setup_dir:
+        keys.append(("setup_dir", os.path.realpath(core.setup_dir)))
+    dependencies = [
+        context.generation_task_keys[key]
+        for key in keys
+        if key in context.generation_task_keys
+    ]
+    # Run task with a copy of the current context variables (includes the iob_context)
+    task_context = contextvars.copy_context()
+    future = context.generation_executor.submit(
+        task_context.run, _run_task, core, func, seq, dependencies
+    )
+    for key in keys:
+        context.generation_task_keys[key] = future
+    context.generation_tasks.append(future)
+
+
+def wait_generation_tasks():
+    """Wait for every pending generation task of the current run.
+    Raises the exception of the first task (in serial order) that failed.
+    """
+    context = get_context()
+    if not context.generation_tasks:
+        return
+    tasks = context.generation_tasks
+    wait(tasks)
+    context.generation_executor.shutdown()
+    context.generation_executor = None
+    context.generation_tasks = []
+    context.generation_task_keys = {}
+    context.output_owners = {}
+    for task in tasks:
+        task.result()
@@ -5,15 +5,17 @@
 # SPDX-License-Identifier: MIT
 
 import os
+import hashlib
 
-from iob_base import find_obj_in_list, fail_with_msg
+from iob_base import find_obj_in_list, fail_with_msg, iob_named_list
+from build_files import open_file
 
 
 def get_core_params(confs):
     """Filter given 'confs' list for 'P' and 'D' parameters.
     Returns a new filtered list containing only 'P' and 'D' parameters.
     """
-    core_parameters = []
+    core_parameters = iob_named_list()
     for group in confs:
         for conf in group.confs:
             if conf.type in ["P", "D"]:
@@ -72,12 +74,37 @@ def generate_params_snippets(core):
     code = generate_params(core)
     out_dir = core.build_dir + "/hardware/src"
     os.makedirs(out_dir, exist_ok=True)
-    with open(f"{out_dir}/{core.name}_params.vs", "w") as f:
+    with open_file(f"{out_dir}/{core.name}_params.vs", "w") as f:
         f.write(code)
 
+    generate_inst_params_snippet(core)
+
+
+def get_instance_path(core):
+    """Return hierarchical path of an instance: instance names of its instantiators
+    (from the top module) and of the instance itself, separated by '.'.
+    """
+    names = []
+    visited = set()
+    while core is not None and id(core) not in visited:
+        visited.add(id(core))
+        names.append(core.instance_name)
+        core = core.instantiator
+    return ".".join(reversed(names))
+
+
+def generate_inst_params_snippet(core):
+    """Write verilog snippet ('.vs' file) with verilog parameter values of this instance.
+    The file name includes a hash of the instance's hierarchical path, so that it is
+    the same in every setup.
+    """
     code = generate_inst_params(core)
     out_dir = core.build_dir + "/hardware/src"
-    with open(f"{out_dir}/{core.instance_name}_{id(core)}_inst_params.vs", "w") as f:
+    os.makedirs(out_dir, exist_ok=True)
+    path_hash = hashlib.sha1(get_instance_path(core).encode()).hexdigest()[:12]
+    with open_file(
+        f"{out_dir}/{core.instance_name}_{path_hash}_inst_params.vs", "w"
+    ) as f:
         f.write(code)
 
 
@@ -0,0 +1,128 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+#
+#    post_setup.py: steps run at the end of the setup of a build directory
+#
+# The post setup stage (of the top module and testers) is a small graph of steps.
+# Each step declares the resources (kinds of files of the build directory) that it
+# reads and writes. A step runs after every step listed before it that writes a
+# resource it uses, or that reads a resource it writes. Steps that do not share
+# resources (like the generation of IP-XACT and the lint of Verilog sources) run in
+# parallel, using the number of jobs of the current run.
+#
+# Steps may be selected with the `--only`/`--skip` options of py2hwsw.
+#
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from iob_context import get_context
+
+# Post setup steps. Key: name, Value: description
+POST_SETUP_STEPS = {
+    "snippets": "Replace Verilog snippet includes",
+    "sources": "Remove duplicate and unused sources",
+    "callbacks": "Run post setup callbacks",
+    "docs": "Generate TeX documentation files",
+    "ipxact": "Generate IP-XACT files",
+    "lint": "Lint Verilog sources",
+    "verilog_format": "Format Verilog sources",
+    "sw_format": "Format Python and C sources",
+    "headers": "Add license headers",
+    "manifest": "Store manifest of generated files",
+}
+
+# Resource used by steps that may read/write any file of the build directory
+ALL_RESOURCES = "*"
+
+
+class post_setup_step:
+    """Step of the post setup stage"""
+
+    def __init__(self, name, func, inputs=[], outputs=[]):
+        """
+        param name: name of the step (one of `POST_SETUP_STEPS`)
+        param func: function that runs the step
+        param inputs: list of resources read by the step
+        param outputs: list of resources written by the step
+        """
+        self.name = name
+        self.func = func
+        self.inputs = set(inputs)
+        self.outputs = set(outputs)
+
+    def depends_on(self, step):
+        """Check if this step must run after given step (listed before it)"""
+
+        def conflict(a, b):
+            if ALL_RESOURCES in a or ALL_RESOURCES in b:
+                return bool(a and b)
+            return bool(a & b)
+
+        return conflict(step.outputs, self.inputs | self.outputs) or conflict(
+            step.inputs, self.outputs
+        )
+
+
+def parse_steps(steps_str):
+    """Parse comma separated list of post setup steps.
+    returns: list of step names
+    raises: ValueError if a step does not exist
+    """
+    steps = [step.strip() for step in steps_str.split(",") if step.strip()]
+    for step in steps:
+        if step not in POST_SETUP_STEPS:
+            raise ValueError(
+                f"Unknown post setup step '{step}'. Steps: {', '.join(POST_SETUP_STEPS)}."
+            )
+    return steps
+
+
+def is_step_selected(name):
+    """Check if a post setup step was selected by the `--only`/`--skip` options"""
+    context = get_context()
+    if context.post_setup_only and name not in context.post_setup_only:
+        return False
+    return name not in context.post_setup_skip
+
+
+def _run_step(step, dependencies):
+    # Dependencies were submitted before, so they are already running (or done).
+    # Raises the exception of a dependency that failed.
+    for dependency in dependencies:
+        dependency.result()
+    step.func()
+
+
+def run_steps(steps):
+    """Run selected post setup steps. Steps run in the given order if the current run
+    uses one job. Otherwise, they run in parallel, after the steps they depend on.
+    Raises the exception of the first step (in the given order) that failed.
+    param steps: list of `post_setup_step` objects
+    """
+    steps = [step for step in steps if is_step_selected(step.name)]
+    jobs = get_context().jobs
+    if jobs <= 1:
+        for step in steps:
+            step.func()
+        return
+
+    tasks = []
+    with ThreadPoolExecutor(
+        max_workers=min(jobs, len(steps)) or 1, thread_name_prefix="py2hwsw_post"
+    ) as executor:
+        for idx, step in enumerate(steps):
+            dependencies = [
+                tasks[prev_idx]
+                for prev_idx, prev_step in enumerate(steps[:idx])
+                if step.depends_on(prev_step)
+            ]
+            tasks.append(
+                executor.submit(
+                    contextvars.copy_context().run, _run_step, step, dependencies
+                )
+            )
+    for task in tasks:
+        task.result()
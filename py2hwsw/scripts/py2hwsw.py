@@ -8,13 +8,16 @@ import sys
 import os
 import argparse
 
-import iob_base
+from iob_context import iob_context, set_context
 from iob_base import list_dir, copy_dir, cat_file
-from iob_core import iob_core
+from post_setup import POST_SETUP_STEPS, parse_steps
+from core_metadata import METADATA_FIELDS, parse_fields, print_core_metadata
 
 from py2hwsw_version import PY2HWSW_VERSION
 
-if __name__ == "__main__":
+
+def main(argv=None):
+    """Run py2hwsw with the given list of arguments (default: sys.argv[1:])"""
     sys.dont_write_bytecode = True
 
     parser = argparse.ArgumentParser(
@@ -36,9 +39,24 @@ if __name__ == "__main__":
             "print_core_name",
             "print_core_version",
             "print_core_dict",
+            "print",
             "deliver",
         ],
     )
+    parser.add_argument(
+        "print_fields",
+        nargs="?",
+        type=str,
+        metavar="fields",
+        help="With the 'print' target: comma separated list of attributes to print. "
+        f"Attributes: {','.join(METADATA_FIELDS)} (default: all).",
+    )
+    parser.add_argument(
+        "--json",
+        dest="json",
+        action="store_true",
+        help="With the 'print' target: print attributes as a json object",
+    )
     parser.add_argument(
         "--build_dir",
         dest="build_dir",
@@ -82,6 +100,71 @@ if __name__ == "__main__":
         type=str,
         help="Path to custom clang-format rules file.",
     )
+    parser.add_argument(
+        "--only",
+        dest="post_setup_only",
+        type=str,
+        default="",
+        metavar="<steps>",
+        help="Only run given post setup steps (comma separated list). "
+        f"Steps: {', '.join(POST_SETUP_STEPS)}",
+    )
+    parser.add_argument(
+        "--skip",
+        dest="post_setup_skip",
+        type=str,
+        default="",
+        metavar="<steps>",
+        help="Skip given post setup steps (comma separated list). "
+        "For example, '--skip docs,ipxact' when iterating on RTL.",
+    )
+    parser.add_argument(
+        "--write_snippets",
+        dest="write_snippets",
+        action="store_true",
+        help="Write Verilog snippets ('.vs' files) to the build directory, and keep them after their include statements are replaced (for debugging). By default, snippets are kept in memory.",
+    )
+    parser.add_argument(
+        "--dry_run",
+        dest="dry_run",
+        action="store_true",
+        help="Do not modify the build directory. With 'setup': generate the build directory in a temporary directory on disk (removed afterwards), and print the files that would be added or changed. With 'clean': print the build directory that would be removed.",
+    )
+    parser.add_argument(
+        "--check",
+        dest="check",
+        action="store_true",
+        help="Check if the core's build directory is up to date (based on the manifest generated by its last setup). Exits with code 1 if it is not.",
+    )
+    parser.add_argument(
+        "--batch",
+        dest="batch",
+        type=str,
+        metavar="<jobs.json>",
+        help="Setup every job of a json file in one call. Each job is a dictionary with 'core_name', and optional 'py_params', 'build_dir' and 'project_root'.",
+    )
+    parser.add_argument(
+        "--jobs",
+        dest="jobs",
+        type=int,
+        default=0,
+        help="Number of parallel jobs. With --batch: number of cores set up in parallel (default: number of CPUs). "
+        "Otherwise: number of threads used to generate the files of subblocks (default: 1)",
+    )
+    parser.add_argument(
+        "--batch_log_dir",
+        dest="batch_log_dir",
+        type=str,
+        default="",
+        help="Directory for the log of each batch job (default: <jobs>_logs)",
+    )
+    parser.add_argument(
+        "--batch_report",
+        dest="batch_report",
+        type=str,
+        default="",
+        help="Path of json report with the status and timing of each batch job",
+    )
     parser.add_argument(
         "--debug_level",
         dest="debug_level",
@@ -149,16 +232,104 @@ if __name__ == "__main__":
             help=f"List contents of a given {dir} file.",
         )
 
-    args = parser.parse_args()
+    parser.add_argument(
+        "--serve",
+        dest="serve",
+        action="store_true",
+        help="Run py2hwsw server. Following py2hwsw calls are forwarded to it.",
+    )
+    parser.add_argument(
+        "--socket",
+        dest="socket",
+        type=str,
+        default="",
+        help="Unix socket path of py2hwsw server (default: $PY2HWSW_SOCKET or $XDG_RUNTIME_DIR/py2hwsw.sock)",
+    )
+
+    args = parser.parse_args(argv)
+    try:
+        post_setup_only = parse_steps(args.post_setup_only)
+        post_setup_skip = parse_steps(args.post_setup_skip)
+        print_fields = parse_fields(args.print_fields)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.print_fields and args.target != "print":
+        parser.error(f"unexpected argument '{args.print_fields}'")
+    if args.dry_run and args.batch:
+        parser.error("--dry_run can not be used with --batch")
 
     # print(f"Args: {args}", file=sys.stderr)  # DEBUG
 
-    iob_core.global_build_dir = args.build_dir
-    iob_core.global_project_root = args.project_root
-    iob_core.global_project_vformat = args.verilog_format
-    iob_core.global_project_vlint = args.verilog_lint
-    iob_core.global_clang_format_rules_filepath = args.clang_rules
-    iob_base.debug_level = args.debug_level
+    # Create context of this run
+    context_args = {
+        "build_dir": args.build_dir,
+        "project_root": args.project_root,
+        "project_vformat": args.verilog_format,
+        "project_vlint": args.verilog_lint,
+        "clang_format_rules_filepath": args.clang_rules,
+        "debug_level": args.debug_level,
+        "jobs": 1 if args.batch else max(args.jobs, 1),
+        "post_setup_only": post_setup_only,
+        "post_setup_skip": post_setup_skip,
+        "write_snippets": args.write_snippets,
+    }
+    context = iob_context(**context_args)
+    set_context(context)
+
+    py_params = {}
+    if args.py_params:
+        for param in args.py_params.split(":"):
+            k, v = param.split("=")
+            py_params[k] = v
+
+    # Metadata queries do not load py2hwsw's generators (see `core_metadata.py`)
+    metadata_targets = {
+        "print": print_fields,
+        "print_build_dir": ["build_dir"],
+        "print_core_name": ["name"],
+        "print_core_version": ["version"],
+    }
+    if args.core_name and args.target in metadata_targets and not args.check:
+        print_core_metadata(
+            args.core_name, metadata_targets[args.target], args.json, **py_params
+        )
+        exit(0)
+
+    from iob_core import iob_core
+
+    if args.serve:
+        import py2hwsw_server
+
+        py2hwsw_server.serve(args.socket, main)
+        exit(0)
+
+    if args.batch:
+        import batch_setup
+
+        # Options given to every job
+        common_argv = ["--debug_level", str(args.debug_level)]
+        if not args.verilog_format:
+            common_argv.append("--no_verilog_format")
+        if not args.verilog_lint:
+            common_argv.append("--no_verilog_lint")
+        if args.clang_rules:
+            common_argv += ["--clang_rules", args.clang_rules]
+        if args.write_snippets:
+            common_argv.append("--write_snippets")
+        if args.post_setup_only:
+            common_argv += ["--only", args.post_setup_only]
+        if args.post_setup_skip:
+            common_argv += ["--skip", args.post_setup_skip]
+        success = batch_setup.run_batch(
+            args.batch,
+            main,
+            common_argv,
+            args.jobs,
+            args.batch_log_dir,
+            args.batch_report,
+            args.project_root,
+        )
+        exit(0 if success else 1)
 
     if args.py2hwsw_docs:
         iob_core.setup_py2_docs(PY2HWSW_VERSION)
@@ -196,23 +367,39 @@ if __name__ == "__main__":
         parser.print_usage(sys.stderr)
         exit(1)
 
-    py_params = {}
-    if args.py_params:
-        for param in args.py_params.split(":"):
-            k, v = param.split("=")
-            py_params[k] = v
+    # Arguments that affect the generated build directory (stored in its manifest)
+    context.build_args = {
+        "core_name": args.core_name,
+        "py_params": py_params,
+        "project_root": os.path.abspath(args.project_root),
+        "verilog_format": args.verilog_format,
+        "verilog_lint": args.verilog_lint,
+        "clang_rules": args.clang_rules,
+        "post_setup_only": post_setup_only,
+        "post_setup_skip": post_setup_skip,
+        "write_snippets": args.write_snippets,
+    }
+
+    if args.check:
+        iob_core.check_build_dir(args.core_name, **py_params)
+    elif args.dry_run and args.target in ["setup", "clean"]:
+        import dry_run
 
-    if args.target == "setup":
+        if args.target == "setup":
+            dry_run.print_dry_run_setup(
+                args.core_name, py_params, context.build_args, **context_args
+            )
+        else:
+            dry_run.print_dry_run_clean(args.core_name, **context_args)
+    elif args.target == "setup":
         iob_core.get_core_obj(args.core_name, **py_params)
     elif args.target == "clean":
         iob_core.clean_build_dir(args.core_name)
-    elif args.target == "print_build_dir":
-        iob_core.print_build_dir(args.core_name, **py_params)
-    elif args.target == "print_core_name":
-        iob_core.print_core_name(args.core_name, **py_params)
-    elif args.target == "print_core_version":
-        iob_core.print_core_version(args.core_name, **py_params)
     elif args.target == "print_core_dict":
         iob_core.print_core_dict(args.core_name, **py_params)
     elif args.target == "deliver":
         iob_core.deliver_core(args.core_name, **py_params)
+
+
+if __name__ == "__main__":
+    main()
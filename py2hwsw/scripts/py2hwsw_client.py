@@ -0,0 +1,84 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+#
+#    py2hwsw_client.py: forward py2hwsw calls to a running `py2hwsw --serve` server
+#
+# Note: This module must only depend on python's standard library, as it is imported
+# by the `py2hwsw` entry point (main.py) before any py2hwsw module is loaded.
+#
+
+import os
+import sys
+import json
+import socket
+
+
+def get_socket_path():
+    """Return path of the py2hwsw server's unix socket.
+    Can be overridden by the `PY2HWSW_SOCKET` environment variable.
+    """
+    socket_path = os.environ.get("PY2HWSW_SOCKET")
+    if socket_path:
+        return socket_path
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "py2hwsw.sock")
+    return os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+        "py2hwsw",
+        "py2hwsw.sock",
+    )
+
+
+def send_message(sock, message):
+    """Send a json message (terminated by a newline) through a socket"""
+    sock.sendall(json.dumps(message).encode() + b"\n")
+
+
+def receive_message(sock, data=b""):
+    """Receive a json message (terminated by a newline) from a socket.
+    param data: bytes of the message already received
+    returns: Received message, or None if connection closed before a full message.
+    """
+    while not data.endswith(b"\n"):
+        chunk = sock.recv(65536)
+        if not chunk:
+            return None
+        data += chunk
+    return json.loads(data)
+
+
+def run_on_server(argv, socket_path=None):
+    """Run py2hwsw with the given arguments on a running py2hwsw server.
+    The server runs the request with the current working directory, environment,
+    and standard streams of this process.
+    param argv: list of py2hwsw arguments (without program name)
+    param socket_path: path of server's socket. Uses `get_socket_path()` by default.
+    returns: Exit code of the request, or None if no server is available.
+    """
+    socket_path = socket_path or get_socket_path()
+    if not os.path.exists(socket_path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        return None
+
+    with sock:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        request = {"argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)}
+        # Give standard streams to the server, along with the request
+        try:
+            socket.send_fds(sock, [json.dumps(request).encode() + b"\n"], [0, 1, 2])
+        except OSError:
+            return None
+        reply = receive_message(sock)
+    if reply is None:
+        print("py2hwsw: Connection to py2hwsw server lost.", file=sys.stderr)
+        return 1
+    return reply["exit_code"]
@@ -0,0 +1,324 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+#
+#    py2hwsw_server.py: long-running py2hwsw server (`py2hwsw --serve`)
+#
+# The server keeps a warm interpreter (with every py2hwsw module and the lib core
+# index already loaded), and accepts requests from `py2hwsw_client.py` over a unix
+# socket. Each request runs in a forked child process, with the working directory,
+# environment and standard streams of the client, so it behaves exactly like a
+# normal py2hwsw call.
+#
+# Results of queries (like `print_build_dir` or `print_core_name`) are memoized by
+# the server, and validated using the files read to obtain them. Repeated queries
+# are answered directly by the server, without forking.
+# When py2hwsw's scripts change, memoized results are dropped, and the server
+# restarts (requests received meanwhile run in new processes).
+#
+
+import os
+import io
+import sys
+import json
+import socket
+import signal
+import selectors
+import subprocess
+import traceback
+
+import iob_colors
+from iob_context import get_context
+import core_index
+from py2hwsw_client import get_socket_path, send_message, receive_message
+
+# Targets and flags whose results only depend on the core setup files (may be memoized)
+QUERY_TARGETS = [
+    "print_build_dir",
+    "print_core_name",
+    "print_core_version",
+    "print_core_dict",
+    "print",
+    "--print_lib_cores",
+    "--print_py2hwsw_attributes",
+]
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class _tee(io.TextIOBase):
+    """Text stream that writes to another stream and keeps a copy of the text"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.text = io.StringIO()
+
+    def write(self, s):
+        self.text.write(s)
+        return self.stream.write(s)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def _scripts_fingerprint():
+    """Return stat info of py2hwsw scripts. Used to detect changes in py2hwsw's code."""
+    fingerprint = {}
+    for file in os.listdir(SCRIPTS_DIR):
+        if file.endswith(".py"):
+            st = os.stat(os.path.join(SCRIPTS_DIR, file))
+            fingerprint[file] = (st.st_mtime_ns, st.st_size)
+    return fingerprint
+
+
+def _files_fingerprint(paths):
+    fingerprint = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+            fingerprint[path] = [st.st_mtime_ns, st.st_size]
+        except OSError:
+            fingerprint[path] = None
+    return fingerprint
+
+
+def _is_query(argv):
+    return any(arg in QUERY_TARGETS for arg in argv) and "--check" not in argv
+
+
+def _write_all(fd, data):
+    while data:
+        data = data[os.write(fd, data) :]
+
+
+def _exit_code(exception):
+    """Return exit code of a SystemExit exception"""
+    if exception.code is None:
+        return 0
+    if isinstance(exception.code, int):
+        return exception.code
+    print(exception.code, file=sys.stderr)
+    return 1
+
+
+class py2hwsw_server:
+    """Server that runs py2hwsw requests received over a unix socket"""
+
+    def __init__(self, socket_path, main_func):
+        """
+        param socket_path: path of unix socket to listen on
+        param main_func: function that runs py2hwsw with a given list of arguments
+        """
+        self.socket_path = socket_path
+        self.main_func = main_func
+        self.scripts_fingerprint = _scripts_fingerprint()
+        # Memoized query results. Key: (cwd, argv, py2hwsw environment variables)
+        self.memo = {}
+        # Pids of running children
+        self.children = set()
+        self.restart = False
+        self.selector = selectors.DefaultSelector()
+
+    def run(self):
+        self._listen()
+        # Keep py2hwsw library index loaded
+        core_index.get_index(os.path.join(SCRIPTS_DIR, ".."))
+        print(
+            f"{iob_colors.INFO}Py2HWSW server listening on '{self.socket_path}'.{iob_colors.ENDC}",
+            flush=True,
+        )
+        try:
+            while True:
+                for key, _ in self.selector.select(timeout=1):
+                    key.data(key.fileobj)
+                self._reap_children()
+                if self.restart and not self.children:
+                    self._restart()
+        finally:
+            self._close()
+
+    def _listen(self):
+        # Don't replace socket of a running server
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+                probe.close()
+                print(
+                    f"{iob_colors.FAIL}A py2hwsw server is already listening on '{self.socket_path}'.{iob_colors.ENDC}"
+                )
+                sys.exit(1)
+            except ConnectionRefusedError:
+                os.remove(self.socket_path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.socket_path)), exist_ok=True)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        self.sock.listen()
+        self.selector.register(self.sock, selectors.EVENT_READ, self._accept)
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    def _close(self):
+        self.sock.close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    def _restart(self):
+        """Restart server to load new version of py2hwsw's code"""
+        print(
+            f"{iob_colors.INFO}Py2HWSW scripts changed. Restarting server.{iob_colors.ENDC}",
+            flush=True,
+        )
+        self._close()
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+    def _accept(self, sock):
+        conn, _ = sock.accept()
+        with conn:
+            data, fds, _, _ = socket.recv_fds(conn, 1 << 20, 3)
+            request = receive_message(conn, data)
+            if request is None or len(fds) != 3:
+                for fd in fds:
+                    os.close(fd)
+                return
+            # Results memoized by outdated code are not valid
+            if _scripts_fingerprint() != self.scripts_fingerprint:
+                self.restart = True
+                self.memo.clear()
+            memo_key = None
+            if _is_query(request["argv"]) and not self.restart:
+                memo_key = json.dumps(
+                    [
+                        request["cwd"],
+                        request["argv"],
+                        {
+                            k: v
+                            for k, v in request["env"].items()
+                            if k.startswith("PY2HWSW")
+                        },
+                    ]
+                )
+                if self._reply_from_memo(conn, memo_key, fds):
+                    return
+            # Don't let children inherit outdated indexes
+            for root, index in list(core_index._loaded_indexes.items()):
+                if not index.is_valid():
+                    del core_index._loaded_indexes[root]
+            self._fork_child(conn, request, fds, memo_key)
+
+    def _reply_from_memo(self, conn, memo_key, fds):
+        """Reply to request using memoized result, if it is still valid"""
+        result = self.memo.get(memo_key)
+        if not result:
+            return False
+        if _files_fingerprint(result["inputs"]) != result["inputs"] or not all(
+            core_index.get_index(root).is_valid() for root in result["index_roots"]
+        ):
+            del self.memo[memo_key]
+            return False
+        try:
+            _write_all(fds[1], result["output"].encode())
+        finally:
+            for fd in fds:
+                os.close(fd)
+        send_message(conn, {"exit_code": 0})
+        return True
+
+    def _fork_child(self, conn, request, fds, memo_key):
+        result_r, result_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(result_r)
+            self.sock.close()
+            self.selector.close()
+            exit_code = 1
+            try:
+                exit_code = self._run_request(request, fds, memo_key, result_w)
+            finally:
+                try:
+                    send_message(conn, {"exit_code": exit_code})
+                finally:
+                    os._exit(0)
+        for fd in fds:
+            os.close(fd)
+        os.close(result_w)
+        self.children.add(pid)
+        result_file = os.fdopen(result_r, "rb")
+        self.selector.register(
+            result_file,
+            selectors.EVENT_READ,
+            lambda f: self._read_child_result(f, memo_key),
+        )
+
+    def _run_request(self, request, fds, memo_key, result_w):
+        """Run request in child process. Returns exit code."""
+        for std_fd, fd in enumerate(fds):
+            os.dup2(fd, std_fd)
+            os.close(fd)
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+        if self.restart:
+            # Server's code is outdated. Run request in a new process.
+            return subprocess.call(
+                [sys.executable, os.path.join(SCRIPTS_DIR, "py2hwsw.py")]
+                + request["argv"]
+            )
+
+        stdout = sys.stdout
+        if memo_key:
+            sys.stdout = _tee(stdout)
+        try:
+            self.main_func(request["argv"])
+            exit_code = 0
+        except SystemExit as e:
+            exit_code = _exit_code(e)
+        except Exception:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            tee, sys.stdout = sys.stdout, stdout
+
+        if memo_key and exit_code == 0:
+            inputs = sorted(get_context().build_inputs)
+            result = {
+                "output": tee.text.getvalue(),
+                "inputs": _files_fingerprint(inputs),
+                "index_roots": list(core_index._loaded_indexes),
+            }
+            with os.fdopen(result_w, "w") as f:
+                json.dump(result, f)
+        return exit_code
+
+    def _read_child_result(self, result_file, memo_key):
+        """Store result of a child's query (pipe is closed when child exits)"""
+        self.selector.unregister(result_file)
+        with result_file:
+            data = result_file.read()
+        # Don't memoize results of children running outdated code
+        if memo_key and data and not self.restart:
+            self.memo[memo_key] = json.loads(data)
+
+    def _reap_children(self):
+        while self.children:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return
+            if pid == 0:
+                return
+            self.children.discard(pid)
+
+
+def serve(socket_path, main_func):
+    """Run py2hwsw server until it is terminated.
+    param socket_path: path of unix socket to listen on. Uses default path if empty.
+    param main_func: function that runs py2hwsw with a given list of arguments
+    """
+    py2hwsw_server(socket_path or get_socket_path(), main_func).run()
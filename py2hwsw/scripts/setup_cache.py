@@ -0,0 +1,241 @@
+# SPDX-FileCopyrightText: 2025 IObundle
+#
+# SPDX-License-Identifier: MIT
+
+#
+#    setup_cache.py: reuse results of core `setup()` functions within a run
+#
+# The same core is often instantiated many times with the same python parameters
+# (for example, `iob_comb.infer_registers()` creates an `iob_reg` subblock for each
+# inferred register). The result of each `setup(<py_params_dict>)` call is stored in
+# the `iob_context` of the run, together with the values of the python parameters
+# that the setup function read. Later calls of the same setup function with the same
+# values for those parameters reuse a copy of the stored result.
+#
+# A result is not stored if the setup function:
+# - iterates over its python parameters (so any parameter may be relevant);
+# - reads the 'instantiator' parameter (depends on the instance);
+# - modifies the python parameters it received;
+# - reads a parameter whose value is not json serializable.
+# The iob_globals of the run are also part of the key, as some setup functions read
+# them (like the reset polarity).
+#
+# Instances created from the same stored result, with the same destination, describe
+# the same Verilog module. Only the first of them generates the module's files in the
+# build directory (see `iob_core.py`).
+#
+
+import copy
+import json
+
+from iob_context import get_context
+
+# Arguments of `iob_core.get_core_obj()` that only affect the instance, not the module
+INSTANCE_ARGUMENTS = [
+    "instance_name",
+    "instance_description",
+    "parameters",
+    "connect",
+    "if_defined",
+    "if_not_defined",
+    "instantiate",
+]
+
+
+class _tracking_dict(dict):
+    """Dictionary of python parameters that records which keys were read.
+    Every method that reads or modifies more than a single given key sets 'read_all'.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read_keys = set()
+        self.read_all = False
+
+    def __getitem__(self, key):
+        self.read_keys.add(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.read_keys.add(key)
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        self.read_keys.add(key)
+        return super().__contains__(key)
+
+    def pop(self, key, *args):
+        self.read_all = True
+        return super().pop(key, *args)
+
+    def popitem(self):
+        self.read_all = True
+        return super().popitem()
+
+    def setdefault(self, key, default=None):
+        self.read_all = True
+        return super().setdefault(key, default)
+
+    def __setitem__(self, key, value):
+        self.read_all = True
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self.read_all = True
+        super().__delitem__(key)
+
+    def update(self, *args, **kwargs):
+        self.read_all = True
+        super().update(*args, **kwargs)
+
+    def clear(self):
+        self.read_all = True
+        super().clear()
+
+    def __or__(self, other):
+        self.read_all = True
+        return super().__or__(other)
+
+    def __ror__(self, other):
+        self.read_all = True
+        return super().__ror__(other)
+
+    def __ior__(self, other):
+        self.read_all = True
+        return super().__ior__(other)
+
+    def __eq__(self, other):
+        self.read_all = True
+        return super().__eq__(other)
+
+    def __ne__(self, other):
+        self.read_all = True
+        return super().__ne__(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        self.read_all = True
+        return super().__repr__()
+
+    def __reversed__(self):
+        self.read_all = True
+        return super().__reversed__()
+
+    def __iter__(self):
+        self.read_all = True
+        return super().__iter__()
+
+    def __len__(self):
+        self.read_all = True
+        return super().__len__()
+
+    def keys(self):
+        self.read_all = True
+        return super().keys()
+
+    def values(self):
+        self.read_all = True
+        return super().values()
+
+    def items(self):
+        self.read_all = True
+        return super().items()
+
+    def copy(self):
+        self.read_all = True
+        return super().copy()
+
+    def __reduce_ex__(self, protocol):
+        self.read_all = True
+        return super().__reduce_ex__(protocol)
+
+
+def _freeze(value):
+    """Return hashable representation of a value, or None if it is not json serializable"""
+    try:
+        return json.dumps(value, sort_keys=True)
+    except (TypeError, ValueError):
+        return None
+
+
+def _freeze_param(py_params, key):
+    """Return hashable representation of a python parameter ('' if it was not given)"""
+    if key not in py_params:
+        return ""
+    return _freeze(py_params[key])
+
+
+def _globals_key(context):
+    if context.globals is None:
+        return "{}"
+    return _freeze(vars(context.globals))
+
+
+def run_setup(core_module, setup_path, py_params):
+    """Call the `setup()` function of a core's python module, or reuse the result of a
+    previous call with the same values for the python parameters that it reads.
+    param core_module: python module of the core
+    param setup_path: path of the core's python file
+    param py_params: dictionary of python parameters given to the setup function
+    returns: tuple (core_dict, memo_id). The memo_id identifies the stored result (None
+             if the result could not be stored).
+    """
+    context = get_context()
+    globals_key = _globals_key(context)
+    entries = context.setup_memo.setdefault(setup_path, [])
+    for idx, entry in enumerate(entries):
+        if entry["globals"] == globals_key and all(
+            _freeze_param(py_params, k) == v for k, v in entry["params"].items()
+        ):
+            return copy.deepcopy(entry["core_dict"]), (setup_path, idx)
+
+    # Values of the python parameters before calling setup (it may modify them)
+    frozen_params = {
+        k: _freeze(v) for k, v in py_params.items() if k != "instantiator" or not v
+    }
+    tracked_params = _tracking_dict(py_params)
+    core_dict = core_module.setup(tracked_params)
+
+    if tracked_params.read_all or globals_key is None:
+        return core_dict, None
+    if "instantiator" in tracked_params.read_keys and py_params.get("instantiator"):
+        return core_dict, None
+    read_params = {}
+    for key in tracked_params.read_keys:
+        frozen = _freeze_param(py_params, key)
+        if frozen is None or frozen != frozen_params.get(key, ""):
+            # Not serializable, or modified by the setup function
+            return core_dict, None
+        read_params[key] = frozen
+    try:
+        stored_dict = copy.deepcopy(core_dict)
+    except Exception:
+        return core_dict, None
+    memo_id = (setup_path, len(entries))
+    entries.append(
+        {
+            "globals": globals_key,
+            "params": read_params,
+            "core_dict": stored_dict,
+        }
+    )
+    return core_dict, memo_id
+
+
+def module_key(memo_id, build_dir, kwargs):
+    """Return key that identifies the Verilog module described by an instance created
+    from a stored setup result. Instances with the same key generate the same files.
+    param memo_id: id of the stored setup result (returned by `run_setup()`)
+    param build_dir: build directory of the instance
+    param kwargs: arguments given to `iob_core.get_core_obj()`
+    returns: hashable key, or None if the module can not be identified
+    """
+    if memo_id is None:
+        return None
+    module_args = _freeze(
+        {k: v for k, v in kwargs.items() if k not in INSTANCE_ARGUMENTS}
+    )
+    if module_args is None:
+        return None
+    return (memo_id, build_dir, module_args)
@@ -4,6 +4,8 @@
 #
 # SPDX-License-Identifier: MIT
 
+from build_files import open_file
+
 
 def generate_snippets(core):
     """Generate verilog code with snippets of this module.
@@ -23,5 +25,5 @@ def generate_snippets_snippet(core):
     """
     code = generate_snippets(core)
     out_dir = core.build_dir + "/hardware/src"
-    with open(f"{out_dir}/{core.name}_snippets.vs", "w+") as f:
+    with open_file(f"{out_dir}/{core.name}_snippets.vs", "w") as f:
         f.write(code)
@@ -5,8 +5,25 @@
 # SPDX-License-Identifier: MIT
 
 import os
+import hashlib
 import argparse
 import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import iob_colors
+from core_index import get_cache_dir
+from iob_context import get_context
+from iob_base import fail_with_msg
+from build_files import write_file
+
+# Extensions of files formatted by each tool
+FORMAT_EXTENSIONS = {
+    "black": (".py",),
+    "clang": (".c", ".h", ".cpp", ".hpp"),
+}
+# Maximum number of files given to each clang-format process
+MAX_BATCH_SIZE = 256
 
 
 def submodule_exceptions(path):
@@ -93,6 +110,167 @@ def run_tool(tool, path=".", rules_file_path=None):
     subprocess.run(tool_cmd, shell=True, check=True)
 
 
+_tool_versions = {}
+
+
+def get_tool_version(tool):
+    """Return version string of a formatter, or None if it is not installed"""
+    if tool == "black" and tool not in _tool_versions:
+        try:
+            import black
+
+            _tool_versions[tool] = f"black {black.__version__}"
+        except ImportError:
+            pass
+    if tool not in _tool_versions:
+        cmd = "black" if tool == "black" else "clang-format"
+        try:
+            result = subprocess.run([cmd, "--version"], capture_output=True, text=True)
+            _tool_versions[tool] = result.stdout.strip() or None
+        except OSError:
+            _tool_versions[tool] = None
+    return _tool_versions[tool]
+
+
+def _cache_path(tool, key):
+    return os.path.join(get_cache_dir(), "sw_format", tool, key[:2], key)
+
+
+def _read_cache(tool, key):
+    try:
+        with open(_cache_path(tool, key), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_cache(tool, key, data):
+    """Store formatted content. Failing to write the cache is not an error."""
+    path = _cache_path(tool, key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def _run_black(files_list):
+    """Format python files in-process, with black's python API"""
+    try:
+        import black
+    except ImportError:
+        # Black is only installed as a command line tool
+        _run_batches(["black", "-q"], files_list, 1)
+        return
+    mode = black.Mode()
+    for path in files_list:
+        try:
+            # Only writes the file if its content changed
+            black.format_file_in_place(
+                Path(path), fast=False, mode=mode, write_back=black.WriteBack.YES
+            )
+        except Exception as e:
+            fail_with_msg(f"black failed to format '{path}': {e}")
+
+
+def _run_batches(cmd, files_list, jobs):
+    """Run a formatter on batches of files, with at most `jobs` processes at a time"""
+    num_batches = max(jobs, -(-len(files_list) // MAX_BATCH_SIZE))
+    batches = [files_list[i::num_batches] for i in range(num_batches)]
+    batches = [batch for batch in batches if batch]
+
+    def run_batch(batch):
+        try:
+            return subprocess.run(cmd + batch).returncode
+        except OSError as e:
+            print(f"{cmd[0]}: {e}")
+            return 127
+
+    with ThreadPoolExecutor(max_workers=min(jobs, len(batches))) as executor:
+        returncodes = list(executor.map(run_batch, batches))
+    for returncode in returncodes:
+        if returncode != 0:
+            fail_with_msg(f"'{cmd[0]}' failed with exit code {returncode}.")
+
+
+def format_files(tool, files_list, rules_file_path=None, jobs=None):
+    """Format software files with black (python) or clang-format (C/C++).
+    Files with extensions not supported by the tool are ignored.
+    Formatted results are cached in py2hwsw's cache directory, keyed by the content of
+    the file, the tool version and its rules. Files found in the cache are not given
+    to the tool, and are only written if their formatted content differs.
+    Formatted files are final, so they get the license header of their build directory
+    (see `manage_headers.py`).
+    param tool: 'black' or 'clang'
+    param files_list: list of files to format
+    param rules_file_path: clang-format rules file. Defaults to py2hwsw's rules.
+    param jobs: maximum number of clang-format processes running in parallel.
+                Defaults to jobs of current run.
+    """
+    files_list = [f for f in files_list if f.endswith(FORMAT_EXTENSIONS[tool])]
+    if not files_list:
+        return
+    jobs = max(jobs or get_context().jobs, 1)
+
+    rules = ""
+    if tool == "clang":
+        if not rules_file_path:
+            rules_file_path = os.path.join(
+                os.path.dirname(__file__), "clang-format.rules"
+            )
+        with open(rules_file_path, "r") as f:
+            rules = f.read()
+    version = get_tool_version(tool)
+    key_prefix = f"{tool}\0{version}\0{rules}\0".encode()
+
+    # Use cached results. Only format files not found in the cache.
+    keys = {}
+    to_format = []
+    for path in files_list:
+        with open(path, "rb") as f:
+            content = f.read()
+        keys[path] = hashlib.sha256(key_prefix + content).hexdigest()
+        cached = _read_cache(tool, keys[path]) if version else None
+        if cached is None:
+            to_format.append(path)
+        else:
+            # Content is final (may get its license header)
+            write_file(path, cached, final=True)
+
+    print(
+        f"{iob_colors.INFO}Formatting {len(files_list)} files with {tool} ({len(files_list) - len(to_format)} cached).{iob_colors.ENDC}"
+    )
+    if not to_format:
+        return
+    if tool == "black":
+        _run_black(to_format)
+    else:
+        _run_batches(
+            [
+                "clang-format",
+                "-i",
+                f"-style=file:{rules_file_path}",
+                "-fallback-style=none",
+                "-Werror",
+            ],
+            to_format,
+            jobs,
+        )
+    for path in to_format:
+        with open(path, "rb") as f:
+            formatted = f.read()
+        if version:
+            _write_cache(tool, keys[path], formatted)
+            # Formatted content is also formatted
+            _write_cache(
+                tool, hashlib.sha256(key_prefix + formatted).hexdigest(), formatted
+            )
+        write_file(path, formatted, final=True)
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         prog="sw_tools.py",
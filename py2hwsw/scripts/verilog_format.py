@@ -4,30 +4,204 @@
 #
 # SPDX-License-Identifier: MIT
 
+# Format Verilog files with Verible.
+#
+# Formatted results are cached in py2hwsw's cache directory, keyed by the content of
+# the file before formatting, the format rules, and the Verible version. Files whose
+# content was already formatted before (in any build directory, like library sources
+# copied verbatim) are never passed to Verible again.
+# Other files are copied to a temporary directory and formatted there, in shards run
+# by parallel Verible processes. Only files whose formatted content differs are
+# written back, so files that were already formatted keep their mtime.
+import os
 import sys
+import shlex
+import hashlib
+import argparse
+import tempfile
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import iob_colors
+from core_index import get_cache_dir
+from iob_context import get_context
+from build_files import write_file
+
+FORMATTER = "verible-verilog-format"
+# Maximum number of files formatted by each Verible process (avoids argv limits)
+MAX_SHARD_SIZE = 256
+
+_formatter_version = {}
+
+
+def get_formatter_version():
+    """Return version string of Verible's formatter, or None if it is not installed"""
+    if "version" not in _formatter_version:
+        try:
+            result = subprocess.run(
+                [FORMATTER, "--version"], capture_output=True, text=True
+            )
+            _formatter_version["version"] = result.stdout.strip() or None
+        except OSError:
+            _formatter_version["version"] = None
+    return _formatter_version["version"]
+
+
+def _cache_path(key):
+    return os.path.join(get_cache_dir(), "verilog_format", key[:2], key)
+
+
+def _read_cache(key):
+    try:
+        with open(_cache_path(key), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_cache(key, data):
+    """Store formatted content. Failing to write the cache is not an error."""
+    path = _cache_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def _run_shard(format_rules, shard, tmp_dir):
+    """Format a shard of files (copies in a temporary directory) with one Verible process.
+    param shard: list of tuples (index, path, content) of files to format
+    returns: tuple (return code, dictionary of index -> formatted content, output of
+             Verible with paths of the copies replaced by the paths of the files)
+    """
+    paths = {}
+    source_paths = {}
+    for idx, source_path, data in shard:
+        # Keep the file name (one directory per file avoids name collisions)
+        os.makedirs(os.path.join(tmp_dir, str(idx)))
+        paths[idx] = os.path.join(tmp_dir, str(idx), os.path.basename(source_path))
+        source_paths[paths[idx]] = source_path
+        with open(paths[idx], "wb") as f:
+            f.write(data)
+    format_cmd = [FORMATTER, "--inplace"] + format_rules + list(paths.values())
+    try:
+        result = subprocess.run(
+            format_cmd, capture_output=True, text=True, errors="replace"
+        )
+    except OSError as e:
+        return 127, {}, ("", f"{iob_colors.FAIL}{FORMATTER}: {e}{iob_colors.ENDC}\n")
+    # Report errors with the paths of the files, not of their temporary copies
+    output = []
+    for text in (result.stdout, result.stderr):
+        for tmp_path, source_path in source_paths.items():
+            text = text.replace(tmp_path, source_path)
+        output.append(text)
+    formatted = {}
+    for idx, path in paths.items():
+        with open(path, "rb") as f:
+            formatted[idx] = f.read()
+    return result.returncode, formatted, tuple(output)
 
 
 def format_files(
-    files_list, format_rules_file="./submodules/LIB/scripts/verible-format.rules"
+    files_list,
+    format_rules_file="./submodules/LIB/scripts/verible-format.rules",
+    verify=False,
+    jobs=None,
 ):
     """Run Verible formatter on given list of files.
     :param files_list: list of files to format.
     :param format_rules_file: rules file to use.
+    :param verify: only check if files are formatted (files are not modified).
+    :param jobs: number of Verible processes run in parallel. Defaults to jobs of current run.
+    :returns: list of files that were not formatted (modified, or to modify if verify is True).
     """
     # Read format rules
     with open(format_rules_file) as f:
-        format_rules = f.read().replace("\n", " ")
+        format_rules = shlex.split(f.read())
+    jobs = max(jobs or get_context().jobs, 1)
+
+    version = get_formatter_version()
+    key_prefix = f"{version}\0{' '.join(format_rules)}\0".encode()
+    contents = []
+    keys = []
+    for path in files_list:
+        with open(path, "rb") as f:
+            contents.append(f.read())
+        keys.append(hashlib.sha256(key_prefix + contents[-1]).hexdigest())
 
-    format_cmd = (
-        f'verible-verilog-format --inplace {format_rules} {" ".join(files_list)}'
+    # Use cached results. Only format files not found in the cache.
+    results = {}
+    to_format = []
+    for idx, key in enumerate(keys):
+        cached = _read_cache(key) if version else None
+        if cached is not None:
+            results[idx] = cached
+        else:
+            to_format.append((idx, files_list[idx], contents[idx]))
+
+    print(
+        f"{iob_colors.INFO}Formatting {len(files_list)} Verilog files with {FORMATTER} ({len(files_list) - len(to_format)} cached).{iob_colors.ENDC}"
     )
-    print(format_cmd)
-    result = subprocess.run(format_cmd, shell=True)
-    if result.returncode != 0:
-        exit(result.returncode)
+    if to_format:
+        num_shards = max(jobs, -(-len(to_format) // MAX_SHARD_SIZE))
+        shards = [to_format[i::num_shards] for i in range(num_shards)]
+        shards = [shard for shard in shards if shard]
+        with tempfile.TemporaryDirectory(prefix="py2hwsw_format_") as tmp_dir:
+            with ThreadPoolExecutor(max_workers=min(jobs, len(shards))) as executor:
+                tasks = [
+                    executor.submit(_run_shard, format_rules, shard, tmp_dir)
+                    for shard in shards
+                ]
+            # Print output of every shard before exiting on errors
+            shard_results = [task.result() for task in tasks]
+            for _, _, (stdout, stderr) in shard_results:
+                sys.stdout.write(stdout)
+                sys.stderr.write(stderr)
+            for returncode, _, _ in shard_results:
+                if returncode != 0:
+                    exit(returncode)
+            for _, formatted, _ in shard_results:
+                for idx, data in formatted.items():
+                    results[idx] = data
+                    _write_cache(keys[idx], data)
+                    # Formatted content is also formatted
+                    _write_cache(hashlib.sha256(key_prefix + data).hexdigest(), data)
+
+    unformatted = []
+    for idx, path in enumerate(files_list):
+        if results[idx] != contents[idx]:
+            unformatted.append(path)
+        if not verify:
+            # Content is final (may get its license header)
+            write_file(path, results[idx], final=True)
+    if verify and unformatted:
+        print(f"{iob_colors.FAIL}Verilog files not formatted:{iob_colors.ENDC}")
+        for path in unformatted:
+            print(f"  {path}")
+    return unformatted
 
 
 if __name__ == "__main__":
-    files_list = sys.argv[1:]
-    format_files(files_list)
+    parser = argparse.ArgumentParser(description="Format Verilog files with Verible")
+    parser.add_argument("files", nargs="+", help="Verilog files to format")
+    parser.add_argument(
+        "--rules",
+        default=os.path.join(os.path.dirname(__file__), "verible-format.rules"),
+        help="Verible format rules file",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Only check if files are formatted. Exits with code 1 if they are not.",
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=1, help="Number of parallel Verible processes"
+    )
+    args = parser.parse_args()
+    if format_files(args.files, args.rules, args.verify, args.jobs) and args.verify:
+        sys.exit(1)
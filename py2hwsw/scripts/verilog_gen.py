@@ -5,8 +5,11 @@
 # SPDX-License-Identifier: MIT
 
 import os
+import io
 import iob_colors
 import re
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 
 import param_gen
 import io_gen
@@ -16,57 +19,193 @@ import comb_gen
 import fsm_gen
 import snippet_gen
 from iob_base import debug
+from iob_context import get_context
+from build_files import (
+    open_file,
+    write_file,
+    get_snippets,
+    remove_snippets,
+    write_snippets,
+    is_duplicate_source,
+    record_source,
+    is_pending_source,
+    get_pending_source,
+    get_pending_sources,
+    write_pending_source,
+    write_pending_sources,
+)
+
+# Include statements of Verilog snippets
+INCLUDE_SNIPPET_RE = re.compile(r'`include ".*\.vs"')
+# Include statements of port and portmap snippets (may need trailing comma removed)
+INCLUDE_PORT_SNIPPET_RE = re.compile(r'`include ".*_port(map)?\.vs"')
+FIRST_COMMA_RE = re.compile(r"\s*,\s*")
+
+
+class snippet_resolver:
+    """Replace include statements of Verilog snippets by their content.
+    Snippets are indexed by file name (the first file found with a given name is used),
+    and each snippet is read and expanded (including its nested snippets) only once.
+    """
 
-
-# Find include statements inside a list of lines and replace them by the contents of the included file and return the new list of lines
-def replace_includes_in_lines(lines, VSnippetFiles, ignore_snippets):
-    for line in lines:
-        if re.search(r'`include ".*\.vs"', line):
+    def __init__(self, snippet_files, ignore_snippets=[], snippet_contents={}):
+        """
+        param snippet_files: list of paths of Verilog snippet ('.vs') files
+        param ignore_snippets: names of snippets whose include statements are kept
+        param snippet_contents: content of snippets kept in memory (not read from
+                                disk). Key: path (as given in `snippet_files`)
+        """
+        self.snippet_paths = {}
+        for snippet_file in snippet_files:
+            self.snippet_paths.setdefault(os.path.basename(snippet_file), snippet_file)
+        self.ignore_snippets = set(ignore_snippets)
+        self.snippet_contents = snippet_contents
+        # Expanded lines of each snippet. Key: snippet name
+        self.expanded_snippets = {}
+
+    def expand_snippet(self, name, parents=()):
+        """Return lines of a snippet, with its include statements replaced.
+        param name: file name of the snippet
+        param parents: names of snippets that include this one (to detect cycles)
+        """
+        lines = self.expanded_snippets.get(name)
+        if lines is not None:
+            return lines
+        if name not in self.snippet_paths:
+            raise FileNotFoundError(
+                f"{iob_colors.FAIL}File {name} not found! {iob_colors.ENDC}"
+            )
+        if name in parents:
+            raise RecursionError(
+                f"{iob_colors.FAIL}Snippet {name} includes itself (through {' -> '.join(parents)})! {iob_colors.ENDC}"
+            )
+        path = self.snippet_paths[name]
+        if path in self.snippet_contents:
+            # Same lines as reading the file in text mode
+            include_lines = io.StringIO(
+                self.snippet_contents[path], newline=None
+            ).readlines()
+        else:
+            with open(path, "r") as include:
+                include_lines = include.readlines()
+        text = "".join(self.replace_includes_in_lines(include_lines, parents + (name,)))
+        lines = io.StringIO(text).readlines()
+        self.expanded_snippets[name] = lines
+        return lines
+
+    def replace_includes_in_lines(self, lines, parents=()):
+        """Return new list of lines, with include statements replaced by the content
+        of the included snippets.
+        """
+        new_lines = []
+        for idx, line in enumerate(lines):
+            if not INCLUDE_SNIPPET_RE.search(line):
+                new_lines.append(line)
+                continue
             # retrieve the name of the file to be included
             tail = line.split('"')[1]
-            if tail in ignore_snippets:
+            if tail in self.ignore_snippets:
+                new_lines.append(line)
                 continue
-            found_vs = False
-            for VSnippetFile in VSnippetFiles:
-                if tail == os.path.basename(VSnippetFile):
-                    found_vs = True
-                    # open the file to be included
-                    with open(f"{VSnippetFile}", "r") as include:
-                        include_lines = include.readlines()
-                    # replace the include statement with the content of the file
-                    # if the file to be included is *_portmap.vs or *_port.vs and has a ");" in the next line, remove the last comma
-                    if re.search(r'`include ".*_portmap\.vs"', line) or re.search(
-                        r'`include ".*_port\.vs"', line
-                    ):
-                        if re.search(r"\s*\);\s*", lines[lines.index(line) + 1]):
-                            # find and remove the first comma in the last line of the include_lines ignoring white spaces
-                            include_lines[-1] = re.sub(
-                                r"\s*,\s*", "", include_lines[-1], count=1
-                            )
-                    # if the include_lines has an include statement, recursively replace the include statements
-                    for include_line in include_lines:
-                        if re.search(r'`include ".*\.vs"', include_line):
-                            include_lines = replace_includes_in_lines(
-                                include_lines, VSnippetFiles, ignore_snippets
-                            )
-                    # replace the include statement with the content of the file
-                    lines[lines.index(line)] = "".join(include_lines)
-                    break
-            # if the file to be included is not found in the VSnippetFiles, raise an error
-            if not found_vs:
-                raise FileNotFoundError(
-                    f"{iob_colors.FAIL}File {tail} not found! {iob_colors.ENDC}"
-                )
-    return lines
-
-
-# Function to search recursively for every verilog file inside the search_path
+            include_lines = self.expand_snippet(tail, parents)
+            # if the file to be included is *_portmap.vs or *_port.vs and has a ");" in the next line, remove the last comma
+            if (
+                include_lines
+                and INCLUDE_PORT_SNIPPET_RE.search(line)
+                and idx + 1 < len(lines)
+                and ");" in lines[idx + 1]
+            ):
+                # find and remove the first comma in the last line of the include_lines ignoring white spaces
+                include_lines = include_lines[:-1] + [
+                    FIRST_COMMA_RE.sub("", include_lines[-1], count=1)
+                ]
+            # replace the include statement with the content of the file
+            new_lines.append("".join(include_lines))
+        return new_lines
+
+    def replace_includes_in_source(self, verilog_file):
+        """Replace include statements in a Verilog source kept in memory (see
+        `build_files.py`), and write it to disk.
+        """
+        data = get_pending_source(verilog_file)
+        if data is None:
+            # Removed (duplicate of a source written by another task)
+            return
+        debug(f"Replacing includes in {verilog_file}", 1)
+        try:
+            # Same lines as reading the file in text mode
+            lines = io.StringIO(data.decode(), newline=None).readlines()
+        except UnicodeDecodeError:
+            print(
+                f"{iob_colors.FAIL}Error occured when opening '{verilog_file}'. That file is not utf-8 encoded.{iob_colors.ENDC}."
+            )
+            exit(1)
+        # write the new file (content is final, unless it is formatted later)
+        write_pending_source(
+            verilog_file,
+            "".join(self.replace_includes_in_lines(lines)),
+            final=not get_context().project_vformat,
+        )
+
+    def replace_includes_in_file(self, verilog_file):
+        """Replace include statements in a Verilog file (single pass).
+        Files without include statements are not rewritten.
+        """
+        # Writing a source may remove its duplicates (see `build_files.py`), that may
+        # still be in the list of files to replace.
+        if is_duplicate_source(verilog_file) or not record_source(verilog_file):
+            return
+        debug(f"Replacing includes in {verilog_file}", 1)
+        try:
+            with open(verilog_file, "r") as source:
+                lines = source.readlines()
+        except FileNotFoundError:
+            # Removed (duplicate of a source written by another task)
+            return
+        except UnicodeDecodeError:
+            print(
+                f"{iob_colors.FAIL}Error occured when opening '{verilog_file}'. That file is not utf-8 encoded.{iob_colors.ENDC}."
+            )
+            exit(1)
+        if not any(INCLUDE_SNIPPET_RE.search(line) for line in lines):
+            return
+        # write the new file (content is final, unless it is formatted later)
+        write_file(
+            verilog_file,
+            "".join(self.replace_includes_in_lines(lines)),
+            final=not get_context().project_vformat,
+        )
+
+
+# Find include statements inside a list of lines and replace them by the contents of the included file and return the new list of lines
+def replace_includes_in_lines(lines, VSnippetFiles, ignore_snippets):
+    return snippet_resolver(VSnippetFiles, ignore_snippets).replace_includes_in_lines(
+        lines
+    )
+
+
+# Function to search recursively for every verilog file inside the search_path.
+# Verilog sources that include snippets are usually kept in memory when generated or
+# copied (see `build_files.py`), so they are only written once, with their includes
+# replaced. Files on disk are only rewritten if they include snippets.
 def replace_includes(setup_dir="", build_dir="", ignore_snippets=[]):
     VSnippetFiles = []
     VerilogFiles = []
     SearchPaths = f"{build_dir}/hardware"
     ExcludeDirs = ["hardware/fpga/db", "hardware/fpga/ip"]
-
+    PendingFiles = [
+        path
+        for path in get_pending_sources(SearchPaths)
+        if not any(exclude_dir in os.path.dirname(path) for exclude_dir in ExcludeDirs)
+    ]
+
+    # Snippets kept in memory, by directory
+    stored_snippets = {}
+    for path, content in get_snippets(SearchPaths).items():
+        stored_snippets.setdefault(os.path.dirname(path), {})[
+            os.path.basename(path)
+        ] = content
+    snippet_contents = {}
     for root, dirs, files in os.walk(SearchPaths):
         # Skip directories from ExcludeDirs
         if any(exclude_dir in root for exclude_dir in ExcludeDirs):
@@ -75,29 +214,50 @@ def replace_includes(setup_dir="", build_dir="", ignore_snippets=[]):
         for file in files:
             if file.endswith(".vs"):
                 VSnippetFiles.append(f"{root}/{file}")
-                VerilogFiles.append(f"{root}/{file}")
             elif file.endswith(".v") or file.endswith(".sv") or file.endswith(".vh"):
-                VerilogFiles.append(f"{root}/{file}")
+                # Content of sources kept in memory replaces the file on disk
+                if not is_pending_source(f"{root}/{file}"):
+                    VerilogFiles.append(f"{root}/{file}")
+        for file, content in stored_snippets.get(os.path.abspath(root), {}).items():
+            if file not in files:
+                VSnippetFiles.append(f"{root}/{file}")
+            snippet_contents[f"{root}/{file}"] = content
+
+    resolver = snippet_resolver(VSnippetFiles, ignore_snippets, snippet_contents)
+    # Snippets are removed below, so they are only expanded (not written).
+    # Every snippet is expanded, even if not included, to report missing includes.
+    tasks = [(resolver.expand_snippet, name) for name in resolver.snippet_paths]
+    tasks += [(resolver.replace_includes_in_source, path) for path in PendingFiles]
+    tasks += [(resolver.replace_includes_in_file, path) for path in VerilogFiles]
+    jobs = min(get_context().jobs, len(tasks))
+    if jobs > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, func, arg)
+                for func, arg in tasks
+            ]
+        for future in futures:
+            future.result()
+    else:
+        for func, arg in tasks:
+            func(arg)
+    # Sources not searched (outside of search paths) are written with their includes
+    write_pending_sources(build_dir)
 
-    for VerilogFile in VerilogFiles:
-        debug(f"Replacing includes in {VerilogFile}", 1)
-        with open(VerilogFile, "r") as source:
-            try:
-                lines = source.readlines()
-            except UnicodeDecodeError:
-                print(
-                    f"{iob_colors.FAIL}Error occured when opening '{VerilogFile}'. That file is not utf-8 encoded.{iob_colors.ENDC}."
-                )
-                exit(1)
-            # replace the include statements with the content of the file
-            new_lines = replace_includes_in_lines(lines, VSnippetFiles, ignore_snippets)
-        # write the new file
-        with open(VerilogFile, "w") as source:
-            source.writelines(new_lines)
+    if get_context().write_snippets:
+        # Keep .vs files (`--write_snippets` option)
+        print(
+            f"{iob_colors.INFO}Replaced Verilog Snippet includes with respective content.{iob_colors.ENDC}"
+        )
+        return
 
     # Remove .vs files from current directory
+    remove_snippets(snippet_contents)
     for VSnippetFile in VSnippetFiles:
-        os.remove(VSnippetFile)
+        if os.path.isfile(VSnippetFile):
+            os.remove(VSnippetFile)
+    # Snippets not searched (outside of search paths) are kept as files
+    write_snippets(build_dir)
 
     print(
         f"{iob_colors.INFO}Replaced Verilog Snippet includes with respective content and deleted the files.{iob_colors.ENDC}"
@@ -135,7 +295,7 @@ def insert_verilog_in_module(verilog_code, verilog_file_path, after_line=""):
     lines.insert(insertion_idx, verilog_code + "\n")
 
     # Write new system source file
-    with open(verilog_file_path, "w") as system_source:
+    with open_file(verilog_file_path, "w") as system_source:
         system_source.writelines(lines)
 
 
@@ -153,7 +313,7 @@ def remove_verilog_line_from_source(verilog_code, verilog_file_path):
         line_idx += 1
 
     # Write new system source file
-    with open(verilog_file_path, "w") as system_source:
+    with open_file(verilog_file_path, "w") as system_source:
         system_source.writelines(lines)
 
 
@@ -167,7 +327,7 @@ def inplace_change(filename, old_string, new_string):
             return
 
     # Safely write the changed content, if found in the file
-    with open(filename, "w") as f:
+    with open_file(filename, "w") as f:
         print(
             'Changing "{old_string}" to "{new_string}" in {filename}'.format(**locals())
         )
@@ -182,14 +342,14 @@ def generate_verilog(core):
     out_dir = os.path.join(core.build_dir, core.dest_dir)
     file_path = os.path.join(out_dir, f"{core.name}.v")
 
-    if os.path.exists(file_path):
+    if os.path.exists(file_path) or is_pending_source(file_path):
         debug(
             f"Not generating '{core.name}.v'. Module already exists (probably created manually or generated previously).",
             1,
         )
         return
 
-    f_module = open(file_path, "w+")
+    f_module = open_file(file_path, "w")
 
     params = param_gen.generate_params(core)
     if params:
@@ -213,8 +373,7 @@ def generate_verilog(core):
     if core.subblocks:
         module_body_lines += block_gen.generate_subblocks(core)
 
-    f_module.write(
-        f"""`timescale 1ns / 1ps
+    f_module.write(f"""`timescale 1ns / 1ps
 `include "{core.name}_conf.vh"
 
 module {core.name} {params_line}
@@ -223,6 +382,5 @@ module {core.name} {params_line}
 
 {module_body_lines}
 endmodule
-"""
-    )
+""")
     f_module.close()
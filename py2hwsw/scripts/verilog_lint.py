@@ -10,21 +10,52 @@
 #  [ hardware/src, hardware/fpga/src, hardware/fpga/vivado/basys3/ ]    -> The 'base' directory is 'hardware/fpga/vivado/BASYS3/'
 #  [ hardware/src, hardware/fpga/src, hardware/fpga/quartus/cyclonev/ ] -> The 'base' directory is 'hardware/fpga/quartus/CYCLONEV/'
 #  ...
+#
+# Each directory combination is a lint unit. Units are linted in parallel (using the
+# number of jobs of the current run), and the result of each unit is cached in
+# py2hwsw's cache directory. The cache key is the content hash of every Verilog file
+# in the unit's directories, the linter command, and the linter version.
+# Diagnostics of every unit are collected in a json report.
 import os
+import re
 import sys
+import json
+import time
+import shlex
+import hashlib
+import argparse
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 
 import iob_colors
+from core_index import get_cache_dir
+from iob_context import get_context
 
 linters = [
-    {"command": "verilator --lint-only -Wall --timing", "include_flag": "-I"},
-    #  {"command": "svlint", "include_flag": "-i"}
+    {
+        "name": "verilator",
+        "command": "verilator --lint-only -Wall --timing",
+        "include_flag": "-I",
+        "version_command": "verilator --version",
+    },
+    #  {"name": "svlint", "command": "svlint", "include_flag": "-i", "version_command": "svlint --version"}
 ]
 
+# Files in include directories that may be used by the files being linted
+VERILOG_EXTENSIONS = (".v", ".vh", ".sv", ".svh", ".vs")
+# Verilator diagnostic line. Example:
+# %Warning-UNUSEDSIGNAL: /path/to/file.v:10:15: Signal is not used: 'a'
+DIAGNOSTIC_RE = re.compile(
+    r"^%(?P<severity>Warning|Error)(-(?P<code>[A-Za-z0-9_]+))?: "
+    r"((?P<file>[^:\s]+):(?P<line>\d+):((?P<column>\d+):)? )?(?P<message>.*)$"
+)
 
-def lint_files(files_list):
-    """Run Linter on given list of files, while grouping them according to their location in the IObundle standard directory structure."""
-    print(f"Linting files: {files_list}", file=sys.stderr)  # DEBUG
+
+def get_lint_units(files_list):
+    """Group files according to their location in the IObundle standard directory structure.
+    returns: dictionary with a lint unit for each base directory.
+             Key: base directory, Value: tuple (list of include dirs, list of files)
+    """
     # Group files by their directories
     dir_file_list = {}
     for file in files_list:
@@ -72,19 +103,202 @@ def lint_files(files_list):
         del files_to_lint[directory]
         del directories_to_lint[directory]
 
-    for linter in linters:
-        # Lint files for each directory combination
-        for directory, files in files_to_lint.items():
-            print(
-                f'\n{iob_colors.INFO}Linting from base directory "{directory}"{iob_colors.ENDC}'
+    return {
+        directory: (directories_to_lint[directory], files)
+        for directory, files in files_to_lint.items()
+    }
+
+
+_linter_versions = {}
+
+
+def get_linter_version(linter):
+    """Return version string of a linter, or None if it is not installed"""
+    name = linter["name"]
+    if name not in _linter_versions:
+        try:
+            result = subprocess.run(
+                shlex.split(linter["version_command"]),
+                capture_output=True,
+                text=True,
             )
-            linter_cmd = f"{linter['command']} {linter['include_flag']}{(' '+linter['include_flag']).join(directories_to_lint[directory])} {' '.join(files)}"
-            print(linter_cmd)
-            result = subprocess.run(linter_cmd, shell=True)
-            if result.returncode != 0:
-                exit(result.returncode)
+            _linter_versions[name] = result.stdout.strip() or None
+        except OSError:
+            _linter_versions[name] = None
+    return _linter_versions[name]
+
+
+def _file_hash(path, hashes):
+    if path not in hashes:
+        with open(path, "rb") as f:
+            hashes[path] = hashlib.sha256(f.read()).hexdigest()
+    return hashes[path]
+
+
+def _unit_cache_key(command, version, include_dirs, files, hashes):
+    """Return cache key of a lint unit.
+    Includes every Verilog file of the include directories, since any of them may be
+    included by the files being linted.
+    """
+    unit_files = set(files)
+    for directory in include_dirs:
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith(VERILOG_EXTENSIONS) and os.path.isfile(path):
+                unit_files.add(path)
+    key = hashlib.sha256()
+    key.update(json.dumps([command, version]).encode())
+    for path in sorted(unit_files):
+        key.update(f"{path}\0{_file_hash(path, hashes)}\0".encode())
+    return key.hexdigest()
+
+
+def _get_cache_path(key):
+    return os.path.join(get_cache_dir(), "verilog_lint", f"{key}.json")
+
+
+def _read_cached_result(key):
+    try:
+        with open(_get_cache_path(key), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cached_result(key, result):
+    """Store result of a lint unit. Failing to write the cache is not an error."""
+    path = _get_cache_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({k: result[k] for k in ["returncode", "output"]}, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def parse_diagnostics(output):
+    """Return list of diagnostics (dictionaries) found in the output of the linter"""
+    diagnostics = []
+    for line in output.splitlines():
+        match = DIAGNOSTIC_RE.match(line)
+        if not match:
+            continue
+        diagnostic = match.groupdict()
+        for attr in ["line", "column"]:
+            if diagnostic[attr] is not None:
+                diagnostic[attr] = int(diagnostic[attr])
+        diagnostics.append(diagnostic)
+    return diagnostics
+
+
+def _lint_unit(linter, directory, include_dirs, files, version, hashes):
+    """Lint a unit, or reuse its cached result. Returns dictionary with the result."""
+    start_time = time.time()
+    command = (
+        shlex.split(linter["command"])
+        + [linter["include_flag"] + include_dir for include_dir in include_dirs]
+        + files
+    )
+    result = {
+        "linter": linter["name"],
+        "base_dir": directory,
+        "include_dirs": include_dirs,
+        "files": files,
+        "command": shlex.join(command),
+        "cached": False,
+    }
+    key = None
+    if version:
+        key = _unit_cache_key(command, version, include_dirs, files, hashes)
+        cached = _read_cached_result(key)
+        if cached:
+            result.update(cached, cached=True)
+    if not result["cached"]:
+        try:
+            process = subprocess.run(
+                command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+            )
+            result.update(returncode=process.returncode, output=process.stdout)
+        except OSError as e:
+            result.update(returncode=127, output=f"{command[0]}: {e}\n")
+        if key:
+            _write_cached_result(key, result)
+    result["diagnostics"] = parse_diagnostics(result["output"])
+    result["duration"] = round(time.time() - start_time, 3)
+    return result
+
+
+def write_report(report_path, results):
+    """Write json report with the result and diagnostics of every lint unit"""
+    os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+    with open(report_path, "w") as f:
+        json.dump(
+            {
+                "failed_units": len([r for r in results if r["returncode"] != 0]),
+                "diagnostics": sum(len(r["diagnostics"]) for r in results),
+                "units": results,
+            },
+            f,
+            indent=4,
+        )
+
+
+def lint_files(files_list, report_path="", jobs=None):
+    """Run Linter on given list of files, while grouping them according to their location in the IObundle standard directory structure.
+    Every lint unit is linted (even if some fail). Exits with the return code of the
+    first unit that failed, after printing the output of every unit.
+    param files_list: list of Verilog files to lint
+    param report_path: optional path of json report with the diagnostics of every unit
+    param jobs: number of units linted in parallel. Defaults to jobs of current run.
+    """
+    print(f"Linting files: {files_list}", file=sys.stderr)  # DEBUG
+    lint_units = get_lint_units(files_list)
+    jobs = jobs or get_context().jobs
+
+    # Content hashes of files (shared by every unit)
+    hashes = {}
+    tasks = []
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        for linter in linters:
+            version = get_linter_version(linter)
+            # Lint files for each directory combination
+            for directory, (include_dirs, files) in lint_units.items():
+                tasks.append(
+                    executor.submit(
+                        _lint_unit,
+                        linter,
+                        directory,
+                        include_dirs,
+                        files,
+                        version,
+                        hashes,
+                    )
+                )
+    results = [task.result() for task in tasks]
+
+    for result in results:
+        print(
+            f'\n{iob_colors.INFO}Linting from base directory "{result["base_dir"]}"{iob_colors.ENDC}'
+        )
+        print(result["command"] + (" (cached)" if result["cached"] else ""))
+        print(result["output"], end="")
+        if result["returncode"] == 0:
             print(f"{iob_colors.INFO}Lint successful!{iob_colors.ENDC}")
 
+    if report_path:
+        write_report(report_path, results)
+
+    failed = [r for r in results if r["returncode"] != 0]
+    if failed:
+        print(
+            f"{iob_colors.FAIL}Lint failed in {len(failed)} of {len(results)} units ({sum(len(r['diagnostics']) for r in failed)} diagnostics).{iob_colors.ENDC}"
+        )
+        if report_path:
+            print(f"{iob_colors.FAIL}Lint report: '{report_path}'.{iob_colors.ENDC}")
+        exit(failed[0]["returncode"])
+
     # DEBUG: Print child directories and files to lint
     #    print("Base dir: "+directory, file=sys.stderr)
     #    print("Parent dirs: "+directories_to_lint[directory], file=sys.stderr)
@@ -93,5 +307,11 @@ def lint_files(files_list):
 
 
 if __name__ == "__main__":
-    files_list = sys.argv[1:]
-    lint_files(files_list)
+    parser = argparse.ArgumentParser(description="Lint Verilog files")
+    parser.add_argument("files", nargs="+", help="Verilog files to lint")
+    parser.add_argument(
+        "--jobs", type=int, default=1, help="Number of units linted in parallel"
+    )
+    parser.add_argument("--report", default="", help="Path of json lint report")
+    args = parser.parse_args()
+    lint_files(args.files, args.report, args.jobs)
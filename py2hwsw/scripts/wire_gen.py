@@ -8,8 +8,8 @@
 #    wire_gen.py: build Verilog module wires
 #
 import if_gen
-import os
 from iob_signal import iob_signal
+from build_files import open_file
 
 
 def generate_wires(core):
@@ -48,7 +48,7 @@ def generate_wires_snippet(core):
     """
     code = generate_wires(core)
     out_dir = core.build_dir + "/hardware/src"
-    with open(f"{out_dir}/{core.name}_wires.vs", "w+") as f:
+    with open_file(f"{out_dir}/{core.name}_wires.vs", "w") as f:
         f.write(code)
 
     for wire in core.wires:
@@ -56,9 +56,4 @@ def generate_wires_snippet(core):
         # Note: This is only used by manually written verilog modules.
         #       May not be needed in the future.
         if wire.interface:
-            if_gen.gen_wires(wire.interface)
-
-            # move all .vs files from current directory to out_dir
-            for file in os.listdir("."):
-                if file.endswith(".vs"):
-                    os.rename(file, f"{out_dir}/{file}")
+            if_gen.gen_wires(wire.interface, out_dir)
@@ -4,7 +4,9 @@
 
 from setuptools import setup
 from py2hwsw.scripts.py2hwsw_version import PY2HWSW_VERSION
+from py2hwsw.scripts.core_index import write_installed_index
 import os
+import shutil
 import subprocess
 from setuptools.command.install import install
 
@@ -30,6 +32,23 @@ class CreateShortHashFile(install):
 
         print(f"Created shortHash.tex file with Git commit short hash: {short_hash}")
 
+        # Precompute index of core setup files of the py2hwsw package.
+        # Installed files do not change, so the index never needs to be rebuilt.
+        write_installed_index(
+            os.path.join(os.path.dirname(__file__), "py2hwsw"), package_dir
+        )
+
+        print("Created core_index.json file with py2hwsw's core setup files")
+
+        # Ship license texts, which are copied to build directories (never downloaded)
+        shutil.copytree(
+            os.path.join(os.path.dirname(__file__), "LICENSES"),
+            os.path.join(package_dir, "LICENSES"),
+            dirs_exist_ok=True,
+        )
+
+        print("Copied license texts to the package directory")
+
         install.run(self)
 
 